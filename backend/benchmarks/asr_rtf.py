@@ -0,0 +1,63 @@
+# Benchmark: real-time factor (RTF) of each ASR backend on the same fixture audio.
+# RTF = processing time / audio duration; lower is better, < 1.0 is faster than real time.
+#
+# Usage (from the project root):
+#   python -m backend.benchmarks.asr_rtf path/to/fixture.wav
+#   python -m backend.benchmarks.asr_rtf path/to/fixture.wav --backends whisper faster-whisper --runs 3
+
+import argparse
+import statistics
+import time
+
+from ..services import asr_backends, audio_pipeline
+
+
+def benchmark_backend(name: str, audio, runs: int) -> dict:
+    """Loads one backend, does a warm-up pass, then times `runs` transcriptions of the buffer."""
+    backend = asr_backends.create_backend(name)
+    load_start = time.perf_counter()
+    backend.load()
+    load_seconds = time.perf_counter() - load_start
+
+    backend.transcribe(audio) # Warm-up: first call pays one-off allocation costs
+    timings = []
+    segments = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        segments, _ = backend.transcribe(audio)
+        timings.append(time.perf_counter() - start)
+
+    duration = audio_pipeline.duration_seconds(audio)
+    return {
+        "backend": name,
+        "options": backend.options(),
+        "load_s": load_seconds,
+        "median_s": statistics.median(timings),
+        "rtf": statistics.median(timings) / duration,
+        "words": sum(len(seg["text"].split()) for seg in segments),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the real-time factor of each ASR backend.")
+    parser.add_argument("audio", help="Fixture audio file (any format ffmpeg can decode).")
+    parser.add_argument("--backends", nargs="+", default=list(asr_backends.BACKENDS), help="Backends to compare.")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per backend (median is reported).")
+    args = parser.parse_args()
+
+    # Decode once so every backend sees exactly the same samples
+    audio = audio_pipeline.decode_audio(args.audio)
+    print(f"Fixture: {args.audio} ({audio_pipeline.duration_seconds(audio):.1f}s)")
+
+    print(f"{'backend':<16} {'load s':>8} {'median s':>9} {'RTF':>7} {'words':>6}  options")
+    for name in args.backends:
+        try:
+            r = benchmark_backend(name, audio, args.runs)
+        except Exception as e:
+            print(f"{name:<16} failed: {e}")
+            continue
+        print(f"{r['backend']:<16} {r['load_s']:>8.2f} {r['median_s']:>9.2f} {r['rtf']:>7.3f} {r['words']:>6}  {r['options']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Benchmark: embedding a meeting's transcript chunks for RAG indexing.
+# Compares the previous path (LangChain's HuggingFaceEmbeddings, one call per
+# document list, Python lists out) with the EmbeddingEngine runtimes and batch sizes.
+#
+# Usage (from the project root):
+#   python -m backend.benchmarks.embedding
+#   python -m backend.benchmarks.embedding --chunks 400 --backends torch int8 onnx --batch-sizes 32 64 128
+
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from ..services.embeddings import EMBEDDING_MODEL_NAME, EmbeddingEngine
+
+WORDS = ["budget", "release", "deadline", "review", "owner", "risk", "team", "plan", "customer", "roadmap"]
+
+
+def make_chunks(count: int) -> list:
+    """Chunks shaped like add_transcript_to_store's: ~1000 characters of speaker lines."""
+    chunks = []
+    for _ in range(count):
+        lines, length = [], 0
+        while length < 1000:
+            line = f"Speaker {random.randint(1, 4)} ({random.uniform(0, 3600):.2f}s): " + " ".join(random.choices(WORDS, k=12))
+            lines.append(line)
+            length += len(line) + 1
+        chunks.append("\n".join(lines)[:1000])
+    return chunks
+
+
+def time_runs(encode, chunks: list, runs: int) -> list:
+    encode(chunks[:8]) # Warm-up
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        encode(chunks)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding runtimes for indexing a meeting.")
+    parser.add_argument("--chunks", type=int, default=200, help="Chunks per meeting.")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per configuration.")
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[32, 64])
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks)
+    print(f"{args.chunks} chunks, {args.runs} runs, model {EMBEDDING_MODEL_NAME}")
+    print(f"{'runtime':<24} {'median s':>9} {'chunks/s':>9} {'cos vs hf':>10}")
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    hf = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+    reference = np.asarray(hf.embed_documents(chunks), dtype=np.float32)
+    timings = time_runs(hf.embed_documents, chunks, args.runs)
+    print(f"{'HuggingFaceEmbeddings':<24} {statistics.median(timings):>9.2f} {args.chunks / statistics.median(timings):>9.1f} {1.0:>10.4f}")
+
+    for backend in args.backends:
+        for batch_size in args.batch_sizes:
+            engine = EmbeddingEngine(backend=backend, batch_size=batch_size).load()
+            if engine.backend != backend:
+                print(f"{backend:<24} not available")
+                break
+            vectors = engine.encode(chunks)
+            # Mean cosine similarity with the reference vectors: how much quantization moved them
+            cosine = np.mean(np.sum(vectors * reference, axis=1) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1)))
+            median = statistics.median(time_runs(engine.encode, chunks, args.runs))
+            print(f"{f'{backend} (batch {batch_size})':<24} {median:>9.2f} {args.chunks / median:>9.1f} {cosine:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
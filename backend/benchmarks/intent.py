@@ -0,0 +1,122 @@
+# Benchmark: chat intent classification, local classifier vs the LLM.
+# Runs a fixed, labelled query set through the local classifier (pattern checks and
+# exemplar embeddings), the LLM classifier (classify_query) and the combined path chat
+# uses (local, LLM only when unsure), and prints accuracy and latency for each.
+# "routing" accuracy only counts whether small talk was told apart from everything
+# else, since "rag" and "other" are answered the same way.
+#
+# Usage (from the project root):
+#   python -m backend.benchmarks.intent
+#   python -m backend.benchmarks.intent --skip-llm --runs 5
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from ..services import rag_service
+from ..services.intent import LABELS, intent_classifier
+
+# (query, expected label); none of these are in intent.EXEMPLARS
+FIXTURE_QUERIES = [
+    ("hello!", "small_talk"),
+    ("hey there", "small_talk"),
+    ("good evening", "small_talk"),
+    ("thank you so much", "small_talk"),
+    ("thanks!", "small_talk"),
+    ("cheers, that's all", "small_talk"),
+    ("goodbye", "small_talk"),
+    ("how are you doing?", "small_talk"),
+    ("lovely weather today", "small_talk"),
+    ("you're very helpful", "small_talk"),
+    ("have a nice weekend", "small_talk"),
+    ("nice talking to you", "small_talk"),
+    ("what did Bob promise to deliver?", "rag"),
+    ("who owns ticket ABC-123?", "rag"),
+    ("how much money is left in the marketing budget?", "rag"),
+    ("what's the plan for the beta launch?", "rag"),
+    ("were there any concerns about security?", "rag"),
+    ("what are the key takeaways?", "rag"),
+    ("when do we ship version 2.4?", "rag"),
+    ("which customers were brought up?", "rag"),
+    ("what did the group conclude on pricing?", "rag"),
+    ("who needs to follow up with legal?", "rag"),
+    ("give me the main points", "rag"),
+    ("what blockers does the backend team have?", "rag"),
+    ("is the Berlin office move still happening?", "rag"),
+    ("what was said about the hiring freeze?", "rag"),
+    ("what tools do you have access to?", "other"),
+    ("how accurate are your answers?", "other"),
+    ("that answer doesn't make sense", "other"),
+    ("can you reply in german?", "other"),
+    ("what are you?", "other"),
+    ("how can I download the transcript?", "other"),
+    ("please be more concise", "other"),
+    ("where does my data go?", "other"),
+]
+
+
+def _normalize_label(raw: str) -> str:
+    """The first known label in an LLM reply (replies often add quotes or prose)."""
+    for label in LABELS:
+        if label in raw:
+            return label
+    return raw
+
+
+def _routing(label: str) -> str:
+    return "small_talk" if label == "small_talk" else "retrieve"
+
+
+def _summarize(name: str, predictions: list, timings: list, fallbacks: int = 0):
+    exact = sum(predicted == expected for (_, expected), predicted in zip(FIXTURE_QUERIES, predictions))
+    routed = sum(_routing(predicted) == _routing(expected) for (_, expected), predicted in zip(FIXTURE_QUERIES, predictions))
+    timings_ms = sorted(seconds * 1000 for seconds in timings)
+    p95 = timings_ms[min(len(timings_ms) - 1, int(len(timings_ms) * 0.95))]
+    print(f"{name:<14} {exact / len(FIXTURE_QUERIES):>9.0%} {routed / len(FIXTURE_QUERIES):>8.0%} "
+          f"{statistics.median(timings_ms):>9.2f} {p95:>9.2f} {fallbacks:>10}")
+
+
+async def run(runs: int, skip_llm: bool):
+    encoder = await rag_service.embeddings.aget()
+    await intent_classifier.classify("warm-up query about nothing", encoder) # Embeds the exemplars
+
+    print(f"{len(FIXTURE_QUERIES)} queries, {runs} run(s) each")
+    print(f"{'classifier':<14} {'accuracy':>9} {'routing':>8} {'p50 ms':>9} {'p95 ms':>9} {'LLM calls':>10}")
+
+    predictions, timings, unsure = [], [], 0
+    for query, _ in FIXTURE_QUERIES:
+        for _ in range(runs):
+            started = time.perf_counter()
+            intent = await intent_classifier.classify(query, encoder)
+            timings.append(time.perf_counter() - started)
+        unsure += intent["label"] is None
+        # An unsure local answer would go to the LLM; score it as its best guess here
+        predictions.append(intent["label"] or "rag")
+    _summarize("local", predictions, timings, unsure)
+
+    llm = None if skip_llm else await rag_service.get_llm()
+    if llm is None:
+        print("LLM classifier skipped" + (" (no LLM available)" if not skip_llm else ""))
+        return
+
+    for name, classify in (("llm", rag_service.classify_query), ("local + llm", rag_service.detect_intent)):
+        predictions, timings = [], []
+        for query, _ in FIXTURE_QUERIES:
+            started = time.perf_counter()
+            label = await classify(query, llm)
+            timings.append(time.perf_counter() - started)
+            predictions.append(_normalize_label(label))
+        _summarize(name, predictions, timings, len(FIXTURE_QUERIES) if name == "llm" else unsure)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare chat intent classifiers on a labelled query set.")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per query for the local classifier.")
+    parser.add_argument("--skip-llm", action="store_true", help="Only benchmark the local classifier.")
+    args = parser.parse_args()
+    asyncio.run(run(args.runs, args.skip_llm))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Benchmark: encoding a meeting for GET /meetings/summary/{job_id}.
+# Compares the previous path (decode every JSON column into a dict, then let
+# JSONResponse re-encode it) with serializer.meeting_to_json, which splices the
+# stored JSON columns into the response bytes as-is.
+#
+# Usage (from the project root):
+#   python -m backend.benchmarks.meeting_json
+#   python -m backend.benchmarks.meeting_json --transcript-words 200000 --items 500 --runs 50
+
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# The database module creates its directory on import; keep the real one untouched
+os.environ.setdefault("DB_DIR", tempfile.mkdtemp(prefix="notera-bench-"))
+
+from fastapi.responses import JSONResponse # noqa: E402
+
+from ..db.database import Meeting # noqa: E402
+from ..services.storage.serializer import meeting_to_json # noqa: E402
+
+WORDS = ["budget", "release", "deadline", "review", "owner", "risk", "team", "plan", "équipe", "calendrier"]
+
+
+def _text(words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(words))
+
+
+def make_meeting(transcript_words: int, items: int) -> Meeting:
+    """A detached Meeting row shaped like a completed, analysed upload."""
+    return Meeting(
+        id="benchmark",
+        filename="Quarterly planning.wav",
+        upload_time=datetime.datetime(2024, 1, 1, 9, 30),
+        status="completed",
+        transcript=_text(transcript_words),
+        summary=_text(400),
+        action_items=json.dumps([{"task": _text(20), "owner": "team", "deadline": "Friday"} for _ in range(items)], ensure_ascii=False),
+        decisions=json.dumps([_text(30) for _ in range(items)], ensure_ascii=False),
+        languages=json.dumps(["en", "fr"]),
+        pdf_path=None,
+    )
+
+
+def previous_path(meeting: Meeting) -> bytes:
+    """Row -> dict with every JSON column decoded, then JSONResponse's stdlib encoding."""
+    meeting_data = {c.name: getattr(meeting, c.name) for c in meeting.__table__.columns}
+    meeting_data['action_items'] = json.loads(meeting_data.get('action_items', '[]') or '[]')
+    meeting_data['decisions'] = json.loads(meeting_data.get('decisions', '[]') or '[]')
+    meeting_data['languages'] = json.loads(meeting_data.get('languages', '[]') or '[]')
+    try:
+        parsed_transcript = json.loads(meeting_data['transcript'])
+        if isinstance(parsed_transcript, list):
+            meeting_data['transcript'] = parsed_transcript
+    except json.JSONDecodeError:
+        pass # Plain text transcript
+    meeting_data['upload_time'] = meeting_data['upload_time'].replace(tzinfo=datetime.timezone.utc).isoformat()
+    return JSONResponse(content=meeting_data).body
+
+
+def time_path(encode, meeting: Meeting, runs: int) -> list:
+    encode(meeting) # Warm-up
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        encode(meeting)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the old and new meeting response encoders.")
+    parser.add_argument("--transcript-words", type=int, default=100000, help="Words in the transcript column.")
+    parser.add_argument("--items", type=int, default=200, help="Action items and decisions each.")
+    parser.add_argument("--runs", type=int, default=30, help="Timed encodings per path.")
+    args = parser.parse_args()
+
+    meeting = make_meeting(args.transcript_words, args.items)
+    if json.loads(previous_path(meeting)) != json.loads(meeting_to_json(meeting)):
+        raise SystemExit("The two paths produced different documents.")
+
+    print(f"Transcript: {args.transcript_words} words, {args.items} action items and decisions, {args.runs} runs")
+    print(f"{'path':<18} {'bytes':>10} {'median ms':>10} {'p90 ms':>8}")
+    for name, encode in (("dict+JSONResponse", previous_path), ("meeting_to_json", meeting_to_json)):
+        timings = sorted(time_path(encode, meeting, args.runs))
+        size = len(encode(meeting))
+        print(f"{name:<18} {size:>10} {statistics.median(timings):>10.2f} {timings[int(0.9 * (len(timings) - 1))]:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
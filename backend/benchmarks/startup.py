@@ -0,0 +1,87 @@
+# Benchmark: time from launching the API to its first response, and to readiness.
+# Starts `uvicorn backend.main:app` in a subprocess and polls /health/live (the server
+# is bound and serving) and /health/ready (the warm-up has loaded every required model),
+# then prints each component's load time from the readiness report.
+#
+# Usage (from the project root):
+#   python -m backend.benchmarks.startup
+#   python -m backend.benchmarks.startup --runs 3 --timeout 600
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(url: str):
+    """Returns (status, parsed body), or None if nothing is listening yet."""
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None
+
+
+def _wait_for(url: str, started: float, deadline: float, ready: bool):
+    """Polls url until it answers (with 200 when `ready`); returns (seconds since launch, body)."""
+    while time.perf_counter() < deadline:
+        result = _get(url)
+        if result is not None and (not ready or result[0] == 200):
+            return time.perf_counter() - started, result[1]
+        time.sleep(0.05)
+    raise TimeoutError(f"No {'ready ' if ready else ''}response from {url}")
+
+
+def run_once(timeout: float) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    # Keep the real database untouched
+    env = {**os.environ, "DB_DIR": tempfile.mkdtemp(prefix="notera-bench-")}
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + timeout
+        first_response, _ = _wait_for(f"{base}/health/live", started, deadline, ready=False)
+        ready, report = _wait_for(f"{base}/health/ready", started, deadline, ready=True)
+        return {"first_response": first_response, "ready": ready, "report": report}
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API time-to-first-response and time-to-ready.")
+    parser.add_argument("--runs", type=int, default=1, help="Server launches to time.")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for readiness per launch.")
+    args = parser.parse_args()
+
+    print(f"{'run':<5} {'first response s':>17} {'ready s':>9}")
+    for run in range(1, args.runs + 1):
+        result = run_once(args.timeout)
+        print(f"{run:<5} {result['first_response']:>17.2f} {result['ready']:>9.2f}")
+
+    print("\nComponent load times (last run):")
+    for name, status in result["report"]["components"].items():
+        seconds = f"{status['load_seconds']:.2f}s" if status["load_seconds"] is not None else "-"
+        print(f"  {name:<16} {status['state']:<11} {seconds:>8}{'' if status['required'] else '  (optional)'}")
+
+
+if __name__ == "__main__":
+    main()
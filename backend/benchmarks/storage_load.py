@@ -0,0 +1,131 @@
+# Benchmark: read latency of the storage layer while large writes are in progress.
+# Concurrent readers fetch meetings and list pages, first on an idle database and
+# then while writers store large analysis results. A heartbeat task measures how
+# late the event loop wakes up, i.e. how long database work blocks other requests.
+#
+# Runs against a fresh database in a temporary directory; the real one is never touched.
+#
+# Usage (from the project root):
+#   python -m backend.benchmarks.storage_load
+#   python -m backend.benchmarks.storage_load --meetings 500 --readers 16 --writers 4 --seconds 10
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+# Must be set before the database module is imported
+os.environ["DB_DIR"] = tempfile.mkdtemp(prefix="notera-bench-")
+
+from ..db.database import create_db_and_tables, dispose_async_engine # noqa: E402
+from ..services.storage.meeting import create_initial_meeting, get_meeting_data, get_meeting_list_page # noqa: E402
+from ..services.storage.transcript import update_asr_result # noqa: E402
+from ..services.storage.analysis import update_analysis_results # noqa: E402
+
+HEARTBEAT_INTERVAL = 0.005 # Seconds between event-loop heartbeats
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _text(words: int) -> str:
+    return " ".join(random.choice(["budget", "release", "deadline", "review", "owner", "risk", "team", "plan"]) for _ in range(words))
+
+
+async def seed(meetings: int, transcript_words: int):
+    ids = []
+    for i in range(meetings):
+        job_id = str(uuid.uuid4())
+        await create_initial_meeting(job_id, f"Meeting {i}")
+        await update_asr_result(job_id, _text(transcript_words), ["en"])
+        await update_analysis_results(job_id, {"summary": _text(200), "action_items": [], "decisions": []})
+        ids.append(job_id)
+    return ids
+
+
+async def reader(ids, deadline: float, latencies: dict):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await get_meeting_data(random.choice(ids))
+        latencies["get_meeting"].append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        await get_meeting_list_page(limit=50)
+        latencies["list_page"].append((time.perf_counter() - start) * 1000)
+
+
+async def writer(ids, deadline: float, payload_words: int, latencies: dict):
+    while time.perf_counter() < deadline:
+        analysis = {
+            "summary": _text(payload_words),
+            "action_items": [{"task": _text(20), "owner": "team"} for _ in range(50)],
+            "decisions": [_text(30) for _ in range(50)],
+        }
+        start = time.perf_counter()
+        await update_analysis_results(random.choice(ids), analysis)
+        latencies["write"].append((time.perf_counter() - start) * 1000)
+
+
+async def heartbeat(deadline: float, lags: list):
+    while time.perf_counter() < deadline:
+        expected = time.perf_counter() + HEARTBEAT_INTERVAL
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+
+async def run_phase(ids, args, writers: int) -> dict:
+    latencies = {"get_meeting": [], "list_page": [], "write": []}
+    lags = []
+    deadline = time.perf_counter() + args.seconds
+    tasks = [reader(ids, deadline, latencies) for _ in range(args.readers)]
+    tasks += [writer(ids, deadline, args.payload_words, latencies) for _ in range(writers)]
+    tasks.append(heartbeat(deadline, lags))
+    with contextlib.redirect_stdout(io.StringIO()): # The storage layer logs every call
+        await asyncio.gather(*tasks)
+    latencies["loop_lag"] = lags
+    return latencies
+
+
+def report(name: str, latencies: dict):
+    print(f"\n{name}")
+    print(f"{'operation':<12} {'count':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for op, values in latencies.items():
+        if not values:
+            continue
+        print(f"{op:<12} {len(values):>7} {statistics.median(values):>8.2f} {_percentile(values, 0.99):>8.2f} {max(values):>8.2f}")
+
+
+async def main_async(args):
+    create_db_and_tables()
+    print(f"Database: {os.environ['DB_DIR']}")
+    print(f"Seeding {args.meetings} meetings ({args.transcript_words} transcript words each)...")
+    with contextlib.redirect_stdout(io.StringIO()):
+        ids = await seed(args.meetings, args.transcript_words)
+
+    report(f"Idle: {args.readers} readers, {args.seconds}s", await run_phase(ids, args, writers=0))
+    report(f"Under load: {args.readers} readers + {args.writers} writers, {args.seconds}s", await run_phase(ids, args, writers=args.writers))
+    await dispose_async_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure storage read latency and event-loop lag under concurrent writes.")
+    parser.add_argument("--meetings", type=int, default=200, help="Meetings seeded before measuring.")
+    parser.add_argument("--transcript-words", type=int, default=5000, help="Words per seeded transcript.")
+    parser.add_argument("--readers", type=int, default=8, help="Concurrent reader tasks.")
+    parser.add_argument("--writers", type=int, default=2, help="Concurrent writer tasks in the load phase.")
+    parser.add_argument("--payload-words", type=int, default=20000, help="Words in each written summary.")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each phase.")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
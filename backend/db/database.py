@@ -1,26 +1,101 @@
 import os
 import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, text # Import text
+from sqlalchemy import create_engine, event, Column, Integer, Float, String, Text, DateTime, Index, LargeBinary, text # Import text
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import sessionmaker, Session # Import Session for type hinting
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
+import zstandard
 
 # Define the path to the database file within the db_data directory
-DB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db_data')
+DB_DIR = os.getenv("DB_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db_data'))
 if not os.path.exists(DB_DIR):
     os.makedirs(DB_DIR)
 
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(DB_DIR, 'fluent_notes.db')}"
+# Same file through aiosqlite, used by the storage layer so queries never block the event loop
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(DB_DIR, 'fluent_notes.db')}"
+# How long a connection waits for another connection's write lock before failing
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Transcripts of at least this many UTF-8 bytes are stored zstd-compressed
+TRANSCRIPT_COMPRESS_MIN_BYTES = int(os.getenv("TRANSCRIPT_COMPRESS_MIN_BYTES", "4096"))
+TRANSCRIPT_COMPRESSION_LEVEL = int(os.getenv("TRANSCRIPT_COMPRESSION_LEVEL", "3"))
+
+
+def compress_text(value: str):
+    """Returns value as zstd-compressed bytes if it is large enough to be worth it, else unchanged."""
+    data = value.encode("utf-8")
+    if len(data) < TRANSCRIPT_COMPRESS_MIN_BYTES:
+        return value
+    return zstandard.compress(data, TRANSCRIPT_COMPRESSION_LEVEL)
+
+
+def decompress_text(value):
+    """Inverse of compress_text. Also registered as the SQL function transcript_text()."""
+    if isinstance(value, bytes):
+        return zstandard.decompress(value).decode("utf-8")
+    return value
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column whose large values are stored zstd-compressed.
+    Compressed values are BLOBs and short ones stay TEXT, so reads tell them apart
+    by type and rows written before compression existed keep working. Values are
+    only decompressed when the column is actually selected.
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress_text(value) if isinstance(value, str) else value
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False} # check_same_thread only needed for SQLite
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for services/storage. Objects stay usable after commit (no lazy refresh in async code).
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """
+    Applied to every new connection of both engines.
+    WAL lets readers run while a write is in progress (the default rollback journal
+    blocks them), and busy_timeout makes a second writer wait instead of failing at once.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous=NORMAL") # Safe with WAL; skips an fsync per commit
+    cursor.close()
+    # Plain text of a possibly compressed transcript, for the FTS triggers and SQL-side searches
+    dbapi_connection.create_function("transcript_text", 1, decompress_text, deterministic=True)
+
+
+event.listen(engine, "connect", _configure_sqlite_connection)
+event.listen(async_engine.sync_engine, "connect", _configure_sqlite_connection)
+
 # --- Helper to get a DB session (useful for background tasks or direct use) ---
 def get_db_session() -> Session:
     """Creates and returns a new SQLAlchemy session."""
     return SessionLocal()
 
+
+def get_async_session() -> AsyncSession:
+    """Creates and returns a new async SQLAlchemy session. Close it with `await db.close()`."""
+    return AsyncSessionLocal()
+
+
+async def dispose_async_engine():
+    """Closes the async engine's pooled connections. Called on application shutdown."""
+    await async_engine.dispose()
+
 Base = declarative_base()
 
 # Define the Meeting model
@@ -30,16 +105,105 @@ class Meeting(Base):
     filename = Column(String, index=True)
     upload_time = Column(DateTime, default=datetime.datetime.utcnow)
     status = Column(String, default="processing") # Added status field
-    transcript = Column(Text, nullable=True)
+    transcript = Column(CompressedText, nullable=True) # zstd-compressed above TRANSCRIPT_COMPRESS_MIN_BYTES
     summary = Column(Text, nullable=True)
     action_items = Column(Text, nullable=True) # Storing as JSON string
     decisions = Column(Text, nullable=True) # Storing as JSON string
     languages = Column(Text, nullable=True) # Storing as JSON string array of ISO 639-1 codes
     pdf_path = Column(String, nullable=True) # Path to the generated PDF
+    version = Column(Integer, default=1, server_default="1", nullable=False) # Bumped by every write; validates cached copies
+    __table_args__ = (
+        Index("ix_meetings_upload_time_id", "upload_time", "id"), # Keyset pagination of the meeting list
+    )
+
+# Live transcript segments, one row per segment, appended as the meeting is recorded
+class TranscriptSegment(Base):
+    __tablename__ = "transcript_segments"
+    meeting_id = Column(String, primary_key=True)
+    idx = Column(Integer, primary_key=True, autoincrement=False) # Position within the meeting, from 0
+    segment_id = Column(String, nullable=True) # Segment ID shown to the frontend
+    start = Column(Float, default=0.0) # Seconds from the start of the meeting
+    end = Column(Float, default=0.0)
+    speaker = Column(String, nullable=True)
+    speaker_name = Column(String, nullable=True)
+    language = Column(String, nullable=True)
+    text = Column(Text, default="")
+    __table_args__ = (
+        Index("ix_transcript_segments_meeting_start", "meeting_id", "start"), # Time-range lookups
+        {"sqlite_with_rowid": False}, # Rows are stored in primary key order, so a meeting is one range scan
+    )
+
+# Cached ASR results, keyed by a hash of the audio bytes and the decoding options
+class AsrCacheEntry(Base):
+    __tablename__ = "asr_cache"
+    key = Column(String, primary_key=True) # sha256(audio sha256 + options JSON)
+    audio_sha256 = Column(String, index=True)
+    options = Column(Text) # JSON: backend, model and decoding options
+    transcript = Column(Text)
+    languages = Column(Text) # JSON string array
+    segments = Column(Text) # JSON list of segments
+    size_bytes = Column(Integer, default=0)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.datetime.utcnow, index=True) # LRU eviction order
+
+# Cached chunk embeddings, keyed by the embedding model and a hash of the chunk text
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+    model = Column(String, primary_key=True) # embeddings.model_identity(): model name and runtime
+    text_sha256 = Column(String, primary_key=True)
+    vector = Column(LargeBinary) # float16 values
+    size_bytes = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.datetime.utcnow, index=True) # LRU eviction order
+    __table_args__ = (
+        {"sqlite_with_rowid": False}, # Looked up by primary key only
+    )
+
+# Durable background jobs (ASR, analysis, indexing, PDF) for each meeting
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    meeting_id = Column(String, index=True)
+    stage = Column(String, index=True) # asr, analysis, indexing, pdf
+    status = Column(String, default="queued", index=True) # queued, running, succeeded, failed
+    payload = Column(Text, nullable=True) # JSON arguments for the stage handler
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    last_error = Column(Text, nullable=True)
+    next_run_at = Column(DateTime, default=datetime.datetime.utcnow, index=True) # Retry backoff
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    owner = Column(String, nullable=True) # Worker process running the job
+    lease_expires_at = Column(DateTime, nullable=True, index=True) # Renewed by the owner's heartbeat while running
+    priority = Column(Integer, default=2, server_default="2", nullable=False) # asr_scheduler PRIORITY_*; lower is claimed first
+    __table_args__ = (
+        Index("ix_jobs_stage_status_priority_id", "stage", "status", "priority", "id"), # Claim order
+    )
+
+# Columns added to a table after it was first created: (table, column, column DDL)
+ADDED_COLUMNS = (
+    ("meetings", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("jobs", "owner", "VARCHAR"),
+    ("jobs", "lease_expires_at", "DATETIME"),
+    ("jobs", "priority", "INTEGER NOT NULL DEFAULT 2"),
+)
 
 # Function to create tables
 def create_db_and_tables():
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, including columns and indexes added to them later
+    with engine.begin() as connection:
+        for table, column, ddl in ADDED_COLUMNS:
+            existing = {row[1] for row in connection.execute(text(f"PRAGMA table_info({table})"))}
+            if column not in existing:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+                print(f"Added column {table}.{column}.")
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 # Dependency to get DB session
 def get_db():
@@ -53,36 +217,97 @@ print("SQLAlchemy Database module initialized.")
 print(f"Database URL: {SQLALCHEMY_DATABASE_URL}")
 
 
+# Columns of `meetings` covered by full-text search, in meetings_fts column order
+FTS_COLUMNS = ("filename", "summary", "transcript", "action_items", "decisions")
+# SQL giving each indexed column's plain text from a `meetings` row alias
+FTS_COLUMN_TEXT = {"transcript": "transcript_text({row}.transcript)"}
+
+
+def _fts_values(row: str, aliased: bool = False) -> str:
+    """Indexed column values of `row`; aliased names them for a SELECT list (FTS5 reads content columns by name)."""
+    values = []
+    for column in FTS_COLUMNS:
+        value = FTS_COLUMN_TEXT.get(column, "{row}.%s" % column).format(row=row)
+        values.append(f"{value} AS {column}" if aliased else value)
+    return ", ".join(values)
+
+
 # Function to setup FTS table and triggers using raw SQL
 def setup_fts(db_engine):
-    """Creates the FTS5 table and synchronization triggers if they don't exist."""
-    # Use a connection from the engine to execute raw SQL
-    with db_engine.connect() as connection:
-        # Create FTS5 table
+    """
+    Creates the FTS5 index over meetings and the triggers that keep it in sync.
+
+    meetings_fts is an external-content table: it stores only the index and reads
+    column values by rowid from the meetings_fts_content view, which is `meetings`
+    with the transcript decompressed. The triggers therefore remove old
+    entries with the FTS5 'delete' command, passing the old column values, rather
+    than running DELETE/UPDATE against the FTS table (which reads the already
+    changed row and leaves the index inconsistent). Updates only reindex when
+    an indexed column changes, so status updates cost nothing.
+
+    The view and triggers call transcript_text(), which every connection opened by
+    this module registers; other SQLite clients can read but not modify `meetings`.
+
+    Safe to call on every startup. An index from an older schema is dropped and
+    rebuilt from `meetings`.
+    """
+    columns = ", ".join(FTS_COLUMNS)
+    new_values = _fts_values("new")
+    old_values = _fts_values("old")
+    # engine.begin() commits on exit; DDL on a plain connect() would be rolled back
+    with db_engine.begin() as connection:
+        existing_sql = connection.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'meetings_fts'"
+        )).scalar()
+        needs_rebuild = existing_sql is None or "meetings_fts_content" not in existing_sql
+        if existing_sql is not None and needs_rebuild:
+            print("Dropping outdated FTS table meetings_fts.")
+            connection.execute(text("DROP TABLE meetings_fts"))
+        # Triggers are recreated every time, so older definitions never linger
+        for trigger in ("meetings_ai", "meetings_ad", "meetings_au", "meetings_fts_ai", "meetings_fts_ad", "meetings_fts_au"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+
+        connection.execute(text("DROP VIEW IF EXISTS meetings_fts_content"))
+        connection.execute(text(f"""
+            CREATE VIEW meetings_fts_content AS
+            SELECT m.rowid AS meeting_rowid, {_fts_values("m", aliased=True)} FROM meetings m;
+        """))
         connection.execute(text(f"""
             CREATE VIRTUAL TABLE IF NOT EXISTS meetings_fts USING fts5(
-                id UNINDEXED, -- Match the main table's primary key name
-                transcript,
-                content='meetings', -- Link to the main table
-                content_rowid='rowid' -- Use rowid for linking
+                {columns},
+                content='meetings_fts_content',
+                content_rowid='meeting_rowid',
+                tokenize='unicode61 remove_diacritics 2'
             );
-        """)) # Wrap in text()
-        # Trigger after INSERT on meetings
+        """))
         connection.execute(text(f"""
-            CREATE TRIGGER IF NOT EXISTS meetings_ai AFTER INSERT ON meetings BEGIN
-                INSERT INTO meetings_fts (rowid, id, transcript) VALUES (new.rowid, new.id, new.transcript);
+            CREATE TRIGGER meetings_fts_ai AFTER INSERT ON meetings BEGIN
+                INSERT INTO meetings_fts (rowid, {columns}) VALUES (new.rowid, {new_values});
             END;
-        """)) # Wrap in text()
-        # Trigger after DELETE on meetings
+        """))
         connection.execute(text(f"""
-            CREATE TRIGGER IF NOT EXISTS meetings_ad AFTER DELETE ON meetings BEGIN
-                DELETE FROM meetings_fts WHERE rowid=old.rowid;
+            CREATE TRIGGER meetings_fts_ad AFTER DELETE ON meetings BEGIN
+                INSERT INTO meetings_fts (meetings_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
             END;
-        """)) # Wrap in text()
-        # Trigger after UPDATE on meetings
+        """))
         connection.execute(text(f"""
-            CREATE TRIGGER IF NOT EXISTS meetings_au AFTER UPDATE ON meetings BEGIN
-                UPDATE meetings_fts SET transcript = new.transcript WHERE rowid=old.rowid;
+            CREATE TRIGGER meetings_fts_au AFTER UPDATE OF {columns} ON meetings BEGIN
+                INSERT INTO meetings_fts (meetings_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+                INSERT INTO meetings_fts (rowid, {columns}) VALUES (new.rowid, {new_values});
             END;
-        """)) # Wrap in text()
+        """))
+        if needs_rebuild:
+            connection.execute(text("INSERT INTO meetings_fts (meetings_fts) VALUES ('rebuild')"))
+            print("FTS index built from existing meetings.")
         print("FTS table and triggers checked/created.")
+
+
+def rebuild_fts(db_engine):
+    """
+    Rebuilds meetings_fts from `meetings`.
+    Needed after a VACUUM, which may renumber the rowids the index refers to.
+    """
+    with db_engine.begin() as connection:
+        connection.execute(text("INSERT INTO meetings_fts (meetings_fts) VALUES ('rebuild')"))
+        connection.execute(text("INSERT INTO meetings_fts (meetings_fts) VALUES ('optimize')"))
+    print("FTS index rebuilt.")
@@ -9,11 +9,18 @@ load_dotenv(dotenv_path=dotenv_path)
 print(f"Attempting to load .env from: {dotenv_path}") # Debug print
 print(f"CHROMA_USE_HTTP after load: {os.getenv('CHROMA_USE_HTTP')}") # Debug print
 
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
-from .db.database import create_db_and_tables, setup_fts, engine # Import the function, FTS setup, and engine
+from .db.database import create_db_and_tables, setup_fts, engine, dispose_async_engine # Import the function, FTS setup, and engines
+from .services.asr import shutdown_asr_pool
+from .services.job_queue import job_queue
+from .services.tasks import register_job_handlers
+from .services.storage.transcript import migrate_json_transcripts, compress_existing_transcripts
+from .services.storage.segment_writer import segment_writer
+from .services import resources, rag_service
 
 # Define directories relative to main.py location
 PDF_OUTPUT_DIR = "generated_pdfs" # Should match pdf_generator.py
@@ -37,8 +44,54 @@ app = FastAPI(
 create_db_and_tables()
 print("Database tables checked/created.")
 # Setup FTS table and triggers after main tables are created
-# setup_fts(engine) # Temporarily disabled for debugging DB corruption issue
-
+setup_fts(engine)
+
+
+
+@app.on_event("startup")
+async def migrate_legacy_data():
+    # Live transcripts stored as JSON blobs move to the transcript_segments table
+    await migrate_json_transcripts()
+    # Large transcripts written before compression existed are compressed in the background
+    app.state.compress_transcripts_task = asyncio.create_task(compress_existing_transcripts())
+    # Per-meeting vector collections move into the shared collection in the background
+    if rag_service.RAG_INDEX_MODE == "shared":
+        app.state.vector_migration_task = asyncio.create_task(rag_service.migrate_meeting_collections())
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    # Re-queues jobs interrupted by the last shutdown, then starts the stage workers
+    register_job_handlers()
+    await job_queue.start()
+    # Batches live segment writes
+    segment_writer.start()
+
+
+@app.on_event("startup")
+async def start_model_warmup():
+    # Models load in the background so the server binds immediately; /health/ready reports when they're done
+    if resources.MODEL_WARMUP:
+        app.state.warmup_task = asyncio.create_task(resources.warm_up())
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    # Hand running jobs back to the queue, write buffered live segments, then terminate ASR worker processes
+    compress_task = getattr(app.state, "compress_transcripts_task", None)
+    if compress_task and not compress_task.done():
+        compress_task.cancel() # Resumes from the remaining plain-text rows on the next startup
+    migration_task = getattr(app.state, "vector_migration_task", None)
+    if migration_task and not migration_task.done():
+        migration_task.cancel() # Unmigrated collections stay readable and move on the next startup
+    warmup_task = getattr(app.state, "warmup_task", None)
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    await job_queue.stop()
+    await segment_writer.stop()
+    shutdown_asr_pool()
+    # Close pooled database connections (checkpoints the WAL)
+    await dispose_async_engine()
 
 
 # Allow requests from typical frontend development ports/origins
@@ -52,6 +105,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], # Allows all methods (GET, POST, etc.)
     allow_headers=["*"], # Allows all headers
+    expose_headers=["ETag", "X-Next-Cursor"], # Meeting list caching and pagination
 )
 
 
@@ -67,8 +121,11 @@ async def read_root():
     return {"message": "Welcome to the Fluent Note Taker AI Backend"}
 
 # Include routers
-from .routers import upload, transcript, chat, meetings # Import routers AFTER env vars are loaded
+from .routers import upload, transcript, chat, meetings, admin, live, health # Import routers AFTER env vars are loaded
 app.include_router(upload.router)
 app.include_router(transcript.router)
 app.include_router(chat.router) # Include the chat router
 app.include_router(meetings.router) # Registered meetings router
+app.include_router(admin.router) # Cache and maintenance endpoints
+app.include_router(live.router) # Streaming audio ingest for live meetings
+app.include_router(health.router) # Liveness and readiness probes
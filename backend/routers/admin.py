@@ -0,0 +1,141 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
+
+# Import the specific functions needed from the storage structure
+from ..services.storage.asr_cache import get_asr_cache_stats, purge_asr_cache
+from ..services.storage.embedding_cache import get_embedding_cache_stats, purge_embedding_cache
+from ..services.storage.meeting import enqueue_reindex
+from ..services.storage.jobs import get_queue_stats, get_jobs, get_job
+from ..services.asr import get_scheduler_metrics
+from ..services.storage.segment_writer import segment_writer
+from ..services.storage.meeting_cache import meeting_cache
+from ..db.database import engine, rebuild_fts
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+)
+
+
+@router.get("/asr-cache")
+async def asr_cache_stats():
+    """
+    Returns the size of the ASR result cache and its hit/miss counters.
+    """
+    stats = await get_asr_cache_stats()
+    if not stats:
+        raise HTTPException(status_code=500, detail="Could not read ASR cache statistics.")
+    return stats
+
+
+@router.delete("/asr-cache")
+async def asr_cache_purge():
+    """
+    Removes every cached ASR result. Later uploads are transcribed from scratch.
+    """
+    deleted = await purge_asr_cache()
+    return {"message": f"Purged {deleted} ASR cache entries.", "deleted": deleted}
+
+
+@router.get("/embedding-cache")
+async def embedding_cache_stats():
+    """
+    Returns the size of the chunk embedding cache and its hit/miss counters.
+    """
+    stats = await get_embedding_cache_stats()
+    if not stats:
+        raise HTTPException(status_code=500, detail="Could not read embedding cache statistics.")
+    return stats
+
+
+@router.delete("/embedding-cache")
+async def embedding_cache_purge():
+    """
+    Removes every cached chunk embedding. Later indexing embeds every chunk again.
+    """
+    deleted = await purge_embedding_cache()
+    return {"message": f"Purged {deleted} embedding cache entries.", "deleted": deleted}
+
+
+@router.post("/reindex")
+async def reindex_meetings(meeting_id: Optional[List[str]] = Query(None, description="Only these meetings (repeatable).")):
+    """
+    Queues RAG re-indexing of every meeting with a transcript, e.g. after a chunking change.
+    Chunks whose text is unchanged reuse their cached embeddings.
+    """
+    queued = await enqueue_reindex(meeting_id)
+    return {"message": f"Queued re-indexing of {queued} meeting(s).", "queued": queued}
+
+
+@router.get("/jobs/stats")
+async def job_queue_stats():
+    """
+    Returns the job queue depth: job counts per stage and status,
+    and the age of the oldest queued job in each stage.
+    """
+    return await get_queue_stats()
+
+
+@router.get("/jobs")
+async def list_jobs(
+    meeting_id: Optional[str] = Query(None, description="Only jobs for this meeting."),
+    stage: Optional[str] = Query(None, description="asr, analysis, indexing or pdf."),
+    status: Optional[str] = Query(None, description="queued, running, succeeded or failed."),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Lists jobs, newest first, with their state, attempts and last error.
+    """
+    return await get_jobs(meeting_id=meeting_id, stage=stage, status=status, limit=limit)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_state(job_id: int):
+    """
+    Returns the state of a single job.
+    """
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+@router.get("/asr-scheduler")
+async def asr_scheduler_metrics():
+    """
+    Returns ASR scheduler metrics: queue depth and queue wait times per
+    priority class (live, interactive, bulk), and live latency-target misses.
+    """
+    return get_scheduler_metrics()
+
+
+@router.get("/segment-writer")
+async def segment_writer_metrics():
+    """
+    Returns live segment write-behind metrics: flushes, batch sizes, flush latency
+    and segments still buffered.
+    """
+    return segment_writer.metrics()
+
+
+@router.get("/meeting-cache")
+async def meeting_cache_metrics():
+    """
+    Returns the size of the in-process meeting cache and its hit, miss,
+    stale-version and eviction counters.
+    """
+    return meeting_cache.metrics()
+
+
+@router.post("/fts/rebuild")
+async def rebuild_search_index():
+    """
+    Rebuilds the full-text search index from the meetings table.
+    Only needed after a VACUUM or manual edits that bypass the triggers.
+    """
+    try:
+        await run_in_threadpool(rebuild_fts, engine)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild the search index: {e}")
+    return {"message": "Search index rebuilt."}
@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from ..services import resources
+
+router = APIRouter(
+    prefix="/health",
+    tags=["health"],
+)
+
+
+@router.get("/live")
+async def liveness():
+    """
+    Liveness probe: the process is up and serving requests. Never waits on models.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness():
+    """
+    Readiness probe: 200 once every required model and client is loaded, 503 until then
+    (or if one failed to load). The body lists each component's state and load time.
+    """
+    report = resources.readiness()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
@@ -0,0 +1,89 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Path, Query
+from typing import Annotated, Optional
+import asyncio
+import json
+
+from ..services import audio_pipeline
+from ..services.live_session import LiveSession
+from ..services.storage.meeting import get_meeting_data
+
+router = APIRouter(
+    prefix="/live",
+    tags=["live"],
+)
+
+
+@router.websocket("/{meeting_id}/audio")
+async def live_audio_endpoint(
+    websocket: WebSocket,
+    meeting_id: Annotated[str, Path(description="The ID of the live meeting session.")],
+    sample_rate: Annotated[int, Query(gt=0, description="Sample rate of the PCM frames sent by the client.")] = audio_pipeline.SAMPLE_RATE,
+    language: Annotated[Optional[str], Query(description="Language code; auto-detected per segment if omitted.")] = None,
+    offset: Annotated[float, Query(ge=0, description="Meeting time in seconds of the first frame, for resumed sessions.")] = 0.0,
+):
+    """
+    Streams live meeting audio in and transcript segments out.
+
+    Client -> server:
+      - binary messages: raw little-endian 16-bit mono PCM at `sample_rate`
+      - {"type": "flush"}: commit the pending audio as a final segment now
+      - {"type": "stop"}: commit the pending audio and close the session
+
+    Server -> client:
+      - {"type": "ready"} once the session is accepted
+      - {"type": "partial", "segment": {...}}: provisional caption for the pending audio
+      - {"type": "final", "segment": {...}}: committed segment (also persisted and
+        broadcast as `transcript_update` on /meetings/ws)
+      - {"type": "error", "detail": "..."}
+    """
+    await websocket.accept()
+
+    meeting = await get_meeting_data(meeting_id)
+    if not meeting or meeting.get("status") != "recording_live":
+        await websocket.send_json({"type": "error", "detail": f"Meeting '{meeting_id}' is not recording live."})
+        await websocket.close(code=4404)
+        return
+
+    async def send(message):
+        try:
+            await websocket.send_json(message)
+        except Exception as e:
+            # The client may be gone; segments are still persisted and broadcast
+            print(f"[Live {meeting_id}] Could not send {message.get('type')} to client: {e}")
+
+    session = LiveSession(meeting_id, send, sample_rate=sample_rate, language=language, offset_seconds=offset)
+    processing = asyncio.create_task(session.run())
+    await send({"type": "ready"})
+    print(f"[Live {meeting_id}] Audio stream opened ({sample_rate} Hz, language={language}, offset={offset}s)")
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                session.feed(message["bytes"])
+            elif message.get("text") is not None:
+                try:
+                    command = json.loads(message["text"]).get("type")
+                except (json.JSONDecodeError, AttributeError):
+                    command = None
+                if command == "flush":
+                    session.flush()
+                elif command == "stop":
+                    break
+                else:
+                    await send({"type": "error", "detail": "Unknown control message."})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"[Live {meeting_id}] WebSocket error: {e}")
+    finally:
+        # Whatever audio is still buffered becomes the last segment
+        session.close()
+        await processing
+        print(f"[Live {meeting_id}] Audio stream closed after {session.segments_committed} segment(s)")
+        try:
+            await websocket.close()
+        except Exception:
+            pass # Already closed by the client
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, Body, Path, WebSocket, WebSocketDisconnect, BackgroundTasks # Import BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Body, Path, WebSocket, WebSocketDisconnect
 from fastapi import status
 from pydantic import BaseModel, Field
 from typing import Annotated
@@ -14,6 +14,7 @@ from ..services.storage.meeting import (
     create_live_meeting,
     finalize_live_meeting # Import the new function
 )
+from ..services.live_session import discard_live_transcript
 from ..models.schemas import Meeting
 
 router = APIRouter(
@@ -51,21 +52,21 @@ async def create_live_meeting_endpoint():
 
 @router.post("/{meeting_id}/finalize-live", status_code=status.HTTP_200_OK)
 async def finalize_live_meeting_endpoint(
-    meeting_id: Annotated[str, Path(description="The unique ID of the live meeting session to finalize.")],
-    background_tasks: BackgroundTasks # Inject BackgroundTasks
+    meeting_id: Annotated[str, Path(description="The unique ID of the live meeting session to finalize.")]
 ):
     """
     Updates the status of a live meeting from 'recording_live' to 'processing_analysis'
-    and triggers the analysis background task.
+    and queues the analysis jobs.
     """
-    # Pass background_tasks to the storage function
-    success = await finalize_live_meeting(meeting_id=meeting_id, background_tasks=background_tasks)
+    success = await finalize_live_meeting(meeting_id=meeting_id)
     if not success:
         # Could be due to not finding the meeting_id, it wasn't in 'recording_live' status, or analysis task failed to enqueue
         raise HTTPException(
             status_code=404,
             detail=f"Meeting with id '{meeting_id}' not found in 'recording_live' status or finalization failed."
         )
+    # The recording is over; drop its overlap audio and text context
+    discard_live_transcript(meeting_id)
 
     return {"message": f"Live meeting {meeting_id} finalized successfully."}
 
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse # Added PlainTextResponse
+from fastapi import APIRouter, HTTPException, Query, Header, Request
+from fastapi.responses import Response, JSONResponse, FileResponse, PlainTextResponse, StreamingResponse # Added PlainTextResponse
+from typing import List, Optional
+import datetime
+import hashlib
 # Import specific functions from the new storage modules and pdf generator module
 from ..services.pdf.generator import create_report # Updated PDF import
-from ..services.storage.meeting import get_all_meeting_data, get_meeting_data
+from ..services.storage.meeting import get_meeting_list_page, get_meeting_data, get_meeting_json
 # Import get_transcript for optimized retrieval
 from ..services.storage.transcript import get_transcript
-from ..services.storage.search import search_transcripts
-import json # For potential pretty printing in JSON export
+from ..services.storage.search import search_transcripts, get_search_result_meetings
+from ..services import rag_service
+# Responses are encoded once, with stored JSON columns spliced in as-is
+from ..services.storage.serializer import dumps
+# Bulk NDJSON export/import
+from ..services.storage.export import parse_export_fields, stream_meetings_ndjson, import_meetings_ndjson
 
 router = APIRouter(
     # Prefix can remain /transcript or be changed, e.g., /meetings
@@ -16,14 +23,32 @@ router = APIRouter(
 
 # Add endpoint to list all meetings
 @router.get("/")
-async def list_all_meetings():
-    """ 
-    Retrieves a list of all processed meetings from the database.
-    Note: This might become slow with many meetings; consider pagination.
+async def list_all_meetings(
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of meetings to return"),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    if_none_match: Optional[str] = Header(None)
+):
     """
-    # Need a new function in storage.py to get all meetings
-    all_meetings = await get_all_meeting_data() # Updated call
-    return JSONResponse(content=all_meetings)
+    Retrieves one page of meetings, newest first.
+
+    Each item carries id, filename, status, upload_time, languages and summary_excerpt
+    (the start of the summary); use /meetings/summary/{job_id} for the full record. The cursor for the next page is
+    returned in the X-Next-Cursor header (absent on the last page). Responses carry an
+    ETag, and a request with a matching If-None-Match gets an empty 304.
+    """
+    try:
+        meetings, next_cursor = await get_meeting_list_page(limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    body = dumps(meetings)
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.get("/summary/{job_id}")
@@ -31,13 +56,13 @@ async def get_summary_details(job_id: str):
     """
     Retrieves the summary, action items, and decisions for a given job ID.
     """
-    meeting_data = await get_meeting_data(job_id) # Updated call
-    if not meeting_data:
+    meeting_json = await get_meeting_json(job_id)
+    if meeting_json is None:
         raise HTTPException(status_code=404, detail=f"Meeting data not found for job ID: {job_id}")
 
     # Return the full meeting data object, as the frontend now expects it
-    # FastAPI will automatically serialize the dictionary (including status, filename, timestamp etc.)
-    return JSONResponse(content=meeting_data)
+    # The body is already encoded JSON; sent as-is
+    return Response(content=meeting_json, media_type="application/json")
 
 
 @router.get("/transcript/{job_id}")
@@ -56,32 +81,76 @@ async def get_full_transcript(job_id: str):
              # Meeting exists, but transcript might be empty or null in DB
              transcript_text = "" # Return empty string if meeting exists but transcript doesn't
 
-    return JSONResponse(content={
+    return Response(content=dumps({
         "job_id": job_id,
         "transcript": transcript_text
-    })
+    }), media_type="application/json")
 
 # Note: Implemented as a global search, not per-ID search.
 @router.get("/search/")
-async def search_meeting_transcripts(query: str = Query(..., min_length=1)):
+async def search_meeting_transcripts(
+    query: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results to return"),
+    offset: int = Query(0, ge=0, description="Number of results to skip")
+):
     """
-    Searches across all transcripts using the provided query.
-    Returns a list of matching meeting records.
+    Searches titles, summaries, transcripts, action items and decisions of all meetings.
+    Returns BM25-ranked results (best first), each with a highlighted snippet, one page at a time.
     """
     if not query:
         raise HTTPException(status_code=400, detail="Search query cannot be empty.")
 
-    search_results = await search_transcripts(query) # Updated call
+    search_results = await search_transcripts(query, limit=limit, offset=offset) # Updated call
+    results = search_results["results"]
 
-    if not search_results:
-        return JSONResponse(content={"message": "No matching transcripts found.", "results": []})
+    if not results:
+        return Response(content=dumps({"message": "No matching transcripts found.", "query": query, "results": [],
+                                       "total": search_results["total"], "limit": limit, "offset": offset}),
+                        media_type="application/json")
 
     # Ensure each result has a filename field
-    for result in search_results:
+    for result in results:
         if 'filename' not in result or not result['filename']:
-            result['filename'] = result.get('job_id', 'Unknown File')
+            result['filename'] = result.get('id', 'Unknown File')
+
+    return Response(content=dumps({
+        "query": query,
+        "results": results,
+        "total": search_results["total"],
+        "limit": limit,
+        "offset": offset
+    }), media_type="application/json")
 
-    return JSONResponse(content={"query": query, "results": search_results})
+
+@router.get("/search/semantic")
+async def semantic_search_meetings(
+    query: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of meetings to return"),
+    hits_per_meeting: int = Query(3, ge=1, le=10, description="Maximum number of passages per meeting"),
+    meeting_id: Optional[List[str]] = Query(None, description="Only search these meetings (repeatable)")
+):
+    """
+    Searches the meaning of all transcripts (not just their words) with one vector query.
+    Returns meetings ranked by their best-matching passage, each with its passages
+    (text, score, start_time/end_time in seconds, language) best first.
+    """
+    if rag_service.RAG_INDEX_MODE != "shared":
+        raise HTTPException(status_code=400, detail="Semantic search needs RAG_INDEX_MODE=shared.")
+    try:
+        groups = await rag_service.semantic_search(query, limit=limit, hits_per_meeting=hits_per_meeting, meeting_ids=meeting_id)
+    except Exception as e:
+        print(f"Error during semantic search: {e}")
+        raise HTTPException(status_code=503, detail="Semantic search is unavailable.")
+
+    meetings = await get_search_result_meetings([group["meeting_id"] for group in groups])
+    results = []
+    for group in groups:
+        meeting = meetings.get(group["meeting_id"])
+        if meeting is None:
+            continue # Deleted since it was indexed
+        results.append({**meeting, "score": group["score"], "hits": group["hits"]})
+
+    return Response(content=dumps({"query": query, "results": results}), media_type="application/json")
 
 
 @router.get("/pdf/{job_id}", response_class=FileResponse)
@@ -113,12 +182,12 @@ async def get_json_export(job_id: str):
     """
     Returns all meeting data (transcript, summary, actions, decisions) as a JSON object.
     """
-    meeting_data = await get_meeting_data(job_id) # Updated call
-    if not meeting_data:
+    meeting_json = await get_meeting_json(job_id)
+    if meeting_json is None:
         raise HTTPException(status_code=404, detail=f"Meeting data not found for job ID: {job_id}")
 
-    # Return the raw dictionary, FastAPI handles JSON serialization
-    return JSONResponse(content=meeting_data)
+    # The body is already encoded JSON; sent as-is
+    return Response(content=meeting_json, media_type="application/json")
 
 
 @router.get("/txt/{job_id}", response_class=PlainTextResponse)
@@ -158,3 +227,44 @@ async def get_txt_export(job_id: str):
     # Return as plain text, potentially suggest filename for download
     headers = {'Content-Disposition': f'attachment; filename="meeting_{job_id}_report.txt"'}
     return PlainTextResponse(content=output_text, headers=headers)
+
+
+@router.get("/export")
+async def export_meetings(
+    uploaded_after: Optional[datetime.datetime] = Query(None, description="Only meetings uploaded at or after this time (ISO 8601)"),
+    uploaded_before: Optional[datetime.datetime] = Query(None, description="Only meetings uploaded before this time (ISO 8601)"),
+    status: Optional[List[str]] = Query(None, description="Only meetings with this status; repeat for several"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to include (id is always included); default all")
+):
+    """
+    Streams meetings as NDJSON, one meeting per line, oldest first.
+    Each line has the shape of /meetings/json/{job_id}. Memory use does not grow with
+    the number of meetings, so this is suitable for backups and analytics feeds.
+    """
+    try:
+        selected_fields = parse_export_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {'Content-Disposition': 'attachment; filename="meetings.ndjson"'}
+    return StreamingResponse(
+        stream_meetings_ndjson(selected_fields, uploaded_after=uploaded_after, uploaded_before=uploaded_before, statuses=status),
+        media_type="application/x-ndjson",
+        headers=headers
+    )
+
+
+@router.post("/import")
+async def import_meetings(
+    request: Request,
+    on_conflict: str = Query("skip", description="What to do with meetings that already exist: skip or replace")
+):
+    """
+    Imports meetings from an NDJSON body in the /meetings/export format.
+    The body is read as it arrives and inserted in batched transactions.
+    Returns counts of imported, replaced, skipped and failed meetings, with the first errors.
+    """
+    if on_conflict not in ("skip", "replace"):
+        raise HTTPException(status_code=400, detail="on_conflict must be 'skip' or 'replace'.")
+    summary = await import_meetings_ndjson(request.stream(), on_conflict=on_conflict)
+    return Response(content=dumps(summary), media_type="application/json")
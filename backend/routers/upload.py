@@ -1,20 +1,24 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks, status, Path # Import Path
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status, Path # Import Path
 from fastapi.responses import JSONResponse
 import shutil
 import os
 import uuid
+import glob
+import asyncio
 import datetime
-from typing import Annotated # Import Annotated
-from fastapi import BackgroundTasks # Ensure BackgroundTasks is imported if not already
+from typing import Annotated, Optional # Import Annotated
 # Import the specific storage functions needed from the new structure
-from ..services import asr, summarizer, rag_service
-from ..services.storage.meeting import create_initial_meeting
-from ..services.storage.transcript import update_asr_result, append_live_transcript_segment # Import new function
+from ..services import audio_pipeline, summarizer, rag_service
+from ..services.live_session import get_live_transcript, discard_live_transcript, publish_live_segment
+from ..services.storage.meeting import create_initial_meeting, get_meeting_data, set_meeting_status
+from ..services.storage.transcript import update_asr_result
 from ..services.storage.analysis import update_analysis_results
 # Import the WebSocket manager
 from ..utils.websocket_manager import manager
-# Import tasks from the new location
-from ..services.tasks import run_asr_task, run_analysis_task
+from ..utils.file_operations import copy_file_with_sha256, sha256_file
+# Processing runs as durable background jobs
+from ..services.job_queue import job_queue, STAGE_ASR
+from ..services.asr_scheduler import PRIORITY_INTERACTIVE
 
 # Define the directory to save uploads
 UPLOAD_DIRECTORY = "uploads"
@@ -64,42 +68,20 @@ async def transcribe_chunk_endpoint(
         transcript_text = None
         try:
             print(f"Transcribing chunk: {chunk_filepath}")
-            # Use existing ASR service - assuming it works for chunks or we adapt it later
-            asr_result = await asr.transcribe_audio(chunk_filepath)
-            transcript_text = asr_result.get("transcript", "").strip() # Get text, default to empty, strip whitespace
+            loop = asyncio.get_running_loop()
+            audio = await loop.run_in_executor(None, audio_pipeline.decode_audio, chunk_filepath)
+            # Chunk 1 starts a new recording; later chunks continue the meeting's running
+            # transcript, overlapping the previous chunk and deduplicating repeated words
+            if chunk_index == 1:
+                discard_live_transcript(meeting_id)
+            committed = await get_live_transcript(meeting_id).commit(audio)
+            transcript_text = committed["text"]
             print(f"Chunk transcription result for {meeting_id} (Index: {chunk_index}): {transcript_text}")
 
-            if transcript_text: # Only broadcast if we got text
-                # Calculate timestamps (assuming 5-second chunks)
-                # TODO: Get actual chunk duration from config or constant
-                chunk_duration = 5
-                start_time = (chunk_index - 1) * chunk_duration
-                end_time = chunk_index * chunk_duration
-
-                # Format segment data (matching frontend TranscriptSegment structure)
-                segment_data = {
-                    "id": f"{meeting_id}-live-{chunk_index}", # Generate a unique ID
-                    "speakerId": "live_system", # Placeholder speaker
-                    "speakerName": "System Audio", # Placeholder name
-                    "startTime": start_time,
-                    "endTime": end_time,
-                    "text": transcript_text,
-                    "language": asr_result.get("languages", ["unknown"])[0] if asr_result.get("languages") else "unknown" # Get first detected language
-                }
-
-                # Broadcast via WebSocket
-                await manager.broadcast({
-                    "type": "transcript_update",
-                    "payload": {
-                        "meetingId": meeting_id,
-                        "segment": segment_data
-                    }
-                })
+            # Broadcasts transcript_update and persists the segment (only if we got text)
+            if await publish_live_segment(meeting_id, committed):
                 print(f"Broadcasted transcript update for meeting {meeting_id}, chunk {chunk_index}")
 
-                # Persist the segment to the database
-                await append_live_transcript_segment(meeting_id, segment_data)
-
         except Exception as asr_error:
             print(f"Error transcribing chunk {chunk_filepath}: {asr_error}")
             # Decide if we should raise HTTPException or just log
@@ -131,7 +113,7 @@ async def transcribe_chunk_endpoint(
 
 
 @router.post("/upload-audio")
-async def upload_audio(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def upload_audio(file: UploadFile = File(...)):
     """
     Handles audio file uploads (.wav, .mp3, .m4a).
     Saves the file with a UUID filename and returns a job ID.
@@ -151,10 +133,9 @@ async def upload_audio(background_tasks: BackgroundTasks, file: UploadFile = Fil
     file_location = os.path.join(UPLOAD_DIRECTORY, new_filename)
 
     try:
-        # Save the uploaded file
-        with open(file_location, "wb+") as file_object:
-              shutil.copyfileobj(file.file, file_object)
-        print(f"File saved to: {file_location}")
+        # Save the uploaded file, hashing it on the way for the ASR result cache
+        audio_sha256 = copy_file_with_sha256(file.file, file_location)
+        print(f"File saved to: {file_location} (sha256: {audio_sha256})")
 
         # --- Create Initial Meeting Record ---
         initial_meeting_data = await create_initial_meeting(job_id=job_id, filename=original_filename)
@@ -168,10 +149,14 @@ async def upload_audio(background_tasks: BackgroundTasks, file: UploadFile = Fil
         print(f"Initial meeting record created for job_id: {job_id}")
         # ------------------------------------
 
-        # Add the ASR processing job to background tasks
-        # Pass background_tasks instance itself to the ASR task so it can enqueue the next one
-        background_tasks.add_task(run_asr_task, background_tasks, file_location, job_id)
-        print(f"Added ASR background task for job_id: {job_id} with original filename: {original_filename}")
+        # Queue the ASR job; it enqueues the analysis jobs when it finishes
+        asr_job = await job_queue.enqueue(STAGE_ASR, job_id, {"file_path": file_location, "audio_sha256": audio_sha256})
+        if not asr_job:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to queue the transcription job."
+            )
+        print(f"Queued ASR job {asr_job['id']} for job_id: {job_id} with original filename: {original_filename}")
 
         # Return immediately with 201 Created and the initial meeting data (status: processing_asr)
         return JSONResponse(status_code=status.HTTP_201_CREATED, content=initial_meeting_data)
@@ -183,3 +168,44 @@ async def upload_audio(background_tasks: BackgroundTasks, file: UploadFile = Fil
         # Log the exception in a real app
         print(f"An unexpected error occurred: {e}")
         raise HTTPException(status_code=500, detail="An internal server error occurred during file upload.")
+
+
+
+@router.post("/retranscribe/{job_id}")
+async def retranscribe_audio(
+    job_id: Annotated[str, Path(description="The job ID of a previously uploaded meeting.")],
+    language: Optional[str] = None
+):
+    """
+    Re-runs transcription (and analysis) for an uploaded meeting, optionally forcing a language.
+    Runs at interactive priority, ahead of queued bulk uploads. The model always runs
+    (a cached transcript of the same audio is replaced, not reused).
+    """
+    # Uploads are stored as <job_id><ext>
+    matches = [path for path in glob.glob(os.path.join(UPLOAD_DIRECTORY, f"{job_id}.*"))
+               if os.path.splitext(path)[1].lower() in ALLOWED_EXTENSIONS]
+    if not matches:
+        raise HTTPException(status_code=404, detail=f"No uploaded audio found for job ID: {job_id}")
+    file_location = matches[0]
+
+    if not await set_meeting_status(job_id, 'processing_asr'):
+        raise HTTPException(status_code=404, detail=f"Meeting not found for job ID: {job_id}")
+
+    loop = asyncio.get_running_loop()
+    audio_sha256 = await loop.run_in_executor(None, sha256_file, file_location)
+    asr_job = await job_queue.enqueue(STAGE_ASR, job_id, {
+        "file_path": file_location,
+        "audio_sha256": audio_sha256,
+        "language": language,
+        "bypass_cache": True,
+    }, priority=PRIORITY_INTERACTIVE)
+    if not asr_job:
+        raise HTTPException(status_code=500, detail="Failed to queue the transcription job.")
+
+    meeting_data = await get_meeting_data(job_id)
+    if meeting_data:
+        await manager.broadcast({
+            "type": "meeting_updated",
+            "payload": meeting_data
+        })
+    return {"message": f"Re-transcription queued for job ID: {job_id}", "job": asr_job}
@@ -1,140 +1,349 @@
-import json # For saving language list later if needed elsewhere
+import asyncio
+import multiprocessing
 import os
-import whisper # Use the actual library
-import torch # Whisper uses PyTorch
+import re
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict, Any, Optional, List # Add List
-import pathlib # Import pathlib for robust path handling
-import numpy as np # Whisper uses numpy
+import numpy as np
+from . import audio_pipeline, asr_backends, model_client, resources
+from .asr_scheduler import ASRScheduler, PRIORITY_LIVE, PRIORITY_BULK
 
-WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL_NAME", "base")
-ASR_DEVICE = os.getenv("ASR_DEVICE", "cuda" if torch.cuda.is_available() else "cpu")
+# Languages above this probability are reported in the meeting's language list
+LANGUAGE_DETECTION_THRESHOLD = 0.10
+# Number of ASR worker processes. Each worker loads its own copy of the model.
+ASR_WORKERS = max(1, int(os.getenv("ASR_WORKERS", "1")))
+# Workers kept free for live chunks (only when there is more than one worker)
+ASR_LIVE_RESERVED_WORKERS = int(os.getenv("ASR_LIVE_RESERVED_WORKERS", "1" if ASR_WORKERS > 1 else "0"))
+# Audio longer than this is split at silences and its windows transcribed in parallel
+ASR_LONG_AUDIO_SECONDS = float(os.getenv("ASR_LONG_AUDIO_SECONDS", "120"))
+# Upper bound on the length of each long-audio window. Windows are also the points
+# where bulk work yields to live chunks, so this bounds how long live captions can wait.
+ASR_WINDOW_SECONDS = float(os.getenv("ASR_WINDOW_SECONDS", "60"))
+# Repeated text this close to a window boundary is treated as a duplicate
+BOUNDARY_DEDUPE_SECONDS = 1.0
 
-_whisper_model = None
-try:
-    print(f"Loading Whisper model '{WHISPER_MODEL_NAME}' onto device '{ASR_DEVICE}'...")
-    _whisper_model = whisper.load_model(WHISPER_MODEL_NAME, device=ASR_DEVICE)
-    print("Whisper model loaded successfully.")
-except Exception as e:
-    print(f"Error loading Whisper model '{WHISPER_MODEL_NAME}': {e}")
+# Loaded once per ASR worker process by _init_worker(); never loaded in the API process.
+_backend: Optional[asr_backends.ASRBackend] = None
+_backend_load_seconds: Optional[float] = None
+# Process pool owned by the API process, created lazily on first use.
+_asr_pool: Optional[ProcessPoolExecutor] = None
+# The pool may be requested from the warm-up thread and the event loop at the same time
+_asr_pool_lock = threading.Lock()
 
-async def transcribe_audio(file_path: str, language: Optional[str] = None) -> Dict[str, Any]:
+
+def _init_worker():
+    """Initializer for ASR worker processes: loads the configured ASR backend into this process."""
+    global _backend, _backend_load_seconds
+    try:
+        backend = asr_backends.create_backend()
+        print(f"[ASR Worker {os.getpid()}] Loading {backend.name} model '{backend.model_name}' onto device '{backend.device}'...")
+        started = time.perf_counter()
+        backend.load()
+        _backend = backend
+        _backend_load_seconds = round(time.perf_counter() - started, 3)
+        print(f"[ASR Worker {os.getpid()}] {backend.name} model loaded on '{backend.device}' in {_backend_load_seconds:.2f}s.")
+    except Exception as e:
+        print(f"[ASR Worker {os.getpid()}] Error loading ASR backend '{asr_backends.ASR_BACKEND}': {e}")
+
+
+def get_asr_pool() -> ProcessPoolExecutor:
+    """Returns the shared ASR process pool, creating it on first use."""
+    global _asr_pool
+    with _asr_pool_lock:
+        if _asr_pool is None:
+            print(f"Starting ASR process pool with {ASR_WORKERS} worker(s)...")
+            # 'spawn' avoids forking a process that already holds torch/CUDA state
+            _asr_pool = ProcessPoolExecutor(
+                max_workers=ASR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _asr_pool
+
+
+def _worker_status() -> Dict[str, Any]:
+    """Runs in a worker: whether its backend loaded, and how long that took."""
+    return {"pid": os.getpid(), "loaded": _backend is not None, "load_seconds": _backend_load_seconds}
+
+
+def warm_up_asr_pool() -> List[Dict[str, Any]]:
     """
-    Transcribes the audio file using the loaded Whisper model.
+    Starts the worker processes and blocks until their models are loaded, so the first
+    transcription doesn't pay for it. Called from the startup warm-up, in a thread.
+    Bypasses the scheduler: the probes are tiny and run before any real work arrives.
+    Raises RuntimeError if no worker could load the model.
+    """
+    # The pool starts workers on demand, so one probe per worker brings them all up
+    statuses = [future.result() for future in [_submit_to_pool(_worker_status) for _ in range(ASR_WORKERS)]]
+    loaded = [status for status in statuses if status["loaded"]]
+    if not loaded:
+        raise RuntimeError(f"No ASR worker could load the '{asr_backends.ASR_BACKEND}' backend")
+    print("ASR workers ready: " + ", ".join(f"pid {s['pid']} ({s['load_seconds']}s)" for s in loaded))
+    return statuses
+
+
+def _load_asr_workers():
+    # With a model server, the model lives there and this process never starts a pool
+    if model_client.enabled():
+        return model_client.wait_until_ready()
+    return warm_up_asr_pool()
+
+
+# Loaded by the startup warm-up; the pool itself still starts on first use without it
+asr_workers = resources.register("asr_workers", _load_asr_workers)
+
+
+def shutdown_asr_pool():
+    """Stops the ASR worker processes. Called on application shutdown."""
+    global _asr_pool
+    with _asr_pool_lock:
+        if _asr_pool is not None:
+            print("Shutting down ASR process pool...")
+            _asr_pool.shutdown(wait=False, cancel_futures=True)
+            _asr_pool = None
+
+
+def cache_options(language: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Everything besides the audio itself that determines the ASR output.
+    Used to key cached results, so a config change never serves stale transcripts.
+    """
+    return {
+        **asr_backends.create_backend().options(),
+        "language": language,
+        "long_audio_seconds": ASR_LONG_AUDIO_SECONDS,
+        "window_seconds": ASR_WINDOW_SECONDS,
+    }
+
+
+def _submit_to_pool(fn, *args) -> Future:
+    """Runs fn(*args) on the worker pool, restarting the pool once if it is broken."""
+    try:
+        return get_asr_pool().submit(fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM while loading the model); start a fresh pool and retry once
+        print("Warning: ASR process pool is broken. Restarting it.")
+        shutdown_asr_pool()
+        return get_asr_pool().submit(fn, *args)
+
+
+# Every ASR job goes through the scheduler, which decides what the pool runs next
+_scheduler = ASRScheduler(ASR_WORKERS, _submit_to_pool, reserved_live_workers=ASR_LIVE_RESERVED_WORKERS)
+
+
+def get_scheduler_metrics() -> Dict[str, Any]:
+    """Queue depth and queue wait times per priority class."""
+    return _scheduler.metrics()
+
+
+def _submit_window(audio: np.ndarray, language: Optional[str], priority: int, initial_prompt: Optional[str] = None) -> asyncio.Future:
+    """Queues one decoded buffer for transcription at the given priority (on the model server, if configured)."""
+    if model_client.enabled():
+        return asyncio.ensure_future(model_client.transcribe(audio, language, initial_prompt, priority))
+    return _scheduler.submit(_transcribe_array_sync, audio, language, initial_prompt, priority=priority)
+
+
+def submit_shared_window(shm_name: str, samples: int, language: Optional[str], priority: int,
+                         initial_prompt: Optional[str] = None) -> asyncio.Future:
+    """
+    Queues a buffer held in a shared memory block (created by a model server client).
+    The ASR worker reads the samples straight from the block, so the audio is never
+    copied through the socket or the pool's pipe.
+    """
+    return _scheduler.submit(_transcribe_shared_sync, shm_name, samples, language, initial_prompt, priority=priority)
+
+
+async def _transcribe_file(file_path: str, language: Optional[str], priority: int) -> Dict[str, Any]:
+    """Decodes file_path once, then transcribes it as one job or as parallel windows."""
+    loop = asyncio.get_running_loop()
+    # ffmpeg runs in a thread so decoding doesn't block the event loop either
+    audio = await loop.run_in_executor(None, audio_pipeline.decode_audio, file_path)
+    duration = audio_pipeline.duration_seconds(audio)
+    print(f"Decoded {duration:.1f}s of audio from: {file_path}")
+
+    if duration <= ASR_LONG_AUDIO_SECONDS:
+        return await _submit_window(audio, language, priority)
+
+    # Long-audio mode: split at silences and transcribe the windows in parallel.
+    # Each window is a separate scheduler item, so live chunks can run in between.
+    windows = audio_pipeline.split_on_silence(audio, max_window_seconds=ASR_WINDOW_SECONDS)
+    print(f"Long audio ({duration:.1f}s): transcribing {len(windows)} windows across {ASR_WORKERS} worker(s)")
+    window_results = await asyncio.gather(*[
+        _submit_window(audio[start:end], language, priority) for start, end in windows
+    ])
+    offsets = [start / audio_pipeline.SAMPLE_RATE for start, _ in windows]
+    ends = [end / audio_pipeline.SAMPLE_RATE for _, end in windows]
+    return _stitch_window_results(window_results, offsets, ends)
+
+
+def submit_transcription(file_path: str, language: Optional[str] = None, priority: int = PRIORITY_BULK) -> asyncio.Future:
+    """
+    Schedules transcription of file_path on the ASR worker pool.
+    priority is one of PRIORITY_LIVE, PRIORITY_INTERACTIVE or PRIORITY_BULK.
+
+    Returns an asyncio future resolving to the same dictionary as transcribe_audio().
+    The future raises if decoding or transcription fails.
+    Must be called from within the running event loop.
+    """
+    return asyncio.ensure_future(_transcribe_file(file_path, language, priority))
+
+
+async def transcribe_audio(file_path: str, language: Optional[str] = None, priority: int = PRIORITY_BULK) -> Dict[str, Any]:
+    """
+    Transcribes the audio file on the ASR worker pool without blocking the event loop.
 
     Args:
         file_path: The path to the audio file.
         language: The language code (e.g., 'en', 'zh'). Auto-detect if None.
+        priority: Scheduling class; live chunks run before interactive and bulk work.
 
     Returns:
         A dictionary containing:
         - transcript: The full transcribed text.
         - languages: List of detected language codes (ISO 639-1).
-        - language_probabilities: Dictionary of detected languages and their probabilities.
         - segments: List of segments with timestamps (if available).
-        - diarization: Placeholder.
-        - timestamps: Placeholder.
     """
-    if not _whisper_model:
-        print("Error: Whisper model is not loaded.")
+    try:
+        return await submit_transcription(file_path, language, priority)
+    except Exception as e:
+        print(f"Error during ASR processing for {file_path}: {e}")
         return {
-            "transcript": "Error: ASR model not available.",
-            "languages": [], # Return empty list for languages
-            "language_probabilities": {},
+            "transcript": f"Error during processing: {e}",
+            "languages": [],
             "segments": []
-            # Removed diarization and timestamps placeholders
         }
 
-    print(f"Starting Whisper processing for: {file_path}")
-    transcript = "Transcription failed."
-    detected_languages: List[str] = [] # Initialize as list
-    segments = []
-    diarization = []
-    timestamps = []
-    language_probabilities: Dict[str, float] = {} # Store probabilities
 
-    try:
-        absolute_file_path = str(pathlib.Path(file_path).resolve())
-        print(f"Processing audio file: {absolute_file_path}")
+async def transcribe_array(
+    audio: np.ndarray,
+    language: Optional[str] = None,
+    priority: int = PRIORITY_LIVE,
+    initial_prompt: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Transcribes an in-memory 16 kHz mono float32 buffer on the ASR worker pool.
+    Used by live sessions, which pass the preceding text as initial_prompt.
+
+    Returns the same dictionary as transcribe_audio(), with buffer-relative timestamps.
+    Raises if transcription fails.
+    """
+    return await _submit_window(audio, language, priority, initial_prompt)
+
+
+def _normalize_text(text: str) -> str:
+    """Lower-cases and strips punctuation so near-identical segments compare equal."""
+    return re.sub(r"[^\w\s]", "", text).lower().strip()
+
+
+def _stitch_window_results(window_results: List[Dict[str, Any]], offsets: List[float], ends: List[float]) -> Dict[str, Any]:
+    """
+    Merges per-window ASR results into one result with global timestamps.
+
+    Segment times are shifted by each window's offset and clamped to the window,
+    and a segment repeating the previous one's text right at a window boundary
+    (a common Whisper artefact at cut points) is dropped.
+    """
+    segments: List[Dict[str, Any]] = []
+    languages: List[str] = []
+    for result, offset, window_end in zip(window_results, offsets, ends):
+        for lang in result.get("languages", []):
+            if lang not in languages:
+                languages.append(lang)
+        for seg in result.get("segments", []):
+            text = seg.get("text", "").strip()
+            if not text:
+                continue
+            start = min(seg["start"] + offset, window_end)
+            end = min(seg["end"] + offset, window_end)
+            if segments:
+                previous = segments[-1]
+                if (start - previous["end"] <= BOUNDARY_DEDUPE_SECONDS
+                        and _normalize_text(text) == _normalize_text(previous["text"])):
+                    previous["end"] = max(previous["end"], end)
+                    continue
+            stitched = dict(seg)
+            stitched.update({
+                "id": len(segments),
+                "start": start,
+                "end": end,
+            })
+            segments.append(stitched)
+
+    return {
+        "transcript": "\n".join([seg["text"].strip() for seg in segments]).strip(),
+        "languages": languages,
+        "segments": segments
+    }
+
+def _select_languages(probs: Dict[str, float]) -> List[str]:
+    """
+    Picks the languages to report from detection probabilities.
 
-        # 1. Detect Language Probabilities
+    Returns the languages above LANGUAGE_DETECTION_THRESHOLD, most probable first,
+    or just the top language if none clears the threshold.
+    """
+    if not probs:
+        return []
+    ranked = sorted(probs, key=probs.get, reverse=True)
+    detected_languages = [lang for lang in ranked if probs[lang] > LANGUAGE_DETECTION_THRESHOLD]
+    # Ensure at least the top language is included if list is empty after thresholding
+    if not detected_languages:
+        detected_languages = ranked[:1]
+        print(f"No language above threshold, using top language: {ranked[0]}")
+    return detected_languages
+
+
+def _transcribe_shared_sync(shm_name: str, samples: int, language: Optional[str] = None,
+                            initial_prompt: Optional[str] = None) -> Dict[str, Any]:
+    """_transcribe_array_sync on float32 samples read in place from a shared memory block."""
+    block = model_client.attach_shared_memory(shm_name)
+    try:
+        audio = np.ndarray((samples,), dtype=np.float32, buffer=block.buf)
+        result = _transcribe_array_sync(audio, language, initial_prompt)
+        del audio
+        return result
+    finally:
         try:
-            # Load audio and create Mel spectrogram
-            # Ensure the model is available before proceeding
-            if not _whisper_model:
-                 raise Exception("Whisper model not loaded.")
-
-            audio = whisper.load_audio(absolute_file_path)
-            audio = whisper.pad_or_trim(audio)
-            mel = whisper.log_mel_spectrogram(audio).to(_whisper_model.device)
-
-            # Detect language
-            _, probs = _whisper_model.detect_language(mel)
-            language_probabilities = probs
-            print(f"Detected language probabilities: {probs}")
-
-            # Filter languages above a threshold (e.g., 10%)
-            detection_threshold = 0.10
-            detected_languages = [lang for lang, prob in probs.items() if prob > detection_threshold]
-
-            # Ensure at least the top language is included if list is empty after thresholding
-            if not detected_languages and probs:
-                 top_lang = max(probs, key=probs.get)
-                 detected_languages.append(top_lang)
-                 print(f"No language above threshold, using top language: {top_lang}")
-            elif not detected_languages:
-                 # If detection returned no probabilities at all
-                 print("Warning: Language detection returned no probabilities.")
-                 detected_languages = [] # Keep empty, let transcription try detection
-
-            print(f"Selected languages (>{detection_threshold*100}% probability): {detected_languages}")
-
-        except Exception as lang_detect_e:
-            print(f"Warning: Language detection phase failed for {file_path}: {lang_detect_e}")
-            # Fallback if detection fails - let transcription try to detect
-            detected_languages = [] # Reset, let transcription try
-
-        # 2. Perform Transcription
-        # Use language=None for auto-detection during transcription
-        options = whisper.DecodingOptions(
-            language=None, # Let Whisper detect based on content
-            fp16=(ASR_DEVICE == "cuda"),
-            # without_timestamps=True, # Consider if timestamps aren't needed elsewhere
-        )
-        print(f"Starting transcription with options: language=None, fp16={options.fp16}")
-        result = _whisper_model.transcribe(absolute_file_path, **options.__dict__)
-
-        # Extract results
-        transcript_segments = result.get("segments", [])
-        # Join segments ensuring no double newlines and stripping whitespace
-        transcript = "\n".join([seg["text"].strip() for seg in transcript_segments]).strip()
-        segments = transcript_segments # Contains start, end, text per segment
-
-        # If language detection failed earlier or yielded no results, use transcription's result
-        if not detected_languages:
-             transcription_lang = result.get("language")
-             if transcription_lang:
-                 detected_languages = [transcription_lang]
-                 print(f"Using language detected during transcription: {transcription_lang}")
-             else:
-                 detected_languages = ['en'] # Final fallback
-                 print("Warning: Could not detect language via detection or transcription. Defaulting to 'en'.")
-
-        print(f"Whisper processing complete. Final detected languages: {detected_languages}")
+            block.close()
+        except BufferError:
+            pass # A lingering view from the backend; the mapping is released when it's collected
 
-    except Exception as e:
-        print(f"Error during Whisper processing for {file_path}: {e}")
-        transcript = f"Error during processing: {e}"
-        # Reset other fields on error
-        detected_languages = []
-        segments = []
-        # diarization = [] # Removed placeholder
-        # timestamps = [] # Removed placeholder
-        language_probabilities = {}
 
+def _transcribe_array_sync(audio: np.ndarray, language: Optional[str] = None, initial_prompt: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Transcribes an already decoded 16 kHz buffer using this worker's ASR backend.
+    Runs inside an ASR worker process; blocks until transcription is done.
+
+    Args:
+        audio: Mono float32 samples at audio_pipeline.SAMPLE_RATE.
+        language: The language code (e.g., 'en', 'zh'). Detection is skipped when given.
+        initial_prompt: Optional preceding text to condition the decoder on.
+
+    Returns:
+        The same dictionary as transcribe_audio(), with buffer-relative timestamps.
+
+    Raises:
+        RuntimeError: If the model is not loaded in this worker.
+    """
+    if not _backend:
+        raise RuntimeError("ASR model not available.")
+
+    print(f"Starting {_backend.name} transcription of {audio_pipeline.duration_seconds(audio):.1f}s (language={language})")
+    segments, probs = _backend.transcribe(audio, language=language, initial_prompt=initial_prompt)
+    # Join segments ensuring no double newlines and stripping whitespace
+    transcript = "\n".join([seg["text"].strip() for seg in segments]).strip()
+
+    detected_languages = [language] if language else _select_languages(probs)
+    if not detected_languages:
+        detected_languages = ['en'] # Final fallback
+        print("Warning: Could not detect language via detection or transcription. Defaulting to 'en'.")
+
+    print(f"ASR processing complete. Final detected languages: {detected_languages}")
     return {
         "transcript": transcript,
         "languages": detected_languages, # Return list of languages
-        # "language_probabilities": language_probabilities, #Optionally return probs for debugging/info
         "segments": segments
-        # Removed diarization and timestamps placeholders
     }
@@ -0,0 +1,175 @@
+# Pluggable ASR engines.
+# A backend runs inside an ASR worker process and turns a decoded 16 kHz float32
+# buffer into language probabilities and a list of timestamped segments.
+# Select one with ASR_BACKEND=whisper (openai-whisper, default) or
+# ASR_BACKEND=faster-whisper (CTranslate2, int8-quantized on CPU by default).
+
+import dataclasses
+import os
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+
+ASR_BACKEND = os.getenv("ASR_BACKEND", "whisper").lower()
+WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL_NAME", "base")
+# cpu, cuda, or auto (cuda when available)
+ASR_DEVICE = os.getenv("ASR_DEVICE", "auto").lower()
+# 1 = greedy decoding; larger values enable beam search (slower, sometimes more accurate)
+ASR_BEAM_SIZE = max(1, int(os.getenv("ASR_BEAM_SIZE", "1")))
+# CTranslate2 compute type for faster-whisper: int8, int8_float16, float16, float32
+ASR_COMPUTE_TYPE = os.getenv("ASR_COMPUTE_TYPE", "int8")
+# CPU threads per worker for faster-whisper; 0 lets CTranslate2 decide
+ASR_CPU_THREADS = int(os.getenv("ASR_CPU_THREADS", "0"))
+
+# Keys kept on every segment, so all backends return identically shaped results
+SEGMENT_KEYS = ("id", "start", "end", "text", "avg_logprob", "compression_ratio", "no_speech_prob", "temperature")
+
+
+def _normalize_segment(segment: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduces a backend-specific segment to the common SEGMENT_KEYS with plain Python types."""
+    normalized = {key: segment.get(key) for key in SEGMENT_KEYS}
+    normalized["start"] = float(normalized["start"] or 0.0)
+    normalized["end"] = float(normalized["end"] or 0.0)
+    normalized["text"] = normalized["text"] or ""
+    return normalized
+
+
+class ASRBackend:
+    """Interface implemented by every ASR engine."""
+    name = "base"
+
+    def __init__(self, model_name: str = WHISPER_MODEL_NAME, device: str = ASR_DEVICE, beam_size: int = ASR_BEAM_SIZE):
+        self.model_name = model_name
+        self.device = device
+        self.beam_size = beam_size
+
+    def load(self) -> None:
+        """Loads the model into this process. Raises if the model cannot be loaded."""
+        raise NotImplementedError
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None, initial_prompt: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+        """
+        Transcribes a decoded buffer.
+
+        Args:
+            audio: Mono float32 samples at 16 kHz.
+            language: The language code, or None to detect it from the first 30 seconds.
+            initial_prompt: Preceding text used as decoder context (live windows pass the previous text).
+
+        Returns:
+            (segments, language_probabilities). Segments carry SEGMENT_KEYS only.
+            When language is given, the probabilities are {language: 1.0}.
+        """
+        raise NotImplementedError
+
+    def options(self) -> Dict[str, Any]:
+        """Decoding options that influence the output (used to identify results)."""
+        return {"backend": self.name, "model": self.model_name, "beam_size": self.beam_size}
+
+
+class WhisperBackend(ASRBackend):
+    """openai-whisper on PyTorch."""
+    name = "whisper"
+
+    def load(self) -> None:
+        import torch
+        import whisper
+        if self.device == "auto":
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self._whisper = whisper
+        self._model = whisper.load_model(self.model_name, device=self.device)
+
+    def _detect_language(self, audio: np.ndarray) -> Dict[str, float]:
+        """Runs one encoder pass over the first 30 seconds of the buffer and returns language probabilities."""
+        whisper = self._whisper
+        mel = whisper.log_mel_spectrogram(
+            whisper.pad_or_trim(audio), self._model.dims.n_mels
+        ).to(self._model.device)
+        # detect_language() accepts encoder output directly
+        audio_features = self._model.embed_audio(mel.unsqueeze(0))
+        _, batch_probs = self._model.detect_language(audio_features)
+        return batch_probs[0]
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None, initial_prompt: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+        if language:
+            probs = {language: 1.0}
+        else:
+            try:
+                probs = self._detect_language(audio)
+            except Exception as e:
+                print(f"Warning: Language detection phase failed: {e}")
+                probs = {}
+        # Passing the detected language stops transcribe() from running its own detection pass
+        decode_language = max(probs, key=probs.get) if probs else None
+
+        options = self._whisper.DecodingOptions(
+            language=decode_language,
+            beam_size=self.beam_size if self.beam_size > 1 else None,
+            fp16=(self.device == "cuda"),
+        )
+        result = self._model.transcribe(audio, initial_prompt=initial_prompt, **options.__dict__)
+        if not probs and result.get("language"):
+            probs = {result["language"]: 1.0}
+        return [_normalize_segment(seg) for seg in result.get("segments", [])], probs
+
+    def options(self) -> Dict[str, Any]:
+        return {**super().options(), "fp16": self.device == "cuda"}
+
+
+class FasterWhisperBackend(ASRBackend):
+    """faster-whisper on CTranslate2, int8-quantized by default."""
+    name = "faster-whisper"
+
+    def __init__(self, *args, compute_type: str = ASR_COMPUTE_TYPE, cpu_threads: int = ASR_CPU_THREADS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+
+    def load(self) -> None:
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise ImportError("ASR_BACKEND=faster-whisper selected, but 'faster-whisper' is not installed. Run: pip install faster-whisper")
+        if self.device == "auto":
+            import ctranslate2
+            self.device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+        self._model = WhisperModel(
+            self.model_name,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+        )
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None, initial_prompt: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+        # Language detection happens inside transcribe() and reuses its features
+        segments_iter, info = self._model.transcribe(
+            audio, language=language, beam_size=self.beam_size, initial_prompt=initial_prompt
+        )
+        # The segment generator does the actual decoding; consume it fully
+        # Segment is a NamedTuple in older faster-whisper releases and a dataclass in newer ones
+        segments = [
+            _normalize_segment(seg._asdict() if hasattr(seg, "_asdict") else dataclasses.asdict(seg))
+            for seg in segments_iter
+        ]
+        if language:
+            probs = {language: 1.0}
+        elif info.all_language_probs:
+            probs = dict(info.all_language_probs)
+        else:
+            probs = {info.language: info.language_probability}
+        return segments, probs
+
+    def options(self) -> Dict[str, Any]:
+        return {**super().options(), "compute_type": self.compute_type}
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def create_backend(name: str = ASR_BACKEND, **kwargs) -> ASRBackend:
+    """Instantiates (but does not load) the ASR backend registered under name."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unsupported ASR_BACKEND: {name}. Choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
@@ -0,0 +1,149 @@
+# Priority scheduler in front of the ASR worker pool.
+# ProcessPoolExecutor runs work in FIFO order, so one long upload could hold every
+# worker while live captions wait. The scheduler keeps pending work in a priority
+# heap and only hands an item to the pool when a worker is free:
+#   live chunks > interactive re-runs > bulk uploads.
+# Long audio is submitted window by window, so bulk work yields to live chunks
+# between windows. A worker can also be reserved for live chunks.
+
+import asyncio
+import heapq
+import itertools
+import os
+import statistics
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+PRIORITY_LIVE = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BULK = 2
+PRIORITY_NAMES = {
+    PRIORITY_LIVE: "live",
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BULK: "bulk",
+}
+
+# Live chunks waiting longer than this are counted as missing the latency target
+ASR_LIVE_LATENCY_TARGET_MS = float(os.getenv("ASR_LIVE_LATENCY_TARGET_MS", "1000"))
+# Number of recent wait times kept per class for percentiles
+_WAIT_SAMPLES = 500
+
+
+class ASRScheduler:
+    def __init__(self, workers: int, submit: Callable[..., Future], reserved_live_workers: int = 0):
+        """
+        Args:
+            workers: Number of ASR worker processes behind `submit`.
+            submit: Callable(fn, *args) -> concurrent.futures.Future that runs fn on a worker.
+            reserved_live_workers: Workers that only ever run live chunks.
+        """
+        self.workers = workers
+        self.reserved_live_workers = min(reserved_live_workers, workers - 1)
+        self._submit = submit
+        self._heap: List[Tuple[int, int, float, Callable, tuple, asyncio.Future]] = []
+        self._sequence = itertools.count() # FIFO order within a priority class
+        self._in_flight = 0
+        self._in_flight_non_live = 0
+        self._metrics: Dict[int, Dict[str, Any]] = {
+            priority: {"submitted": 0, "completed": 0, "failed": 0, "over_target": 0,
+                       "wait_ms_max": 0.0, "waits_ms": deque(maxlen=_WAIT_SAMPLES)}
+            for priority in PRIORITY_NAMES
+        }
+
+    def submit(self, fn: Callable, *args, priority: int = PRIORITY_BULK) -> asyncio.Future:
+        """
+        Queues fn(*args) to run on an ASR worker and returns an asyncio future for its result.
+        Must be called from within the running event loop.
+        """
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._sequence), time.perf_counter(), fn, args, future))
+        self._metrics[priority]["submitted"] += 1
+        self._dispatch()
+        return future
+
+    def _can_dispatch(self, priority: int) -> bool:
+        if self._in_flight >= self.workers:
+            return False
+        if priority != PRIORITY_LIVE:
+            return self._in_flight_non_live < self.workers - self.reserved_live_workers
+        return True
+
+    def _dispatch(self):
+        """Hands the highest-priority pending items to free workers."""
+        while self._heap and self._can_dispatch(self._heap[0][0]):
+            priority, _, enqueued_at, fn, args, future = heapq.heappop(self._heap)
+            if future.cancelled():
+                continue
+            wait_ms = (time.perf_counter() - enqueued_at) * 1000
+            metrics = self._metrics[priority]
+            metrics["waits_ms"].append(wait_ms)
+            metrics["wait_ms_max"] = max(metrics["wait_ms_max"], wait_ms)
+            if priority == PRIORITY_LIVE and wait_ms > ASR_LIVE_LATENCY_TARGET_MS:
+                metrics["over_target"] += 1
+
+            self._in_flight += 1
+            if priority != PRIORITY_LIVE:
+                self._in_flight_non_live += 1
+            try:
+                worker_future = asyncio.wrap_future(self._submit(fn, *args))
+            except Exception as e:
+                self._finish(priority, future, error=e)
+                continue
+            worker_future.add_done_callback(
+                lambda done, priority=priority, future=future: self._on_worker_done(done, priority, future)
+            )
+
+    def _on_worker_done(self, done: asyncio.Future, priority: int, future: asyncio.Future):
+        if done.cancelled():
+            self._finish(priority, future, error=asyncio.CancelledError())
+        elif done.exception() is not None:
+            self._finish(priority, future, error=done.exception())
+        else:
+            self._finish(priority, future, result=done.result())
+
+    def _finish(self, priority: int, future: asyncio.Future, result: Any = None, error: BaseException = None):
+        """Releases the worker slot, resolves the caller's future and dispatches the next item."""
+        self._in_flight -= 1
+        if priority != PRIORITY_LIVE:
+            self._in_flight_non_live -= 1
+        if error is not None:
+            self._metrics[priority]["failed"] += 1
+            if not future.done():
+                future.set_exception(error)
+        else:
+            self._metrics[priority]["completed"] += 1
+            if not future.done():
+                future.set_result(result)
+        self._dispatch()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth and queue wait time (time until a worker picked the item up) per priority class."""
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for item in self._heap:
+            queued[PRIORITY_NAMES[item[0]]] += 1
+
+        classes = {}
+        for priority, name in PRIORITY_NAMES.items():
+            metrics = self._metrics[priority]
+            waits: Deque[float] = metrics["waits_ms"]
+            ordered = sorted(waits)
+            classes[name] = {
+                "queued": queued[name],
+                "submitted": metrics["submitted"],
+                "completed": metrics["completed"],
+                "failed": metrics["failed"],
+                "wait_ms_mean": statistics.fmean(ordered) if ordered else 0.0,
+                "wait_ms_p50": ordered[len(ordered) // 2] if ordered else 0.0,
+                "wait_ms_p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else 0.0,
+                "wait_ms_max": metrics["wait_ms_max"],
+            }
+        classes["live"]["over_latency_target"] = self._metrics[PRIORITY_LIVE]["over_target"]
+        return {
+            "workers": self.workers,
+            "reserved_live_workers": self.reserved_live_workers,
+            "in_flight": self._in_flight,
+            "live_latency_target_ms": ASR_LIVE_LATENCY_TARGET_MS,
+            "classes": classes,
+        }
@@ -0,0 +1,136 @@
+# Audio pipeline helpers shared by the ASR stages.
+# Audio is decoded exactly once per job into a 16 kHz mono float32 buffer,
+# which every later stage (windowing, language detection, transcription) reuses.
+
+import pathlib
+import subprocess
+import numpy as np
+from typing import List, Optional, Tuple
+
+SAMPLE_RATE = 16000 # Whisper models expect 16 kHz mono input
+VAD_FRAME_MS = 30 # Energy is measured over frames of this length
+VAD_SMOOTHING_MS = 300 # Cut points need this much sustained quiet, not a single quiet frame
+
+
+def decode_audio(file_path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decodes any ffmpeg-readable audio file into a mono float32 array in [-1, 1].
+
+    Args:
+        file_path: The path to the audio file.
+        sample_rate: The target sample rate.
+
+    Returns:
+        A 1-D float32 NumPy array of samples.
+
+    Raises:
+        RuntimeError: If ffmpeg fails to decode the file.
+    """
+    absolute_file_path = str(pathlib.Path(file_path).resolve())
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-threads", "0",
+        "-i", absolute_file_path,
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "-",
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio {file_path}: {e.stderr.decode(errors='ignore')}") from e
+    return pcm16_to_float32(out)
+
+
+def pcm16_to_float32(pcm_bytes: bytes) -> np.ndarray:
+    """Converts raw little-endian 16-bit PCM bytes to a float32 array in [-1, 1]."""
+    return np.frombuffer(pcm_bytes, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+class StreamResampler:
+    """
+    Resamples a mono stream that arrives in frames, by linear interpolation.
+    Good enough for speech going into ASR; used for live frames captured at 44.1/48 kHz.
+
+    Output sample positions are counted from the start of the stream rather than of
+    each frame, and the last input sample is kept so the first outputs of a frame
+    interpolate across the frame boundary. Frame sizes therefore do not change the
+    output: feeding a stream in pieces gives the same samples as feeding it whole.
+    """
+
+    def __init__(self, from_rate: int, to_rate: int = SAMPLE_RATE):
+        self.from_rate = from_rate
+        self.to_rate = to_rate
+        self._consumed = 0 # Input samples seen so far
+        self._produced = 0 # Output samples emitted so far
+        self._last: Optional[float] = None # Last input sample of the previous frame
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        """Returns the output samples whose positions fall up to the end of this frame."""
+        if self.from_rate == self.to_rate or len(audio) == 0:
+            return audio
+        # Output j sits at input position j * from_rate / to_rate; integer arithmetic keeps that exact
+        last_index = (self._consumed + len(audio) - 1) * self.to_rate // self.from_rate
+        indices = np.arange(self._produced, last_index + 1, dtype=np.int64)
+        positions = (indices * self.from_rate - self._consumed * self.to_rate) / float(self.to_rate)
+        if self._last is None:
+            source_positions = np.arange(len(audio), dtype=np.float64)
+            source = audio
+        else:
+            source_positions = np.arange(-1, len(audio), dtype=np.float64)
+            source = np.concatenate([[self._last], audio])
+        self._consumed += len(audio)
+        self._produced = last_index + 1
+        self._last = float(audio[-1])
+        return np.interp(positions, source_positions, source).astype(np.float32)
+
+
+def duration_seconds(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> float:
+    """Returns the duration of a decoded buffer in seconds."""
+    return len(audio) / float(sample_rate)
+
+
+def _frame_energy(audio: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, int]:
+    """Returns the smoothed RMS energy per VAD frame and the frame length in samples."""
+    frame = max(1, int(sample_rate * VAD_FRAME_MS / 1000))
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32), frame
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1))
+    smoothing = max(1, VAD_SMOOTHING_MS // VAD_FRAME_MS)
+    energy = np.convolve(energy, np.ones(smoothing) / smoothing, mode="same")
+    return energy, frame
+
+
+def split_on_silence(audio: np.ndarray, max_window_seconds: float, search_seconds: float = 30.0,
+                     sample_rate: int = SAMPLE_RATE) -> List[Tuple[int, int]]:
+    """
+    Splits a decoded buffer into consecutive windows no longer than max_window_seconds.
+
+    Each cut is placed at the quietest point (lowest smoothed energy) within the last
+    search_seconds of the window, so words are not split across windows.
+
+    Returns:
+        A list of (start_sample, end_sample) pairs covering the whole buffer.
+    """
+    max_window = int(max_window_seconds * sample_rate)
+    if len(audio) <= max_window:
+        return [(0, len(audio))]
+
+    energy, frame = _frame_energy(audio, sample_rate)
+    search = min(int(search_seconds * sample_rate), max_window // 2)
+    windows: List[Tuple[int, int]] = []
+    start = 0
+    while len(audio) - start > max_window:
+        lo_frame = (start + max_window - search) // frame
+        hi_frame = (start + max_window) // frame
+        cut_frame = lo_frame + int(np.argmin(energy[lo_frame:hi_frame])) if hi_frame > lo_frame else hi_frame
+        cut = min(max(cut_frame * frame, start + 1), start + max_window)
+        windows.append((start, cut))
+        start = cut
+    windows.append((start, len(audio)))
+    return windows
@@ -0,0 +1,107 @@
+# Sentence embedding engine used for RAG indexing and queries.
+# Wraps sentence-transformers with a choice of CPU runtime, a configurable batch
+# size and its own thread, and returns NumPy float32 arrays end to end.
+# Select the runtime with EMBEDDING_BACKEND=torch (default), int8 (PyTorch dynamic
+# int8 quantization of the Linear layers) or onnx (ONNX Runtime; pip install "optimum[onnxruntime]").
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import numpy as np
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+# Texts per forward pass
+EMBEDDING_BATCH_SIZE = max(1, int(os.getenv("EMBEDDING_BATCH_SIZE", "64")))
+# Intra-op threads used by the model; 0 means one per CPU core
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0")) or os.cpu_count() or 1
+# onnx only: model file inside the model repository, e.g. onnx/model_qint8_avx512_vnni.onnx
+# for a pre-quantized int8 graph (default: the float32 onnx/model.onnx)
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "")
+
+BACKENDS = ("torch", "int8", "onnx")
+
+
+def model_identity(model_name: str = EMBEDDING_MODEL_NAME, backend: str = EMBEDDING_BACKEND,
+                   onnx_file: str = EMBEDDING_ONNX_FILE) -> str:
+    """Names the model and runtime that produce a vector (runtimes give slightly different vectors)."""
+    if backend == "onnx" and onnx_file:
+        return f"{model_name}/{backend}/{onnx_file}"
+    return f"{model_name}/{backend}"
+
+
+class EmbeddingEngine:
+    """
+    Encodes texts into float32 vectors of shape (len(texts), dim).
+
+    Every encode runs on one dedicated thread (so embedding never occupies the
+    event loop's default executor), and that call uses EMBEDDING_THREADS cores.
+    Calls are serialized rather than run side by side: concurrent calls would
+    only compete for the same cores, and fast tokenizers aren't safe to share
+    between threads.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, backend: str = EMBEDDING_BACKEND,
+                 batch_size: int = EMBEDDING_BATCH_SIZE, threads: int = EMBEDDING_THREADS):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported EMBEDDING_BACKEND: {backend}. Choose one of: {', '.join(BACKENDS)}")
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.threads = threads
+        self._model = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+
+    @property
+    def identity(self) -> str:
+        """model_identity() of the runtime actually loaded."""
+        return model_identity(self.model_name, self.backend)
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self._model.get_sentence_embedding_dimension() if self._model else None
+
+    def load(self) -> "EmbeddingEngine":
+        """Loads the model. Falls back to the torch runtime if the onnx one can't be loaded."""
+        import torch
+        from sentence_transformers import SentenceTransformer
+        torch.set_num_threads(self.threads)
+        if self.backend == "onnx":
+            try:
+                self._model = self._load_onnx(SentenceTransformer)
+                return self
+            except Exception as e:
+                print(f"Warning: Could not load the ONNX embedding runtime ({e}). Falling back to torch.")
+                self.backend = "torch"
+        model = SentenceTransformer(self.model_name, device="cpu")
+        if self.backend == "int8":
+            # Linear layers hold nearly all of a MiniLM's compute; quantize their weights to int8
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self._model = model
+        return self
+
+    def _load_onnx(self, SentenceTransformer):
+        import onnxruntime
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = self.threads
+        model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+        if EMBEDDING_ONNX_FILE:
+            model_kwargs["file_name"] = EMBEDDING_ONNX_FILE
+        return SentenceTransformer(self.model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encodes texts in the calling thread, batch_size at a time."""
+        if not texts:
+            return np.empty((0, self.dimension or 0), dtype=np.float32)
+        vectors = self._model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.astype(np.float32, copy=False)
+
+    async def aencode(self, texts: List[str]) -> np.ndarray:
+        """Encodes texts on the engine's own thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.encode, texts)
@@ -0,0 +1,117 @@
+# Lexical side of chat retrieval and the rank fusion that merges it with vector search.
+# Dense embeddings match meaning but blur exact tokens (names, numbers, ticket IDs like
+# ABC-123); BM25 over the same chunks catches those. The two rankings are merged with
+# reciprocal rank fusion, which needs no score calibration between them.
+
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+# Meetings whose BM25 index is kept in memory (least recently used are dropped)
+RAG_BM25_CACHE_MEETINGS = int(os.getenv("RAG_BM25_CACHE_MEETINGS", "64"))
+# Standard Okapi BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+# RRF damping constant from Cormack et al.; larger values flatten the rank weights
+RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+
+# Words, numbers and joined identifiers (ABC-123, v2.1, snake_case)
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-.]\w+)*")
+_SPLIT_PATTERN = re.compile(r"[-._]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased tokens. Joined identifiers are kept whole and also split, so "ABC-123" matches "abc 123" too."""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = [part for part in _SPLIT_PATTERN.split(token) if part]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents."""
+
+    def __init__(self, documents: Sequence[str]):
+        self.documents = list(documents)
+        self._term_frequencies = [Counter(tokenize(document)) for document in documents]
+        self._lengths = [sum(frequencies.values()) for frequencies in self._term_frequencies]
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        document_frequencies = Counter(term for frequencies in self._term_frequencies for term in frequencies)
+        count = len(self._term_frequencies)
+        # The +1 keeps idf positive for terms in more than half the documents
+        self._idf = {term: math.log((count - df + 0.5) / (df + 0.5) + 1) for term, df in document_frequencies.items()}
+
+    def __len__(self) -> int:
+        return len(self._term_frequencies)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Returns up to k (document index, score) pairs, best first. Documents sharing no term with the query are left out."""
+        terms = [term for term in set(tokenize(query)) if term in self._idf]
+        if not terms:
+            return []
+        scores = []
+        for index, (frequencies, length) in enumerate(zip(self._term_frequencies, self._lengths)):
+            score = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self._average_length)
+            for term in terms:
+                frequency = frequencies.get(term)
+                if frequency:
+                    score += self._idf[term] * frequency * (BM25_K1 + 1) / (frequency + norm)
+            if score > 0:
+                scores.append((index, score))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:k]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = RRF_K) -> List[Tuple[Hashable, float]]:
+    """
+    Merges rankings (each a list of ids, best first) into one: every id scores
+    sum(1 / (k + rank)) over the rankings it appears in. Returns (id, score), best first.
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class MeetingIndexCache:
+    """
+    BM25 indexes of recently queried meetings, each with the chunk ids it was built
+    from. A lookup passes the meeting's current chunk ids, so an index built before
+    a re-index (in this process or another) is rebuilt rather than served stale.
+    Used from executor threads, hence the lock.
+    """
+
+    def __init__(self, max_meetings: int = RAG_BM25_CACHE_MEETINGS):
+        self.max_meetings = max_meetings
+        self._entries: "OrderedDict[str, Tuple[Tuple[str, ...], BM25Index]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, meeting_id: str, chunk_ids: Sequence[str]) -> Optional[BM25Index]:
+        with self._lock:
+            entry = self._entries.get(meeting_id)
+            if entry is None or entry[0] != tuple(chunk_ids):
+                return None
+            self._entries.move_to_end(meeting_id)
+            return entry[1]
+
+    def put(self, meeting_id: str, chunk_ids: Sequence[str], index: BM25Index):
+        with self._lock:
+            self._entries[meeting_id] = (tuple(chunk_ids), index)
+            self._entries.move_to_end(meeting_id)
+            while len(self._entries) > self.max_meetings:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, meeting_id: str):
+        with self._lock:
+            self._entries.pop(meeting_id, None)
+
+
+meeting_index_cache = MeetingIndexCache()
@@ -0,0 +1,120 @@
+# Local intent classifier for chat queries.
+# Decides between "small_talk" (answered without retrieval), "rag" (needs the transcript)
+# and "other" without an LLM round-trip: cheap pattern checks first, then the query's
+# sentence embedding against a small set of labelled exemplars, using the embedding
+# model RAG already has loaded. Only low-confidence queries still go to the LLM.
+
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+# "local" classifies with the exemplars (LLM only when unsure); "llm" always asks the LLM
+INTENT_CLASSIFIER = os.getenv("INTENT_CLASSIFIER", "local").lower()
+# Cosine similarity the best exemplar must reach to trust the local answer
+INTENT_MIN_SIMILARITY = float(os.getenv("INTENT_MIN_SIMILARITY", "0.55"))
+# Lead the best label must have over the runner-up
+INTENT_MIN_MARGIN = float(os.getenv("INTENT_MIN_MARGIN", "0.05"))
+
+LABELS = ("small_talk", "rag", "other")
+
+EXEMPLARS = {
+    "small_talk": [
+        "hi", "hello there", "hey, how's it going?", "good morning", "how are you today?",
+        "thanks a lot", "thank you, that helps", "great, thanks!", "bye", "see you later",
+        "nice to meet you", "what's up?", "you're awesome", "have a good day", "ok cool",
+    ],
+    "rag": [
+        "what was decided about the budget?", "who is responsible for the release?",
+        "summarize what Alice said about the roadmap", "what are the action items?",
+        "when is the deadline for the migration?", "did anyone mention the customer complaint?",
+        "what did the team agree on?", "which risks were discussed?", "what numbers were given for Q3?",
+        "why was the launch postponed?", "list the next steps", "what did they say about hiring?",
+        "what was the outcome of the vendor discussion?", "who attended the meeting?",
+        "explain the proposal for the new architecture",
+    ],
+    "other": [
+        "what can you do?", "how do you work?", "which model are you?", "your last answer was wrong",
+        "that's not helpful", "can you answer in french?", "who made you?", "help",
+        "are you an AI?", "how do I export the pdf?",
+    ],
+}
+
+# Whole-message greetings, thanks and goodbyes
+_SMALL_TALK_PATTERN = re.compile(
+    r"^(hi|hello|hey|hiya|yo|howdy|good (morning|afternoon|evening)|"
+    r"thanks?( you)?( so much| a lot)?|thx|ty|cheers|much appreciated|"
+    r"bye|goodbye|see (you|ya)( later)?|ok(ay)?|cool|great|nice|awesome|"
+    r"how are you( doing)?( today)?|how's it going|what'?s up|sup)"
+    r"( there| again| all)?[\s!.,?:)]*$",
+    re.IGNORECASE,
+)
+# Words that only make sense about the meeting's content
+_RAG_PATTERN = re.compile(
+    r"\b(meeting|discuss\w*|decid\w*|decision\w*|agree\w*|action items?|"
+    r"deadline\w*|mention\w*|said|talk\w* about|summar\w*|next steps?|speaker\w*)\b",
+    re.IGNORECASE,
+)
+
+
+class IntentClassifier:
+    """
+    Classifies a query with pattern checks and nearest exemplars.
+    The exemplars are embedded once, with the first encoder passed in.
+    """
+
+    def __init__(self, exemplars: Dict[str, List[str]] = EXEMPLARS,
+                 min_similarity: float = INTENT_MIN_SIMILARITY, min_margin: float = INTENT_MIN_MARGIN):
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self._texts = [text for label in LABELS for text in exemplars.get(label, [])]
+        self._labels = np.array([label for label in LABELS for _ in exemplars.get(label, [])])
+        self._vectors: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    @staticmethod
+    def match_patterns(query: str) -> Optional[str]:
+        """The label the pattern checks alone assign, or None."""
+        text = query.strip()
+        if not text or _SMALL_TALK_PATTERN.match(text):
+            return "small_talk"
+        # Digits and identifiers (budgets, dates, ABC-123) point at the transcript
+        if _RAG_PATTERN.search(text) or re.search(r"\d", text):
+            return "rag"
+        return None
+
+    async def classify(self, query: str, encoder) -> Dict[str, Any]:
+        """
+        Returns {"label", "confidence", "source", "ms"}. source is "pattern" or
+        "embedding"; label is None when the nearest exemplars are too far or
+        too close to call, and the caller should fall back to the LLM.
+        """
+        started = time.perf_counter()
+        label = self.match_patterns(query)
+        if label:
+            return {"label": label, "confidence": 1.0, "source": "pattern", "ms": (time.perf_counter() - started) * 1000}
+
+        if self._vectors is None:
+            self._vectors = self._normalize(await encoder.aencode(self._texts))
+        query_vector = self._normalize(await encoder.aencode([query]))[0]
+        similarities = self._vectors @ query_vector
+        # Each label scores as its closest exemplar
+        scores = sorted(((float(similarities[self._labels == label].max()), label) for label in LABELS
+                         if (self._labels == label).any()), reverse=True)
+        best, label = scores[0]
+        margin = best - scores[1][0] if len(scores) > 1 else best
+        confident = best >= self.min_similarity and margin >= self.min_margin
+        return {
+            "label": label if confident else None,
+            "confidence": round(best, 4),
+            "source": "embedding",
+            "ms": (time.perf_counter() - started) * 1000,
+        }
+
+
+intent_classifier = IntentClassifier()
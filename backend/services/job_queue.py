@@ -0,0 +1,175 @@
+# Durable, SQLite-backed job queue for the meeting processing pipeline.
+# Each stage (asr, analysis, indexing, pdf) has its own handler, worker count and
+# retry policy. Jobs live in the 'jobs' table, so a restart re-queues interrupted
+# work instead of leaving meetings stuck in a processing status.
+# Several API processes (e.g. gunicorn workers) can share the queue: each running job
+# is leased to the process running it, and only lapsed leases are re-queued.
+
+import asyncio
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Dict, Any, List, Optional
+
+from .asr_scheduler import PRIORITY_BULK
+from .storage.jobs import (
+    enqueue_job,
+    claim_next_job,
+    complete_job,
+    fail_job,
+    release_job,
+    renew_job_leases,
+    requeue_stale_jobs,
+)
+
+STAGE_ASR = "asr"
+STAGE_ANALYSIS = "analysis"
+STAGE_INDEXING = "indexing"
+STAGE_PDF = "pdf"
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Retry delay doubles with each attempt: base, 2*base, 4*base, ...
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+# Idle workers re-check the table this often (enqueues in this process wake them immediately)
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+# A running job whose process hasn't renewed its lease for this long is re-queued
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+# Identifies this process as the owner of the jobs it runs
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+FailureHandler = Callable[[Dict[str, Any], str], Awaitable[None]]
+
+
+def stage_concurrency(stage: str, default: int) -> int:
+    """
+    Reads the concurrency of a stage from JOB_CONCURRENCY_<STAGE>: the most jobs of
+    the stage running at once across all processes sharing the database.
+    """
+    return max(1, int(os.getenv(f"JOB_CONCURRENCY_{stage.upper()}", str(default))))
+
+
+class JobQueue:
+    def __init__(self):
+        self._handlers: Dict[str, Dict[str, Any]] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._workers: List[asyncio.Task] = []
+        self._lease_task: Optional[asyncio.Task] = None
+        self.running = False
+
+    def register(self, stage: str, handler: JobHandler, on_failure: Optional[FailureHandler] = None,
+                 concurrency: int = 1, max_attempts: int = JOB_MAX_ATTEMPTS):
+        """
+        Registers the coroutine that processes jobs of a stage.
+
+        handler receives the job dict (with 'payload') and raises to signal failure.
+        on_failure is awaited once the job has exhausted its attempts.
+        concurrency is the deployment-wide limit; each process starts that many workers.
+        """
+        self._handlers[stage] = {
+            "handler": handler,
+            "on_failure": on_failure,
+            "concurrency": concurrency,
+            "max_attempts": max_attempts,
+        }
+
+    async def enqueue(self, stage: str, meeting_id: str, payload: Dict[str, Any],
+                      priority: int = PRIORITY_BULK) -> Optional[Dict[str, Any]]:
+        """
+        Persists a job for stage and wakes an idle worker. Returns the job or None on error.
+        Queued jobs of a stage are claimed by priority (asr_scheduler PRIORITY_*), then oldest first.
+        """
+        config = self._handlers.get(stage)
+        max_attempts = config["max_attempts"] if config else JOB_MAX_ATTEMPTS
+        job = await enqueue_job(stage, meeting_id, payload, max_attempts=max_attempts, priority=priority)
+        if job:
+            print(f"[Job Queue] Enqueued {stage} job {job['id']} for meeting {meeting_id}")
+            if stage in self._wakeups:
+                self._wakeups[stage].set()
+        return job
+
+    async def start(self):
+        """Re-queues jobs of dead processes and starts the workers for every registered stage."""
+        if self.running:
+            return
+        await self._requeue_stale()
+        self.running = True
+        self._lease_task = asyncio.create_task(self._maintain_leases())
+        for stage, config in self._handlers.items():
+            self._wakeups[stage] = asyncio.Event()
+            for worker_index in range(config["concurrency"]):
+                self._workers.append(asyncio.create_task(self._worker(stage, worker_index)))
+            print(f"[Job Queue] Started {config['concurrency']} worker(s) for stage '{stage}'.")
+
+    async def stop(self):
+        """Cancels the workers. Jobs they were running are returned to the queue."""
+        self.running = False
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._lease_task:
+            self._lease_task.cancel()
+            self._lease_task = None
+        print("[Job Queue] Stopped.")
+
+    async def _requeue_stale(self):
+        requeued = await requeue_stale_jobs()
+        if requeued:
+            print(f"[Job Queue] Re-queued {requeued} job(s) whose process stopped renewing their lease.")
+
+    async def _maintain_leases(self):
+        """Renews the leases of this process's running jobs and re-queues lapsed ones."""
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            await renew_job_leases(WORKER_ID, JOB_LEASE_SECONDS)
+            await self._requeue_stale()
+
+    async def _wait_for_work(self, stage: str):
+        """Sleeps until a job is enqueued for stage or the poll interval elapses."""
+        wakeup = self._wakeups[stage]
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=JOB_POLL_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
+
+    async def _worker(self, stage: str, worker_index: int):
+        config = self._handlers[stage]
+        while self.running:
+            job = await claim_next_job(stage, WORKER_ID, JOB_LEASE_SECONDS, max_running=config["concurrency"])
+            if not job:
+                await self._wait_for_work(stage)
+                continue
+
+            label = f"[Job {job['id']} {stage} #{worker_index}]"
+            print(f"{label} Running for meeting {job['meeting_id']} (attempt {job['attempts']}/{job['max_attempts']})")
+            try:
+                await config["handler"](job)
+            except asyncio.CancelledError:
+                # Shutting down mid-job: hand it back so the next startup runs it again
+                await release_job(job['id'], owner=WORKER_ID)
+                raise
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                delay = JOB_RETRY_BASE_SECONDS * (2 ** (job['attempts'] - 1))
+                new_status = await fail_job(job['id'], error, retry_delay_seconds=delay, owner=WORKER_ID)
+                if new_status == 'queued':
+                    print(f"{label} Failed ({error}); retrying in {delay:.0f}s.")
+                else:
+                    print(f"{label} Failed permanently: {error}")
+                    if config["on_failure"]:
+                        try:
+                            await config["on_failure"](job, error)
+                        except Exception as failure_error:
+                            print(f"{label} Error in failure handler: {failure_error}")
+            else:
+                if await complete_job(job['id'], owner=WORKER_ID):
+                    print(f"{label} Succeeded.")
+                else:
+                    print(f"{label} Finished, but the job is no longer leased to this process; not marked succeeded.")
+
+
+# Single queue instance used across the application
+job_queue = JobQueue()
@@ -0,0 +1,283 @@
+# Live transcription of meetings, fed either by chunk uploads or by raw PCM
+# frames over a WebSocket. Audio stays in memory.
+#
+# Consecutive buffers are transcribed as overlapping windows: each window
+# starts with the tail of the previous buffer and is decoded with the previous
+# text as the initial prompt, so words cut at a buffer edge are heard whole.
+# Words the overlap repeats are then removed from the start of the new text.
+# Timestamps come from the number of samples received, not the chunk count.
+
+import asyncio
+import os
+import re
+import time
+import numpy as np
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from . import asr, audio_pipeline
+from .storage.segment_writer import segment_writer
+from ..utils.websocket_manager import manager
+
+# New audio needed before the pending buffer is re-transcribed for a partial caption
+LIVE_PARTIAL_INTERVAL_SECONDS = float(os.getenv("LIVE_PARTIAL_INTERVAL_SECONDS", "1.0"))
+# Pending audio is committed as a final segment once it reaches this length
+LIVE_FINAL_SECONDS = float(os.getenv("LIVE_FINAL_SECONDS", "2.0"))
+# Audio from the end of the previous buffer prepended to the next window
+LIVE_OVERLAP_SECONDS = float(os.getenv("LIVE_OVERLAP_SECONDS", "1.0"))
+# Characters of preceding text passed to the decoder as its initial prompt
+LIVE_PROMPT_CHARS = 200
+# Longest run of repeated words looked for at the start of a new window
+LIVE_DEDUPE_MAX_WORDS = 12
+# Partials are skipped for buffers shorter than this; Whisper hallucinates on tiny inputs
+LIVE_MIN_PARTIAL_SECONDS = 0.5
+
+
+def _word_key(word: str) -> str:
+    return re.sub(r"[^\w]", "", word).lower()
+
+
+def drop_repeated_prefix(context: str, text: str, max_words: int = LIVE_DEDUPE_MAX_WORDS) -> str:
+    """
+    Removes the words at the start of text that repeat the end of context.
+
+    The overlap audio is transcribed twice, so a new window usually starts with
+    the last few words already committed. The repeat is matched on normalized
+    words and may end up to two words before the end of context, since Whisper
+    sometimes drops or merges a word at the edge of a window.
+    """
+    words = text.split()
+    context_keys = [_word_key(word) for word in context.split()[-(max_words + 2):]]
+    keys = [_word_key(word) for word in words[:max_words]]
+    for length in range(min(len(keys), len(context_keys)), 0, -1):
+        for skipped in range(0, 3):
+            # A single word only counts as a repeat when it is the very last word
+            if skipped and length < 2:
+                break
+            end = len(context_keys) - skipped
+            if end - length < 0:
+                break
+            if keys[:length] == context_keys[end - length:end]:
+                return " ".join(words[length:])
+    return text
+
+
+class LiveTranscript:
+    """
+    Running transcript state of one live meeting: the meeting time reached so
+    far, the audio tail to overlap into the next window and the committed text.
+    """
+
+    def __init__(self, meeting_id: str, language: Optional[str] = None, offset_seconds: float = 0.0):
+        self.meeting_id = meeting_id
+        self.language = language
+        # Meeting time (seconds) of the next buffer
+        self.offset_seconds = offset_seconds
+        self._overlap = np.zeros(0, dtype=np.float32)
+        self._context = ""
+        # Chunk uploads of one meeting can arrive concurrently; commits must not interleave
+        self._lock = asyncio.Lock()
+
+    def _window(self, audio: np.ndarray) -> np.ndarray:
+        return np.concatenate([self._overlap, audio]) if len(self._overlap) else audio
+
+    async def _transcribe(self, window: np.ndarray, context: str) -> Dict[str, Any]:
+        return await asr.transcribe_array(
+            window, self.language, priority=asr.PRIORITY_LIVE,
+            initial_prompt=context[-LIVE_PROMPT_CHARS:] or None
+        )
+
+    async def preview(self, audio: np.ndarray) -> str:
+        """Transcribes audio that has not been committed yet, without changing any state."""
+        result = await self._transcribe(self._window(audio), self._context)
+        return drop_repeated_prefix(self._context, result.get("transcript", "").replace("\n", " ").strip())
+
+    async def commit(self, audio: np.ndarray) -> Dict[str, Any]:
+        """
+        Transcribes the next buffer of the meeting and appends it to the transcript.
+
+        Returns a dictionary with text (new words only, may be empty), start and end
+        (meeting time in seconds, from sample counts) and languages.
+        Raises if transcription fails; the audio still counts towards meeting time.
+        """
+        async with self._lock:
+            window = self._window(audio)
+            start_time = self.offset_seconds
+            end_time = start_time + audio_pipeline.duration_seconds(audio)
+            self.offset_seconds = end_time
+            overlap_samples = int(LIVE_OVERLAP_SECONDS * audio_pipeline.SAMPLE_RATE)
+            self._overlap = window[-overlap_samples:] if overlap_samples > 0 else np.zeros(0, dtype=np.float32)
+
+            result = await self._transcribe(window, self._context)
+            text = drop_repeated_prefix(self._context, result.get("transcript", "").replace("\n", " ").strip())
+            if text:
+                self._context = f"{self._context} {text}".strip()[-LIVE_PROMPT_CHARS * 2:]
+            return {
+                "text": text,
+                "start": start_time,
+                "end": end_time,
+                "languages": result.get("languages", []),
+            }
+
+
+# Transcript state of meetings currently recording, by meeting ID
+_live_transcripts: Dict[str, LiveTranscript] = {}
+
+
+def get_live_transcript(meeting_id: str, language: Optional[str] = None, offset_seconds: float = 0.0) -> LiveTranscript:
+    """
+    Returns the meeting's live transcript state, creating it on first use.
+    A reconnecting WebSocket or the next chunk upload continues where the last one stopped.
+    """
+    if meeting_id not in _live_transcripts:
+        _live_transcripts[meeting_id] = LiveTranscript(meeting_id, language=language, offset_seconds=offset_seconds)
+    elif language:
+        _live_transcripts[meeting_id].language = language
+    return _live_transcripts[meeting_id]
+
+
+def discard_live_transcript(meeting_id: str):
+    """Drops a meeting's live transcript state, e.g. when the recording is finalized."""
+    _live_transcripts.pop(meeting_id, None)
+
+
+async def publish_live_segment(meeting_id: str, committed: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Broadcasts a committed live segment as transcript_update and queues it for writing.
+    Returns the segment in the frontend's TranscriptSegment shape, or None if it has no text.
+    """
+    if not committed["text"]:
+        return None
+    segment_data = {
+        "id": f"{meeting_id}-live-{int(committed['start'] * 1000)}",
+        "speakerId": "live_system", # Placeholder speaker
+        "speakerName": "System Audio", # Placeholder name
+        "startTime": committed["start"],
+        "endTime": committed["end"],
+        "text": committed["text"],
+        "language": committed["languages"][0] if committed["languages"] else "unknown"
+    }
+    # Buffered before broadcasting, so a segment clients have seen is always written
+    segment_writer.add(meeting_id, segment_data)
+    await manager.broadcast({
+        "type": "transcript_update",
+        "payload": {
+            "meetingId": meeting_id,
+            "segment": segment_data
+        }
+    })
+    return segment_data
+
+
+class LiveSession:
+    """
+    One WebSocket audio stream of a live meeting.
+
+    feed() is called for every binary frame and never blocks. run() is the
+    session's processing loop: it keeps at most one transcription in flight,
+    so frames that arrive while the ASR workers are busy simply accumulate.
+    """
+
+    def __init__(
+        self,
+        meeting_id: str,
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+        sample_rate: int = audio_pipeline.SAMPLE_RATE,
+        language: Optional[str] = None,
+        offset_seconds: float = 0.0,
+    ):
+        self.meeting_id = meeting_id
+        self.send = send
+        self.sample_rate = sample_rate
+        self._resampler = audio_pipeline.StreamResampler(sample_rate) # Keeps its position across frames
+        self.transcript = get_live_transcript(meeting_id, language=language, offset_seconds=offset_seconds)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._samples_at_last_partial = 0
+        self._carry = b"" # Odd trailing byte of a frame split mid-sample
+        self._wakeup = asyncio.Event()
+        self._flush_requested = False
+        self._closing = False
+        self.segments_committed = 0
+
+    def feed(self, frame: bytes):
+        """Appends a raw little-endian 16-bit mono PCM frame to the pending buffer."""
+        data = self._carry + frame
+        usable = len(data) - (len(data) % 2)
+        self._carry = data[usable:]
+        if usable == 0:
+            return
+        samples = audio_pipeline.pcm16_to_float32(data[:usable])
+        samples = self._resampler.process(samples)
+        self._pending = np.concatenate([self._pending, samples])
+        self._wakeup.set()
+
+    def flush(self):
+        """Commits whatever is pending as a final segment, e.g. on a pause in speech."""
+        self._flush_requested = True
+        self._wakeup.set()
+
+    def close(self):
+        """Commits the remaining audio and stops run() once it has been processed."""
+        self._closing = True
+        self._wakeup.set()
+
+    @property
+    def pending_seconds(self) -> float:
+        return audio_pipeline.duration_seconds(self._pending)
+
+    async def run(self):
+        """Processing loop; returns after close() once the buffer is drained."""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            closing = self._closing
+            if closing or self._flush_requested or self.pending_seconds >= LIVE_FINAL_SECONDS:
+                self._flush_requested = False
+                await self._commit_final()
+                if closing:
+                    return
+            elif (self.pending_seconds >= LIVE_MIN_PARTIAL_SECONDS
+                    and audio_pipeline.duration_seconds(self._pending[self._samples_at_last_partial:]) >= LIVE_PARTIAL_INTERVAL_SECONDS):
+                await self._send_partial()
+            # Frames, flushes and close() arriving during transcription have set the event again
+
+    async def _send_partial(self):
+        audio = self._pending
+        self._samples_at_last_partial = len(audio)
+        try:
+            text = await self.transcript.preview(audio)
+        except Exception as e:
+            print(f"[Live {self.meeting_id}] Error transcribing partial: {e}")
+            return
+        if not text:
+            return
+        await self.send({
+            "type": "partial",
+            "segment": {
+                "startTime": self.transcript.offset_seconds,
+                "endTime": self.transcript.offset_seconds + audio_pipeline.duration_seconds(audio),
+                "text": text,
+            }
+        })
+
+    async def _commit_final(self):
+        audio = self._pending
+        if len(audio) == 0:
+            return
+        # Frames arriving during transcription go into a fresh buffer
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._samples_at_last_partial = 0
+
+        started = time.perf_counter()
+        try:
+            committed = await self.transcript.commit(audio)
+        except Exception as e:
+            print(f"[Live {self.meeting_id}] Error transcribing {audio_pipeline.duration_seconds(audio):.1f}s of audio: {e}")
+            await self.send({"type": "error", "detail": f"Transcription failed: {e}"})
+            return
+        segment_data = await publish_live_segment(self.meeting_id, committed)
+        if not segment_data:
+            return
+        print(f"[Live {self.meeting_id}] Final segment {committed['start']:.1f}-{committed['end']:.1f}s in {time.perf_counter() - started:.2f}s: {committed['text']}")
+        self.segments_committed += 1
+        await self.send({"type": "final", "segment": segment_data})
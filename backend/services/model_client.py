@@ -0,0 +1,189 @@
+# Client for the optional shared model server (services/model_server.py).
+# With MODEL_SERVER_SOCKET set, API worker processes send ASR and embedding work to
+# one model-server process over a Unix socket instead of loading the models
+# themselves, so N gunicorn workers share one copy of each model.
+#
+# Wire format: every message is a frame of two big-endian uint32 lengths, an orjson
+# header and an optional binary payload (embeddings travel as raw float32). Audio
+# isn't sent over the socket at all: it is written once into a shared memory block,
+# and the ASR worker in the model server reads it from there.
+
+import asyncio
+import os
+import socket
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import orjson
+
+# Path of the model server's Unix socket; empty means every process loads its own models
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET", "")
+# How long a request waits for the model server to answer
+MODEL_SERVER_TIMEOUT_SECONDS = float(os.getenv("MODEL_SERVER_TIMEOUT_SECONDS", "600"))
+
+_FRAME_HEADER = struct.Struct("!II")
+
+# Set by the model server itself, so its own ASR and embedding calls run locally
+SERVER_PROCESS = False
+
+
+class ModelServerError(RuntimeError):
+    """The model server could not be reached, or it reported an error."""
+
+
+def enabled() -> bool:
+    """True if this process should use the model server instead of loading models."""
+    return bool(MODEL_SERVER_SOCKET) and not SERVER_PROCESS
+
+
+def encode_frame(header: Dict[str, Any], payload: bytes = b"") -> bytes:
+    encoded = orjson.dumps(header)
+    return _FRAME_HEADER.pack(len(encoded), len(payload)) + encoded + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[Dict[str, Any], bytes]:
+    """Reads one frame. Raises asyncio.IncompleteReadError at end of stream."""
+    header_length, payload_length = _FRAME_HEADER.unpack(await reader.readexactly(_FRAME_HEADER.size))
+    header = orjson.loads(await reader.readexactly(header_length))
+    payload = await reader.readexactly(payload_length) if payload_length else b""
+    return header, payload
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ModelServerError("Model server closed the connection")
+        received += count
+    return bytes(buffer)
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Opens a block created by another process without taking ownership of it.
+    Python 3.11's resource tracker would otherwise unlink it when this process exits.
+    """
+    block = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+def _check(header: Dict[str, Any]) -> Dict[str, Any]:
+    if not header.get("ok"):
+        raise ModelServerError(header.get("error") or "Model server request failed")
+    return header
+
+
+def _embeddings_from(header: Dict[str, Any], payload: bytes) -> np.ndarray:
+    return np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+
+
+async def _arequest(header: Dict[str, Any], payload: bytes = b"") -> Tuple[Dict[str, Any], bytes]:
+    """Sends one request on a fresh connection and returns the response frame."""
+    try:
+        reader, writer = await asyncio.open_unix_connection(MODEL_SERVER_SOCKET)
+    except OSError as e:
+        raise ModelServerError(f"Model server not reachable at {MODEL_SERVER_SOCKET}: {e}") from e
+    try:
+        writer.write(encode_frame(header, payload))
+        await writer.drain()
+        response, response_payload = await asyncio.wait_for(read_frame(reader), MODEL_SERVER_TIMEOUT_SECONDS)
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+        raise ModelServerError(f"Model server request '{header.get('op')}' failed: {e!r}") from e
+    finally:
+        writer.close()
+    return _check(response), response_payload
+
+
+def _request(header: Dict[str, Any], payload: bytes = b"") -> Tuple[Dict[str, Any], bytes]:
+    """Blocking version of _arequest, for callers running in threads (e.g. LangChain's sync embedding calls)."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(MODEL_SERVER_TIMEOUT_SECONDS)
+            sock.connect(MODEL_SERVER_SOCKET)
+            sock.sendall(encode_frame(header, payload))
+            header_length, payload_length = _FRAME_HEADER.unpack(_recv_exactly(sock, _FRAME_HEADER.size))
+            response = orjson.loads(_recv_exactly(sock, header_length))
+            response_payload = _recv_exactly(sock, payload_length) if payload_length else b""
+    except OSError as e:
+        raise ModelServerError(f"Model server request '{header.get('op')}' failed: {e!r}") from e
+    return _check(response), response_payload
+
+
+async def transcribe(audio: np.ndarray, language: Optional[str], initial_prompt: Optional[str], priority: int) -> Dict[str, Any]:
+    """
+    Transcribes a decoded 16 kHz buffer on the model server. Returns the same
+    dictionary as asr._transcribe_array_sync.
+    """
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+    block = shared_memory.SharedMemory(create=True, size=max(audio.nbytes, 1))
+    try:
+        np.ndarray(audio.shape, dtype=np.float32, buffer=block.buf)[:] = audio
+        response, _ = await _arequest({
+            "op": "transcribe",
+            "shm": block.name,
+            "samples": int(audio.shape[0]),
+            "language": language,
+            "initial_prompt": initial_prompt,
+            "priority": priority,
+        })
+        return response["result"]
+    finally:
+        # The server has finished reading once it answers (or gave up)
+        block.close()
+        block.unlink()
+
+
+def embed(texts: List[str]) -> np.ndarray:
+    """Embeds texts on the model server: a float32 array of shape (len(texts), dim)."""
+    return _embeddings_from(*_request({"op": "embed", "texts": texts}))
+
+
+async def aembed(texts: List[str]) -> np.ndarray:
+    return _embeddings_from(*await _arequest({"op": "embed", "texts": texts}))
+
+
+class ModelServerEncoder:
+    """
+    The encode/aencode interface of embeddings.EmbeddingEngine, computed by the model server.
+    identity is the model server's engine.identity, as given in its readiness report.
+    """
+
+    def __init__(self, identity: str):
+        self.identity = identity
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return embed(texts)
+
+    async def aencode(self, texts: List[str]) -> np.ndarray:
+        return await aembed(texts)
+
+
+async def status() -> Dict[str, Any]:
+    """The model server's readiness report, with its ASR scheduler and embedding batch metrics."""
+    response, _ = await _arequest({"op": "status"})
+    return response["result"]
+
+
+def wait_until_ready(timeout: float = MODEL_SERVER_TIMEOUT_SECONDS) -> Dict[str, Any]:
+    """
+    Blocks until the model server reports its models loaded; returns its readiness report.
+    Used as the API's warm-up step when the models live in the model server.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            report = _request({"op": "status"})[0]["result"]
+            if report["ready"]:
+                return report
+            error = "models still loading"
+        except ModelServerError as e:
+            error = str(e)
+        if time.monotonic() > deadline:
+            raise ModelServerError(f"Model server not ready after {timeout:.0f}s: {error}")
+        time.sleep(0.5)
@@ -0,0 +1,202 @@
+# Shared model server for multi-worker deployments.
+# Owns the ASR worker pool and the embedding model and serves them to API worker
+# processes over a Unix socket (see services/model_client.py for the wire format),
+# so running N gunicorn workers no longer means N copies of every model.
+#
+# - transcribe: audio arrives in a shared memory block and goes through the ASR
+#   scheduler here, so live chunks from every API worker still take priority.
+# - embed: requests from all connections are coalesced into batched model calls.
+#
+# Usage (from the project root), with the same MODEL_SERVER_SOCKET set for the API:
+#   python -m backend.services.model_server
+#   python -m backend.services.model_server --socket /run/notera/models.sock
+
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Same .env as the API; the modules below read their settings on import
+load_dotenv(dotenv_path=Path(__file__).parent.parent / '.env')
+
+import argparse # noqa: E402
+import asyncio # noqa: E402
+import os # noqa: E402
+import signal # noqa: E402
+from typing import Any, Dict, List, Tuple # noqa: E402
+import numpy as np # noqa: E402
+
+from . import asr, model_client, rag_service # noqa: E402
+from .asr_scheduler import PRIORITY_BULK # noqa: E402
+
+# How long the first embed request of a batch waits for others to join it
+MODEL_SERVER_BATCH_WINDOW_MS = float(os.getenv("MODEL_SERVER_BATCH_WINDOW_MS", "5"))
+# Texts per batched embedding call (a single larger request still runs whole)
+MODEL_SERVER_MAX_BATCH = int(os.getenv("MODEL_SERVER_MAX_BATCH", "64"))
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces embed requests from every connection into one model call per batch.
+    A batch closes after MODEL_SERVER_BATCH_WINDOW_MS or once it holds
+    MODEL_SERVER_MAX_BATCH texts. The engine encodes it on its own thread.
+    """
+
+    def __init__(self, max_batch: int = MODEL_SERVER_MAX_BATCH, window_ms: float = MODEL_SERVER_BATCH_WINDOW_MS):
+        self.max_batch = max_batch
+        self.window_seconds = window_ms / 1000
+        self._queue: "asyncio.Queue[Tuple[List[str], asyncio.Future]]" = asyncio.Queue()
+        self._task = None
+        self._stats = {"requests": 0, "batches": 0, "texts": 0}
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _next_batch(self) -> List[Tuple[List[str], asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        count = len(batch[0][0])
+        deadline = loop.time() + self.window_seconds
+        while count < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            count += len(item[0])
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                engine = await rag_service.embeddings.aget()
+                vectors = await engine.aencode(texts)
+            except Exception as e:
+                print(f"Error embedding a batch of {len(texts)} texts: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self._stats["requests"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["texts"] += len(texts)
+            offset = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+    def metrics(self) -> Dict[str, Any]:
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "queued": self._queue.qsize(),
+            "avg_texts_per_batch": round(self._stats["texts"] / batches, 2) if batches else 0.0,
+        }
+
+
+class ModelServer:
+    def __init__(self):
+        self.batcher = EmbeddingBatcher()
+
+    def readiness(self) -> Dict[str, Any]:
+        components = {"asr_workers": asr.asr_workers, "embeddings": rag_service.embeddings}
+        embeddings_loaded = rag_service.embeddings.state == "ready"
+        return {
+            "ready": all(resource.state == "ready" for resource in components.values()),
+            "components": {name: resource.status() for name, resource in components.items()},
+            # Clients key their embedding caches by the runtime loaded here, not by their own settings
+            "embedding_identity": rag_service.embeddings.get().identity if embeddings_loaded else None,
+            "asr_scheduler": asr.get_scheduler_metrics(),
+            "embedding_batches": self.batcher.metrics(),
+        }
+
+    async def _dispatch(self, header: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        op = header.get("op")
+        if op == "status":
+            return {"ok": True, "result": self.readiness()}, b""
+        if op == "transcribe":
+            result = await asr.submit_shared_window(
+                header["shm"], header["samples"], header.get("language"),
+                header.get("priority", PRIORITY_BULK), header.get("initial_prompt"),
+            )
+            return {"ok": True, "result": result}, b""
+        if op == "embed":
+            texts = header.get("texts") or []
+            if not texts:
+                return {"ok": True, "shape": [0, 0]}, b""
+            vectors = await self.batcher.embed(texts)
+            return {"ok": True, "shape": list(vectors.shape)}, vectors.tobytes()
+        return {"ok": False, "error": f"Unknown op: {op}"}, b""
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serves requests on one connection, in order, until the client closes it."""
+        try:
+            while True:
+                try:
+                    header, _ = await model_client.read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    response, payload = await self._dispatch(header)
+                except Exception as e:
+                    print(f"Model server error handling '{header.get('op')}': {e}")
+                    response, payload = {"ok": False, "error": str(e)}, b""
+                writer.write(model_client.encode_frame(response, payload))
+                await writer.drain()
+        except ConnectionError:
+            pass # Client went away mid-request
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str):
+        # ASR and embedding calls in this process must run here, not loop back to the socket
+        model_client.SERVER_PROCESS = True
+        if os.path.exists(socket_path):
+            os.unlink(socket_path) # Left over from a previous run
+        server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+        print(f"Model server listening on {socket_path}")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        self.batcher.start()
+        # Load both models in the background; status reports ready once they are
+        warmup = asyncio.gather(asr.asr_workers.aget(), rag_service.embeddings.aget(), return_exceptions=True)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            print("Shutting down model server...")
+            warmup.cancel()
+            await self.batcher.stop()
+            asr.shutdown_asr_pool()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the ASR and embedding models to API workers over a Unix socket.")
+    parser.add_argument("--socket", default=model_client.MODEL_SERVER_SOCKET, help="Socket path (defaults to MODEL_SERVER_SOCKET).")
+    args = parser.parse_args()
+    if not args.socket:
+        raise SystemExit("Set MODEL_SERVER_SOCKET or pass --socket.")
+    asyncio.run(ModelServer().serve(args.socket))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,21 @@
 
 import os
 import asyncio
+import bisect
+import functools
 import re # Import re module
-import chromadb
-from chromadb.config import Settings
-
-from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
+
+from . import model_client, resources
+from .embeddings import EmbeddingEngine
+from .hybrid_search import BM25Index, meeting_index_cache, reciprocal_rank_fusion
+from .intent import INTENT_CLASSIFIER, intent_classifier
+from .storage.embedding_cache import encode_with_cache
 
 
 VECTOR_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "vector_db")
@@ -21,34 +24,83 @@ USE_HTTP_MODE = os.getenv("CHROMA_USE_HTTP", "false").lower() == "true"
 CHROMA_SERVER_HOST = os.getenv("CHROMA_SERVER_HOST", "localhost")
 CHROMA_SERVER_PORT = int(os.getenv("CHROMA_SERVER_PORT", "8000"))
 
-embedding_function = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
 os.makedirs(VECTOR_DB_PATH, exist_ok=True)
 
-# Initialize ChromaDB client
-try:
-    if USE_HTTP_MODE:
-        print(f"Initializing ChromaDB in HTTP mode at {CHROMA_SERVER_HOST}:{CHROMA_SERVER_PORT}")
-        client = chromadb.HttpClient(host=CHROMA_SERVER_HOST, port=CHROMA_SERVER_PORT)
-    else:
-        print(f"Initializing ChromaDB in local persistent mode at: {VECTOR_DB_PATH}")
-        client = chromadb.PersistentClient(path=VECTOR_DB_PATH)
-    print("ChromaDB client initialized successfully.")
-except Exception as e:
-    print(f"Error initializing ChromaDB client: {e}")
-    print("Using fallback in-memory client.")
-    client = chromadb.Client()
-
-# LLM Initialization
-try:
-    from langchain_community.chat_models import ChatOllama
-    llm = ChatOllama(model="deepseek-r1:1.5b")
-except Exception as e:
-    print(f"⚠️ Ollama not available: {e}")
-    if os.getenv("OPENAI_API_KEY"):
-        llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0)
-    else:
-        print("❌ No LLM configured. RAG will not work.")
-        llm = None
+# "shared" stores every meeting's chunks in one collection (per-meeting queries filter on
+# meeting_id, and /meetings/search/semantic searches across meetings); "per_meeting"
+# keeps the older one-collection-per-meeting layout.
+RAG_INDEX_MODE = os.getenv("RAG_INDEX_MODE", "shared").lower()
+RAG_SHARED_COLLECTION = os.getenv("RAG_SHARED_COLLECTION", "transcript_chunks")
+# Cosine distance, so search scores (1 - distance) are comparable across meetings
+_SHARED_COLLECTION_METADATA = {"hnsw:space": "cosine"}
+# Per-meeting collections are named meeting_<id>
+_MEETING_COLLECTION_PREFIX = "meeting_"
+
+# Chunks given to the chat LLM as context
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "3"))
+# Chunks each retriever (vector and BM25) contributes to the fusion
+RAG_CANDIDATES = int(os.getenv("RAG_CANDIDATES", "20"))
+# Adds BM25 keyword search over the meeting's chunks to the vector search
+RAG_HYBRID = os.getenv("RAG_HYBRID", "true").lower() == "true"
+
+# The embedding model, vector DB client and LLM are loaded by the startup warm-up
+# (or on first use), so importing this module stays cheap.
+
+
+def load_local_embeddings() -> EmbeddingEngine:
+    """The embedding model, loaded into this process."""
+    return EmbeddingEngine().load()
+
+
+def _load_embeddings():
+    # Both encoders return float32 arrays from encode/aencode
+    if model_client.enabled():
+        report = model_client.wait_until_ready()
+        return model_client.ModelServerEncoder(report["embedding_identity"])
+    return load_local_embeddings()
+
+
+def _load_chroma_client():
+    import chromadb
+    try:
+        if USE_HTTP_MODE:
+            print(f"Initializing ChromaDB in HTTP mode at {CHROMA_SERVER_HOST}:{CHROMA_SERVER_PORT}")
+            client = chromadb.HttpClient(host=CHROMA_SERVER_HOST, port=CHROMA_SERVER_PORT)
+        else:
+            print(f"Initializing ChromaDB in local persistent mode at: {VECTOR_DB_PATH}")
+            client = chromadb.PersistentClient(path=VECTOR_DB_PATH)
+        print("ChromaDB client initialized successfully.")
+    except Exception as e:
+        print(f"Error initializing ChromaDB client: {e}")
+        print("Using fallback in-memory client.")
+        client = chromadb.Client()
+    return client
+
+
+def _load_llm():
+    try:
+        from langchain_community.chat_models import ChatOllama
+        return ChatOllama(model="deepseek-r1:1.5b")
+    except Exception as e:
+        print(f"⚠️ Ollama not available: {e}")
+        if os.getenv("OPENAI_API_KEY"):
+            from langchain_openai import ChatOpenAI
+            return ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0)
+        raise RuntimeError("No LLM configured. RAG will not work.")
+
+
+embeddings = resources.register("embeddings", _load_embeddings)
+chroma_client = resources.register("vector_db", _load_chroma_client)
+# Chat degrades to an error message without an LLM, so it doesn't gate readiness
+rag_llm = resources.register("rag_llm", _load_llm, required=False)
+
+
+async def get_llm():
+    """The chat LLM, or None if none could be loaded."""
+    try:
+        return await rag_llm.aget()
+    except Exception:
+        return None
 
 
 classification_prompt = PromptTemplate.from_template("""
@@ -61,7 +113,7 @@ Input: {query}
 Label:
 """)
 
-async def classify_query(query: str) -> str:
+async def classify_query(query: str, llm) -> str:
     chain = classification_prompt | llm | StrOutputParser()
     try:
         label = await chain.ainvoke(query)
@@ -70,6 +122,22 @@ async def classify_query(query: str) -> str:
         print(f"⚠️ Classification failed: {e}")
         return "rag"
 
+async def detect_intent(query: str, llm) -> str:
+    """
+    Labels a query like classify_query. With INTENT_CLASSIFIER=local the local
+    classifier answers, and the LLM is only asked when it isn't confident.
+    """
+    if INTENT_CLASSIFIER == "local":
+        try:
+            intent = await intent_classifier.classify(query, await embeddings.aget())
+            if intent["label"]:
+                print(f"Intent '{intent['label']}' ({intent['source']}, confidence {intent['confidence']:.2f}) in {intent['ms']:.1f} ms")
+                return intent["label"]
+            print(f"Intent unclear locally (confidence {intent['confidence']:.2f}), asking the LLM")
+        except Exception as e:
+            print(f"⚠️ Local intent classification failed: {e}")
+    return await classify_query(query, llm)
+
 def get_small_talk_response(query: str) -> str:
     if "hi" in query.lower():
         return "Hello! How can I assist you today?"
@@ -83,52 +151,319 @@ def get_small_talk_response(query: str) -> str:
         return "Nice to chat! What else can I help you with?"
 
 
-def get_vector_store_for_meeting(meeting_id: str) -> Chroma:
-    collection_name = f"meeting_{meeting_id.replace('-', '_')}"
-    return Chroma(
-        client=client,
-        collection_name=collection_name,
-        embedding_function=embedding_function
+def _collection_name(meeting_id: str) -> str:
+    return f"{_MEETING_COLLECTION_PREFIX}{meeting_id.replace('-', '_')}"
+
+
+def _shared_collection(client):
+    # embedding_function=None: vectors always come from our own encoder
+    return client.get_or_create_collection(
+        name=RAG_SHARED_COLLECTION, embedding_function=None, metadata=_SHARED_COLLECTION_METADATA
     )
 
-async def add_transcript_to_store(meeting_id: str, transcript_segments: list[dict]):
+
+def _has_meeting_collection(client, meeting_id: str) -> bool:
+    """True if the meeting still has a per-meeting collection (indexed before the shared one, not yet migrated)."""
+    try:
+        client.get_collection(name=_collection_name(meeting_id))
+        return True
+    except Exception:
+        return False
+
+
+def _meeting_collection(client, meeting_id: str):
+    """
+    Returns (collection, where filter) selecting one meeting's chunks: the shared
+    collection filtered on meeting_id, unless the meeting's chunks are still in a
+    per-meeting collection.
+    """
+    if RAG_INDEX_MODE == "shared" and not _has_meeting_collection(client, meeting_id):
+        return _shared_collection(client), {"meeting_id": meeting_id}
+    return client.get_or_create_collection(name=_collection_name(meeting_id), embedding_function=None), None
+
+
+def _dense_search(collection, where, query_vector, k: int) -> List[tuple]:
+    """(chunk id, text) of the k chunks nearest to query_vector, nearest first."""
+    result = collection.query(query_embeddings=query_vector, n_results=k, where=where, include=["documents"])
+    return list(zip(result["ids"][0], result["documents"][0]))
+
+
+def _lexical_search(collection, where, meeting_id: str, query: str, k: int) -> List[tuple]:
+    """(chunk id, text) of the k best BM25 matches among the meeting's chunks, best first."""
+    ids = collection.get(where=where, include=[])["ids"]
+    index = meeting_index_cache.get(meeting_id, ids)
+    if index is None:
+        chunks = collection.get(where=where, include=["documents"])
+        ids = chunks["ids"]
+        index = BM25Index(chunks["documents"])
+        meeting_index_cache.put(meeting_id, ids, index)
+    return [(ids[position], index.documents[position]) for position, _ in index.search(query, k)]
+
+
+async def retrieve_chunks(meeting_id: str, query: str, k: int = RAG_TOP_K) -> List[str]:
+    """
+    Returns the k chunks of a meeting most relevant to query, best first. Vector
+    search and BM25 run side by side, and their rankings are merged with
+    reciprocal rank fusion (vector search only if RAG_HYBRID is off).
+    """
+    client = await chroma_client.aget()
+    encoder = await embeddings.aget()
+    loop = asyncio.get_running_loop()
+    collection, where = await loop.run_in_executor(None, _meeting_collection, client, meeting_id)
+    timings: Dict[str, float] = {}
+
+    async def dense():
+        started = time.perf_counter()
+        query_vector = await encoder.aencode([query])
+        timings["embed"] = time.perf_counter() - started
+        started = time.perf_counter()
+        hits = await loop.run_in_executor(None, _dense_search, collection, where, query_vector, RAG_CANDIDATES)
+        timings["vector"] = time.perf_counter() - started
+        return hits
+
+    async def lexical():
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(None, _lexical_search, collection, where, meeting_id, query, RAG_CANDIDATES)
+        except Exception as e:
+            print(f"⚠️ BM25 search failed, using vector search only: {e}")
+            return []
+        finally:
+            timings["bm25"] = time.perf_counter() - started
+
+    if RAG_HYBRID:
+        dense_hits, lexical_hits = await asyncio.gather(dense(), lexical())
+    else:
+        dense_hits, lexical_hits = await dense(), []
+
+    started = time.perf_counter()
+    texts = {**dict(dense_hits), **dict(lexical_hits)}
+    fused = reciprocal_rank_fusion([[chunk_id for chunk_id, _ in dense_hits], [chunk_id for chunk_id, _ in lexical_hits]])[:k]
+    timings["fusion"] = time.perf_counter() - started
+    stages = ", ".join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in timings.items())
+    print(f"🔎 Retrieved {len(fused)} chunks for meeting {meeting_id} "
+          f"(vector {len(dense_hits)}, bm25 {len(lexical_hits)} candidates): {stages}")
+    return [texts[chunk_id] for chunk_id, _ in fused]
+
+
+def _segment_time(segment: Dict[str, Any], key: str) -> Optional[float]:
+    # Live segments use the frontend's startTime/endTime, ASR segments start/end
+    value = segment.get(f"{key}Time", segment.get(key))
+    return float(value) if value is not None else None
+
+
+def _chunk_metadata(meeting_id: str, segments: List[Dict[str, Any]], line_starts: List[int],
+                    chunk_start: int, chunk_length: int, languages: Optional[List[str]]) -> Dict[str, Any]:
+    """
+    Metadata for the chunk at [chunk_start, chunk_start + chunk_length) of the joined
+    transcript: the meeting, the time range of the segments it overlaps and their
+    most common language. Chroma rejects None values, so unknown fields are left out.
+    """
+    metadata: Dict[str, Any] = {"meeting_id": meeting_id}
+    first = max(bisect.bisect_right(line_starts, chunk_start) - 1, 0)
+    last = max(bisect.bisect_left(line_starts, chunk_start + chunk_length) - 1, first)
+    overlapped = segments[first:last + 1]
+    starts = [time for time in (_segment_time(s, "start") for s in overlapped) if time is not None]
+    ends = [time for time in (_segment_time(s, "end") for s in overlapped) if time is not None]
+    if starts:
+        metadata["start_time"] = min(starts)
+    if ends:
+        metadata["end_time"] = max(ends)
+    segment_languages = [s["language"] for s in overlapped if s.get("language")]
+    if segment_languages:
+        metadata["language"] = Counter(segment_languages).most_common(1)[0][0]
+    elif languages:
+        metadata["language"] = languages[0]
+    return metadata
+
+
+async def add_transcript_to_store(meeting_id: str, transcript_segments: list[dict], languages: Optional[List[str]] = None):
     print(f"📥 Adding transcript for meeting {meeting_id} to vector store...")
 
     if not transcript_segments:
         print("⚠️ No transcript segments to add.")
         return
 
-    full_text = "\n".join([
+    lines = [
         f"Speaker {s.get('speakerId', 'Unknown')} ({s.get('startTime', 0):.2f}s): {s.get('text', '')}"
         for s in transcript_segments
-    ])
-
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = text_splitter.split_text(full_text)
-    documents = [Document(page_content=chunk, metadata={"meeting_id": meeting_id}) for chunk in chunks]
-
-    if not documents:
+    ]
+    full_text = "\n".join(lines)
+    # Offset of each segment's line in full_text, to map chunks back to segments
+    line_starts = []
+    offset = 0
+    for line in lines:
+        line_starts.append(offset)
+        offset += len(line) + 1
+
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+    documents = text_splitter.create_documents([full_text])
+    chunks = [document.page_content for document in documents]
+
+    if not chunks:
         print("⚠️ No documents created after splitting.")
         return
 
-    vector_store = get_vector_store_for_meeting(meeting_id)
+    metadatas = [
+        _chunk_metadata(meeting_id, transcript_segments, line_starts,
+                        document.metadata.get("start_index", 0), len(document.page_content), languages)
+        for document in documents
+    ]
+
+    vector_db = await chroma_client.aget()
+    encoder = await embeddings.aget()
 
     try:
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, vector_store.add_documents, documents)
-        print(f"✅ Successfully added {len(documents)} chunks to vector store.")
+        # Only chunks not embedded before are encoded (in batches, on the embedding
+        # engine's own thread); the float32 array goes to Chroma as is.
+        vectors = await encode_with_cache(encoder, encoder.identity, chunks)
+        loop = asyncio.get_running_loop()
+        if RAG_INDEX_MODE == "shared":
+            collection = _shared_collection(vector_db)
+            # A re-indexed meeting's chunks now live in the shared collection only
+            await loop.run_in_executor(None, _delete_meeting_collection, vector_db, meeting_id)
+        else:
+            # Same collection layout as LangChain's Chroma store
+            collection = vector_db.get_or_create_collection(name=_collection_name(meeting_id), embedding_function=None)
+        # Replace the meeting's previous chunks, so re-indexing and job retries don't duplicate them
+        await loop.run_in_executor(None, functools.partial(collection.delete, where={"meeting_id": meeting_id}))
+        await loop.run_in_executor(None, functools.partial(
+            collection.add,
+            ids=[str(uuid.uuid4()) for _ in chunks],
+            embeddings=vectors,
+            documents=chunks,
+            metadatas=metadatas,
+        ))
+        meeting_index_cache.invalidate(meeting_id)
+        print(f"✅ Successfully added {len(chunks)} chunks to vector store.")
     except Exception as e:
         print(f"❌ Error adding documents: {e}")
+        raise # Let the indexing job retry
+
+
+def _delete_meeting_collection(client, meeting_id: str) -> bool:
+    if not _has_meeting_collection(client, meeting_id):
+        return False
+    client.delete_collection(name=_collection_name(meeting_id))
+    return True
+
+
+async def delete_meeting_vectors(meeting_id: str):
+    """Removes a meeting's chunks from the vector store, in whichever layout they were indexed."""
+    meeting_index_cache.invalidate(meeting_id)
+    client = await chroma_client.aget()
+    loop = asyncio.get_running_loop()
+    if await loop.run_in_executor(None, _delete_meeting_collection, client, meeting_id):
+        print(f"Deleted vector collection: {_collection_name(meeting_id)}")
+    if RAG_INDEX_MODE == "shared":
+        collection = _shared_collection(client)
+        await loop.run_in_executor(None, functools.partial(collection.delete, where={"meeting_id": meeting_id}))
+        print(f"Deleted vectors of meeting {meeting_id} from {RAG_SHARED_COLLECTION}")
+
+
+async def semantic_search(query: str, limit: int = 20, hits_per_meeting: int = 3,
+                          meeting_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Searches the chunks of every meeting (or of meeting_ids) with one nearest-neighbour
+    query on the shared collection. Hits are grouped by meeting, meetings ranked by
+    their best hit. Scores are cosine similarities (higher is better).
+
+    Returns:
+        [{"meeting_id", "score", "hits": [{"text", "score", "start_time", "end_time", "language"}]}]
+    """
+    if RAG_INDEX_MODE != "shared":
+        raise RuntimeError("Semantic search needs RAG_INDEX_MODE=shared.")
+    encoder = await embeddings.aget()
+    query_vector = await encoder.aencode([query])
+    collection = _shared_collection(await chroma_client.aget())
+    where = None
+    if meeting_ids:
+        where = {"meeting_id": {"$in": list(meeting_ids)}} if len(meeting_ids) > 1 else {"meeting_id": meeting_ids[0]}
+    result = await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+        collection.query,
+        query_embeddings=query_vector,
+        # Enough chunks to fill `limit` meetings even when the best ones cluster in a few
+        n_results=limit * hits_per_meeting,
+        where=where,
+        include=["documents", "metadatas", "distances"],
+    ))
+
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for text, metadata, distance in zip(result["documents"][0], result["metadatas"][0], result["distances"][0]):
+        meeting_id = metadata.get("meeting_id")
+        score = round(1.0 - float(distance), 6)
+        group = grouped.setdefault(meeting_id, {"meeting_id": meeting_id, "score": score, "hits": []})
+        # Chroma returns hits nearest first, so a meeting's first hit is its best
+        if len(group["hits"]) < hits_per_meeting:
+            group["hits"].append({
+                "text": text,
+                "score": score,
+                "start_time": metadata.get("start_time"),
+                "end_time": metadata.get("end_time"),
+                "language": metadata.get("language"),
+            })
+    return list(grouped.values())[:limit]
+
+
+def _collection_names(client) -> List[str]:
+    # Chroma >= 0.6 lists names; older versions list Collection objects
+    return [c if isinstance(c, str) else c.name for c in client.list_collections()]
+
+
+def _migrate_collection(client, shared, name: str) -> int:
+    """Copies one per-meeting collection's chunks, vectors included, into the shared collection, then drops it."""
+    legacy = client.get_collection(name=name)
+    chunks = legacy.get(include=["embeddings", "documents", "metadatas"])
+    if chunks["ids"]:
+        meeting_id = next((m["meeting_id"] for m in chunks["metadatas"] if m and m.get("meeting_id")), None)
+        if meeting_id is None:
+            print(f"⚠️ Skipping vector collection {name}: its chunks have no meeting_id.")
+            return 0
+        metadatas = [{**(metadata or {}), "meeting_id": meeting_id} for metadata in chunks["metadatas"]]
+        # Idempotent if an earlier run stopped between copying and dropping
+        shared.delete(where={"meeting_id": meeting_id})
+        shared.add(ids=chunks["ids"], embeddings=chunks["embeddings"], documents=chunks["documents"], metadatas=metadatas)
+    client.delete_collection(name=name)
+    return len(chunks["ids"])
+
+
+async def migrate_meeting_collections() -> int:
+    """
+    Moves chunks from per-meeting collections into the shared collection, one meeting
+    at a time and without re-embedding. Until a meeting is moved, its chat still
+    reads the old collection. Migrated chunks carry only meeting_id; re-index
+    (POST /admin/reindex) to add time range and language. Returns the chunks moved.
+    """
+    if RAG_INDEX_MODE != "shared":
+        return 0
+    client = await chroma_client.aget()
+    loop = asyncio.get_running_loop()
+    shared = _shared_collection(client)
+    names = [name for name in await loop.run_in_executor(None, _collection_names, client)
+             if name.startswith(_MEETING_COLLECTION_PREFIX) and name != RAG_SHARED_COLLECTION]
+    if not names:
+        return 0
+    print(f"Migrating {len(names)} per-meeting vector collections to {RAG_SHARED_COLLECTION}...")
+    moved = 0
+    for name in names:
+        try:
+            moved += await loop.run_in_executor(None, _migrate_collection, client, shared, name)
+        except Exception as e:
+            print(f"⚠️ Could not migrate vector collection {name}: {e}")
+    print(f"Vector collection migration complete: {moved} chunks moved.")
+    return moved
 
 
 async def query_transcript(meeting_id: str, query: str) -> str:
+    llm = await get_llm()
     if not llm:
         return "LLM not available. Please check configuration."
 
     print(f"🔍 Querying transcript for meeting {meeting_id}: '{query}'")
 
     try:
-        query_type = await classify_query(query)
+        query_type = await detect_intent(query, llm)
 
         if query_type == "small_talk":
             return get_small_talk_response(query)
@@ -137,8 +472,7 @@ async def query_transcript(meeting_id: str, query: str) -> str:
         # This handles cases previously classified as "other" or potential classification errors.
         print(f"Treating query as RAG (original classification: '{query_type}')") # Added logging
 
-        vector_store = get_vector_store_for_meeting(meeting_id)
-        retriever = vector_store.as_retriever(search_kwargs={'k': 3})
+        context_chunks = await retrieve_chunks(meeting_id, query)
 
         prompt_template = """You are a helpful assistant. Answer the question based primarily on the provided context.
 Try to infer the answer from the context if it's not explicitly stated.
@@ -153,15 +487,11 @@ Question: {question}
 Answer:"""
         prompt = ChatPromptTemplate.from_template(prompt_template)
 
-        rag_chain = (
-            {"context": retriever, "question": RunnablePassthrough()}
-            | prompt
-            | llm
-            | StrOutputParser()
-        )
+        rag_chain = prompt | llm | StrOutputParser()
 
-        raw_answer = await rag_chain.ainvoke(query)
-        print(f"💬 Raw Answer: {raw_answer}") # Log raw answer for debugging
+        started = time.perf_counter()
+        raw_answer = await rag_chain.ainvoke({"context": "\n\n".join(context_chunks), "question": query})
+        print(f"💬 Raw Answer ({(time.perf_counter() - started) * 1000:.0f} ms): {raw_answer}") # Log raw answer for debugging
 
         # Clean the answer: remove <think> tags and "Answer:" prefix
         cleaned_answer = re.sub(r"<think>.*?</think>\s*", "", raw_answer, flags=re.DOTALL)
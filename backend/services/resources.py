@@ -0,0 +1,105 @@
+# Heavy resources (models, clients) loaded on first use instead of at import time.
+# Importing the app stays fast; warm_up() runs after startup and loads every
+# registered resource in the background, and /health/ready reports ready once
+# the required ones are loaded.
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Load every resource in the background right after startup. When false they load
+# on first use, and the API reports ready immediately.
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"
+
+
+class LazyResource:
+    """
+    A value built by `loader` the first time it is needed, at most once, from any thread.
+    A failed load is recorded and retried on the next use. Optional resources
+    (required=False) may fail without keeping the API from reporting ready.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any], required: bool = True):
+        self.name = name
+        self.required = required
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value: Any = None
+        self.state = "not_loaded" # not_loaded, loading, ready, failed
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def get(self) -> Any:
+        """Returns the value, loading it in the calling thread if needed. Raises if the load fails."""
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if self._loaded:
+                return self._value
+            self.state = "loading"
+            started = time.perf_counter()
+            try:
+                value = self._loader()
+            except Exception as e:
+                self.load_seconds = round(time.perf_counter() - started, 3)
+                self.state = "failed"
+                self.error = str(e)
+                print(f"Failed to load {self.name} after {self.load_seconds:.2f}s: {e}")
+                raise
+            self._value = value
+            self._loaded = True
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            self.state = "ready"
+            self.error = None
+            print(f"Loaded {self.name} in {self.load_seconds:.2f}s.")
+            return value
+
+    async def aget(self) -> Any:
+        """Like get(), but a load runs in a worker thread so the event loop is never blocked."""
+        if self._loaded:
+            return self._value
+        return await asyncio.get_running_loop().run_in_executor(None, self.get)
+
+    def status(self) -> Dict[str, Any]:
+        return {"state": self.state, "required": self.required, "load_seconds": self.load_seconds, "error": self.error}
+
+
+_resources: Dict[str, LazyResource] = {}
+_warmup = {"state": "not_started", "seconds": None}
+
+
+def register(name: str, loader: Callable[[], Any], required: bool = True) -> LazyResource:
+    """Creates a lazily loaded resource and includes it in the warm-up and readiness report."""
+    resource = LazyResource(name, loader, required=required)
+    _resources[name] = resource
+    return resource
+
+
+async def warm_up():
+    """Loads every registered resource concurrently, each in its own thread. Failures are recorded, not raised."""
+    _warmup["state"] = "running"
+    started = time.perf_counter()
+    print(f"Warming up: {', '.join(_resources)}...")
+    await asyncio.gather(*(resource.aget() for resource in _resources.values()), return_exceptions=True)
+    _warmup["seconds"] = round(time.perf_counter() - started, 3)
+    _warmup["state"] = "done"
+    print(f"Warm-up finished in {_warmup['seconds']:.2f}s; ready: {is_ready()}.")
+
+
+def is_ready() -> bool:
+    """True once every required resource is loaded (always true when MODEL_WARMUP is off)."""
+    if not MODEL_WARMUP:
+        return True
+    return all(resource.state == "ready" for resource in _resources.values() if resource.required)
+
+
+def readiness() -> Dict[str, Any]:
+    """Readiness plus the state and load time of each resource."""
+    return {
+        "ready": is_ready(),
+        "warmup": {"enabled": MODEL_WARMUP, **_warmup},
+        "components": {name: resource.status() for name, resource in _resources.items()},
+    }
@@ -0,0 +1,159 @@
+# ASR result cache database interaction logic using SQLAlchemy
+# Re-uploads of the same recording skip transcription: results are keyed by the
+# SHA-256 of the uploaded bytes plus the ASR backend, model and decoding options.
+
+import os
+import json
+import hashlib
+import datetime
+from typing import Dict, Any, Optional
+from sqlalchemy import func, select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from ...db.database import AsrCacheEntry, get_async_session
+
+# Total size of cached results; least recently used entries are evicted beyond this
+ASR_CACHE_MAX_BYTES = int(os.getenv("ASR_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+ASR_CACHE_ENABLED = os.getenv("ASR_CACHE_ENABLED", "true").lower() == "true"
+
+# Lookups served by this process since startup
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def make_cache_key(audio_sha256: str, options: Dict[str, Any]) -> str:
+    """Combines the audio hash and the decoding options into one cache key."""
+    options_json = json.dumps(options, sort_keys=True)
+    return hashlib.sha256(f"{audio_sha256}:{options_json}".encode("utf-8")).hexdigest()
+
+
+async def get_cached_asr_result(cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the cached ASR result (transcript, languages, segments) for cache_key,
+    or None on a miss. A hit refreshes the entry's LRU position.
+    """
+    if not ASR_CACHE_ENABLED:
+        return None
+    db: AsyncSession = get_async_session()
+    try:
+        entry = await db.get(AsrCacheEntry, cache_key)
+        if not entry:
+            _stats["misses"] += 1
+            return None
+        entry.hits = (entry.hits or 0) + 1
+        entry.last_accessed_at = datetime.datetime.utcnow()
+        await db.commit()
+        _stats["hits"] += 1
+        return {
+            "transcript": entry.transcript,
+            "languages": json.loads(entry.languages or '[]'),
+            "segments": json.loads(entry.segments or '[]'),
+        }
+    except (SQLAlchemyError, json.JSONDecodeError) as e:
+        print(f"Error reading ASR cache entry {cache_key}: {e}")
+        await db.rollback()
+        return None
+    finally:
+        await db.close()
+
+
+async def _evict_to_fit(db: AsyncSession) -> int:
+    """Deletes least recently used entries until the cache fits ASR_CACHE_MAX_BYTES. Returns the count deleted."""
+    total = (await db.execute(select(func.coalesce(func.sum(AsrCacheEntry.size_bytes), 0)))).scalar()
+    evicted = 0
+    if total <= ASR_CACHE_MAX_BYTES:
+        return 0
+    lru_order = select(AsrCacheEntry.key, AsrCacheEntry.size_bytes).order_by(AsrCacheEntry.last_accessed_at.asc())
+    for key, size in (await db.execute(lru_order)).all():
+        if total <= ASR_CACHE_MAX_BYTES:
+            break
+        await db.execute(delete(AsrCacheEntry).where(AsrCacheEntry.key == key))
+        total -= size or 0
+        evicted += 1
+    return evicted
+
+
+async def store_asr_result(cache_key: str, audio_sha256: str, options: Dict[str, Any], asr_result: Dict[str, Any]) -> bool:
+    """Stores (or replaces) an ASR result and evicts old entries if the cache is over its size cap."""
+    if not ASR_CACHE_ENABLED:
+        return False
+    transcript = asr_result.get("transcript") or ""
+    languages_json = json.dumps(asr_result.get("languages", []))
+    segments_json = json.dumps(asr_result.get("segments", []))
+    size_bytes = len(transcript.encode("utf-8")) + len(languages_json) + len(segments_json)
+    if size_bytes > ASR_CACHE_MAX_BYTES:
+        print(f"ASR result for {audio_sha256} ({size_bytes} bytes) exceeds the cache size cap; not caching.")
+        return False
+
+    db: AsyncSession = get_async_session()
+    now = datetime.datetime.utcnow()
+    try:
+        await db.merge(AsrCacheEntry(
+            key=cache_key,
+            audio_sha256=audio_sha256,
+            options=json.dumps(options, sort_keys=True),
+            transcript=transcript,
+            languages=languages_json,
+            segments=segments_json,
+            size_bytes=size_bytes,
+            hits=0,
+            created_at=now,
+            last_accessed_at=now,
+        ))
+        await db.flush()
+        evicted = await _evict_to_fit(db)
+        await db.commit()
+        _stats["evictions"] += evicted
+        if evicted:
+            print(f"ASR cache: evicted {evicted} least recently used entries.")
+        return True
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) storing ASR cache entry for {audio_sha256}: {e}")
+        await db.rollback()
+        return False
+    finally:
+        await db.close()
+
+
+async def get_asr_cache_stats() -> Dict[str, Any]:
+    """Returns the size of the cache and hit/miss counters."""
+    db: AsyncSession = get_async_session()
+    try:
+        entries, total_bytes, stored_hits = (await db.execute(select(
+            func.count(AsrCacheEntry.key),
+            func.coalesce(func.sum(AsrCacheEntry.size_bytes), 0),
+            func.coalesce(func.sum(AsrCacheEntry.hits), 0),
+        ))).one()
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            "enabled": ASR_CACHE_ENABLED,
+            "entries": entries,
+            "total_bytes": total_bytes,
+            "max_bytes": ASR_CACHE_MAX_BYTES,
+            "lifetime_hits": stored_hits, # Hits on entries currently in the cache
+            "hits": _stats["hits"], # Since this process started
+            "misses": _stats["misses"],
+            "hit_rate": (_stats["hits"] / lookups) if lookups else 0.0,
+            "evictions": _stats["evictions"],
+        }
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) reading ASR cache stats: {e}")
+        return {}
+    finally:
+        await db.close()
+
+
+async def purge_asr_cache() -> int:
+    """Deletes every cached ASR result. Returns the number of entries removed."""
+    db: AsyncSession = get_async_session()
+    try:
+        deleted = (await db.execute(delete(AsrCacheEntry))).rowcount
+        await db.commit()
+        print(f"Purged {deleted} ASR cache entries.")
+        return deleted
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) purging ASR cache: {e}")
+        await db.rollback()
+        return 0
+    finally:
+        await db.close()
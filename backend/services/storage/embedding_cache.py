@@ -0,0 +1,185 @@
+# Embedding cache database interaction logic using SQLAlchemy
+# Re-indexing a meeting (or the whole corpus after a chunking change) only embeds
+# chunks whose text hasn't been embedded before: vectors are keyed by the embedding
+# model and runtime plus the SHA-256 of the chunk text, and stored as float16.
+
+import os
+import hashlib
+import datetime
+from typing import Any, Dict, List
+import numpy as np
+from sqlalchemy import func, select, delete, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from ...db.database import EmbeddingCacheEntry, get_async_session
+
+# Total size of cached vectors; least recently used entries are evicted beyond this
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+# Keys per IN (...) lookup, below SQLite's bound-parameter limit
+_LOOKUP_BATCH = 500
+
+# Lookups served by this process since startup
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+async def get_cached_embeddings(model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Returns the cached float32 vectors among `hashes` for model, keyed by hash.
+    Hits refresh their entries' LRU position.
+    """
+    if not EMBEDDING_CACHE_ENABLED or not hashes:
+        return {}
+    db: AsyncSession = get_async_session()
+    try:
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), _LOOKUP_BATCH):
+            batch = unique[start:start + _LOOKUP_BATCH]
+            rows = (await db.execute(
+                select(EmbeddingCacheEntry.text_sha256, EmbeddingCacheEntry.vector)
+                .where(EmbeddingCacheEntry.model == model, EmbeddingCacheEntry.text_sha256.in_(batch))
+            )).all()
+            for key, vector in rows:
+                found[key] = np.frombuffer(vector, dtype=np.float16).astype(np.float32)
+            if rows:
+                await db.execute(
+                    update(EmbeddingCacheEntry)
+                    .where(EmbeddingCacheEntry.model == model, EmbeddingCacheEntry.text_sha256.in_([key for key, _ in rows]))
+                    .values(last_accessed_at=datetime.datetime.utcnow())
+                )
+        await db.commit()
+        _stats["hits"] += len(found)
+        _stats["misses"] += len(unique) - len(found)
+        return found
+    except SQLAlchemyError as e:
+        print(f"Error reading embedding cache entries: {e}")
+        await db.rollback()
+        return {}
+    finally:
+        await db.close()
+
+
+async def _evict_to_fit(db: AsyncSession) -> int:
+    """Deletes least recently used entries until the cache fits EMBEDDING_CACHE_MAX_BYTES. Returns the count deleted."""
+    total = (await db.execute(select(func.coalesce(func.sum(EmbeddingCacheEntry.size_bytes), 0)))).scalar()
+    if total <= EMBEDDING_CACHE_MAX_BYTES:
+        return 0
+    # Running total, newest first; entries of one store share a timestamp, so the key breaks ties
+    # and every entry gets its own total. Entries whose total passes the cap are evicted.
+    running = select(
+        EmbeddingCacheEntry.model,
+        EmbeddingCacheEntry.text_sha256,
+        func.sum(EmbeddingCacheEntry.size_bytes).over(
+            order_by=(EmbeddingCacheEntry.last_accessed_at.desc(), EmbeddingCacheEntry.model.desc(),
+                      EmbeddingCacheEntry.text_sha256.desc()),
+            rows=(None, 0),
+        ).label("running_bytes"),
+    ).subquery()
+    evicted = select(running.c.model, running.c.text_sha256).where(running.c.running_bytes > EMBEDDING_CACHE_MAX_BYTES)
+    return (await db.execute(delete(EmbeddingCacheEntry).where(
+        tuple_(EmbeddingCacheEntry.model, EmbeddingCacheEntry.text_sha256).in_(evicted)
+    ))).rowcount
+
+
+async def store_embeddings(model: str, hashes: List[str], vectors: np.ndarray) -> bool:
+    """Stores (or replaces) one vector per hash and evicts old entries if the cache is over its size cap."""
+    if not EMBEDDING_CACHE_ENABLED or not hashes:
+        return False
+    db: AsyncSession = get_async_session()
+    now = datetime.datetime.utcnow()
+    try:
+        rows = [
+            {"model": model, "text_sha256": key, "vector": vector.tobytes(), "size_bytes": vector.nbytes,
+             "created_at": now, "last_accessed_at": now}
+            for key, vector in zip(hashes, vectors.astype(np.float16))
+        ]
+        # One executemany upsert rather than a SELECT per vector
+        upsert = sqlite_insert(EmbeddingCacheEntry)
+        await db.execute(upsert.on_conflict_do_update(
+            index_elements=[EmbeddingCacheEntry.model, EmbeddingCacheEntry.text_sha256],
+            set_={"vector": upsert.excluded.vector, "size_bytes": upsert.excluded.size_bytes,
+                  "last_accessed_at": upsert.excluded.last_accessed_at},
+        ), rows)
+        evicted = await _evict_to_fit(db)
+        await db.commit()
+        _stats["evictions"] += evicted
+        if evicted:
+            print(f"Embedding cache: evicted {evicted} least recently used entries.")
+        return True
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) storing {len(hashes)} embedding cache entries: {e}")
+        await db.rollback()
+        return False
+    finally:
+        await db.close()
+
+
+async def encode_with_cache(encoder, model: str, texts: List[str]) -> np.ndarray:
+    """
+    Embeds texts with encoder.aencode, reusing cached vectors for texts already
+    embedded by `model`. Only the misses (each distinct text once) are encoded,
+    then cached. Returns float32 vectors in the order of texts.
+    """
+    hashes = [text_sha256(text) for text in texts]
+    cached = await get_cached_embeddings(model, hashes)
+    missing = {key: text for key, text in zip(hashes, texts) if key not in cached}
+    if missing:
+        vectors = await encoder.aencode(list(missing.values()))
+        await store_embeddings(model, list(missing), vectors)
+        cached.update(zip(missing, vectors))
+    if texts:
+        print(f"Embedding cache: embedded {len(missing)} new chunk(s), reused {len(texts) - len(missing)} of {len(texts)}.")
+    return np.stack([cached[key] for key in hashes]) if hashes else np.empty((0, 0), dtype=np.float32)
+
+
+async def get_embedding_cache_stats() -> Dict[str, Any]:
+    """Returns the size of the cache and hit/miss counters."""
+    db: AsyncSession = get_async_session()
+    try:
+        entries, total_bytes = (await db.execute(select(
+            func.count(),
+            func.coalesce(func.sum(EmbeddingCacheEntry.size_bytes), 0),
+        ).select_from(EmbeddingCacheEntry))).one()
+        models = (await db.execute(
+            select(EmbeddingCacheEntry.model, func.count()).group_by(EmbeddingCacheEntry.model)
+        )).all()
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            "enabled": EMBEDDING_CACHE_ENABLED,
+            "entries": entries,
+            "entries_per_model": dict(models),
+            "total_bytes": total_bytes,
+            "max_bytes": EMBEDDING_CACHE_MAX_BYTES,
+            "hits": _stats["hits"], # Since this process started
+            "misses": _stats["misses"],
+            "hit_rate": (_stats["hits"] / lookups) if lookups else 0.0,
+            "evictions": _stats["evictions"],
+        }
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) reading embedding cache stats: {e}")
+        return {}
+    finally:
+        await db.close()
+
+
+async def purge_embedding_cache() -> int:
+    """Deletes every cached vector. Returns the number of entries removed."""
+    db: AsyncSession = get_async_session()
+    try:
+        deleted = (await db.execute(delete(EmbeddingCacheEntry))).rowcount
+        await db.commit()
+        print(f"Purged {deleted} embedding cache entries.")
+        return deleted
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) purging embedding cache: {e}")
+        await db.rollback()
+        return 0
+    finally:
+        await db.close()
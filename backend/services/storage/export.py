@@ -0,0 +1,254 @@
+# Bulk NDJSON export and import of meetings
+# Export streams one meeting per line from a server-side cursor, so memory stays
+# constant however many meetings there are. Import reads the same format and
+# inserts it in batched transactions (backups, restores and migrations).
+
+import datetime
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from ...db.database import Meeting, TranscriptSegment, get_async_session
+from .serializer import meeting_values_to_json, dumps, loads
+from .transcript import segment_row_to_dict, segment_row_from_dict
+from .meeting_cache import meeting_cache
+from .meeting import enqueue_reindex
+
+# Meetings fetched per round trip while exporting, and inserted per transaction while importing
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "200"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+# Errors listed in the import summary; further ones are only counted
+MAX_REPORTED_IMPORT_ERRORS = 50
+
+EXPORT_FIELDS = tuple(c.name for c in Meeting.__table__.columns)
+IMPORT_CONFLICT_MODES = ("skip", "replace")
+
+
+def _to_utc_naive(value: datetime.datetime) -> datetime.datetime:
+    """upload_time is stored as naive UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_export_fields(fields: Optional[str]) -> List[str]:
+    """
+    Turns a comma-separated projection into column names (id is always included).
+    Raises ValueError for unknown fields.
+    """
+    if not fields:
+        return list(EXPORT_FIELDS)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in EXPORT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(EXPORT_FIELDS)}")
+    return ["id"] + [field for field in EXPORT_FIELDS if field in requested and field != "id"]
+
+
+async def _segments_by_meeting(db: AsyncSession, meeting_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    rows = (await db.execute(
+        select(TranscriptSegment)
+        .where(TranscriptSegment.meeting_id.in_(meeting_ids))
+        .order_by(TranscriptSegment.meeting_id, TranscriptSegment.idx)
+    )).scalars().all()
+    segments: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        segments.setdefault(row.meeting_id, []).append(segment_row_to_dict(row))
+    return segments
+
+
+async def stream_meetings_ndjson(fields: List[str],
+                                 uploaded_after: Optional[datetime.datetime] = None,
+                                 uploaded_before: Optional[datetime.datetime] = None,
+                                 statuses: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+    """
+    Yields meetings as NDJSON lines, oldest first, in the same document shape as
+    GET /meetings/json/{job_id} restricted to `fields` (from parse_export_fields).
+
+    Rows come from a server-side cursor EXPORT_BATCH_SIZE at a time; live meeting
+    segments are read per batch, and only when the transcript is exported. Only
+    the selected columns are read, so a projection without the transcript never
+    decompresses it.
+    """
+    db: AsyncSession = get_async_session()
+    try:
+        query = select(*(getattr(Meeting, field) for field in fields))
+        if uploaded_after:
+            query = query.where(Meeting.upload_time >= _to_utc_naive(uploaded_after))
+        if uploaded_before:
+            query = query.where(Meeting.upload_time < _to_utc_naive(uploaded_before))
+        if statuses:
+            query = query.where(Meeting.status.in_(statuses))
+        query = query.order_by(Meeting.upload_time, Meeting.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            segments = {}
+            if "transcript" in fields:
+                segments = await _segments_by_meeting(db, [row.id for row in partition])
+            yield b"".join(
+                meeting_values_to_json(dict(row._mapping), segments.get(row.id)) + b"\n"
+                for row in partition
+            )
+    except SQLAlchemyError as e:
+        # Headers are already sent; the truncated stream ends with an error line
+        print(f"Database error (SQLAlchemy) exporting meetings: {e}")
+        yield dumps({"error": f"Export failed: {e}"}) + b"\n"
+    finally:
+        await db.close()
+
+
+async def _ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Splits a byte stream into lines without holding more than one partial line."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    yield pending
+
+
+def _meeting_from_document(document: Dict[str, Any]) -> Tuple[Meeting, List[TranscriptSegment]]:
+    """
+    Builds a Meeting row and its live transcript segment rows from an exported document.
+    Raises ValueError or TypeError if the document can't be imported.
+    """
+    meeting_id = document.get("id")
+    if not isinstance(meeting_id, str) or not meeting_id:
+        raise ValueError("missing 'id'")
+    upload_time = document.get("upload_time")
+    if isinstance(upload_time, str):
+        upload_time = _to_utc_naive(datetime.datetime.fromisoformat(upload_time))
+    elif upload_time is not None:
+        raise ValueError("'upload_time' must be an ISO timestamp")
+    transcript = document.get("transcript")
+    segments: List[Dict[str, Any]] = []
+    if isinstance(transcript, list):
+        # Segment rows are inserted separately; the column holds the plain text
+        if not all(isinstance(seg, dict) for seg in transcript):
+            raise ValueError("transcript segments must be objects")
+        segments = transcript
+        transcript = " ".join(seg.get("text", "") for seg in segments)
+    # Converted here, so a bad segment fails only its own document
+    segment_rows = [segment_row_from_dict(meeting_id, idx, seg) for idx, seg in enumerate(segments)]
+    meeting = Meeting(
+        id=meeting_id,
+        filename=document.get("filename"),
+        upload_time=upload_time or datetime.datetime.utcnow(),
+        status=document.get("status") or "completed",
+        transcript=transcript,
+        summary=document.get("summary"),
+        action_items=json.dumps(document.get("action_items") or [], ensure_ascii=False),
+        decisions=json.dumps(document.get("decisions") or [], ensure_ascii=False),
+        languages=json.dumps(document.get("languages") or []),
+        pdf_path=document.get("pdf_path"),
+    )
+    return meeting, segment_rows
+
+
+async def _write_import_batch(batch: List[Tuple[Meeting, List[TranscriptSegment]]], on_conflict: str,
+                             summary: Dict[str, Any]) -> List[str]:
+    """
+    Inserts one batch of meetings in a single transaction, skipping or replacing existing ones.
+    Returns the ids of the meetings written.
+    """
+    db: AsyncSession = get_async_session()
+    try:
+        ids = [meeting.id for meeting, _ in batch]
+        existing = dict((await db.execute(select(Meeting.id, Meeting.version).where(Meeting.id.in_(ids)))).all())
+        if on_conflict == "skip":
+            batch = [(meeting, segments) for meeting, segments in batch if meeting.id not in existing]
+        elif existing:
+            await db.execute(delete(TranscriptSegment).where(TranscriptSegment.meeting_id.in_(existing)))
+            await db.execute(delete(Meeting).where(Meeting.id.in_(existing)))
+
+        for meeting, segments in batch:
+            if meeting.id in existing:
+                # Versions only ever grow, so other processes' cached copies of the old row are seen as stale
+                meeting.version = (existing[meeting.id] or 0) + 1
+            db.add(meeting)
+            db.add_all(segments)
+        await db.commit()
+        if on_conflict == "replace":
+            for meeting_id in existing:
+                meeting_cache.invalidate(meeting_id)
+        replaced = len(existing) if on_conflict == "replace" else 0
+        summary["imported"] += len(batch) - replaced
+        summary["replaced"] += replaced
+        summary["skipped"] += len(ids) - len(batch)
+        return [meeting.id for meeting, _ in batch]
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) importing a batch of {len(batch)} meetings: {e}")
+        await db.rollback()
+        _record_import_error(summary, None, f"Batch of {len(batch)} meetings not imported: {e}", count=len(batch))
+        return []
+    finally:
+        await db.close()
+
+
+async def _queue_indexing(meeting_ids: List[str]) -> int:
+    # Chat and semantic search only see a meeting once its chunks are in the vector store
+    return await enqueue_reindex(meeting_ids) if meeting_ids else 0
+
+
+def _record_import_error(summary: Dict[str, Any], line_number: Optional[int], message: str, count: int = 1):
+    summary["failed"] += count
+    if len(summary["errors"]) < MAX_REPORTED_IMPORT_ERRORS:
+        summary["errors"].append({"line": line_number, "error": message})
+
+
+async def import_meetings_ndjson(chunks: AsyncIterator[bytes], on_conflict: str = "skip",
+                                 batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Imports meetings from an NDJSON stream in the export format.
+
+    Documents are inserted batch_size per transaction. A meeting whose id already
+    exists is skipped (on_conflict='skip') or replaced together with its segments
+    ('replace'). Lines that aren't valid documents (malformed JSON, wrong value
+    types) are reported with their line number and skipped; a batch that fails to
+    write is rolled back and reported as a whole. Only one batch is held in memory.
+    Every meeting written (imported or replaced) is queued for RAG indexing.
+
+    Returns:
+        {"imported", "replaced", "skipped", "failed", "indexing_queued", "errors": [{"line", "error"}], "seconds"}
+    """
+    if on_conflict not in IMPORT_CONFLICT_MODES:
+        raise ValueError(f"on_conflict must be one of: {', '.join(IMPORT_CONFLICT_MODES)}")
+    started = time.perf_counter()
+    summary: Dict[str, Any] = {"imported": 0, "replaced": 0, "skipped": 0, "failed": 0, "indexing_queued": 0, "errors": []}
+    batch: List[Tuple[Meeting, List[TranscriptSegment]]] = []
+    batch_ids: Set[str] = set()
+    line_number = 0
+    async for line in _ndjson_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            document = loads(line)
+            if not isinstance(document, dict):
+                raise ValueError("not a JSON object")
+            meeting, segments = _meeting_from_document(document)
+        except (ValueError, TypeError) as e: # Includes JSON decode errors and unconvertible values
+            _record_import_error(summary, line_number, str(e))
+            continue
+        if meeting.id in batch_ids:
+            _record_import_error(summary, line_number, f"duplicate id {meeting.id}")
+            continue
+        batch.append((meeting, segments))
+        batch_ids.add(meeting.id)
+        if len(batch) >= batch_size:
+            written = await _write_import_batch(batch, on_conflict, summary)
+            summary["indexing_queued"] += await _queue_indexing(written)
+            batch, batch_ids = [], set()
+    if batch:
+        written = await _write_import_batch(batch, on_conflict, summary)
+        summary["indexing_queued"] += await _queue_indexing(written)
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    print(f"Imported meetings: {summary['imported']} new, {summary['replaced']} replaced, "
+          f"{summary['skipped']} skipped, {summary['failed']} failed in {summary['seconds']}s.")
+    return summary
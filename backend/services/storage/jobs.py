@@ -0,0 +1,292 @@
+# Job queue database interaction logic using SQLAlchemy
+# Jobs are rows in the 'jobs' table so queued and interrupted work survives restarts.
+# A running job is leased to one worker process, which renews the lease while it runs;
+# only jobs whose lease has lapsed (their process died) are re-queued, so API processes
+# sharing the database never take over each other's running jobs.
+
+import json
+import datetime
+from typing import Dict, Any, List, Optional
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from ...db.database import Job, get_async_session
+from ..asr_scheduler import PRIORITY_BULK
+
+
+def _job_to_dict(job: Job, include_payload: bool = False) -> Dict[str, Any]:
+    """Converts a Job row to a JSON-serializable dictionary."""
+    job_data = {c.name: getattr(job, c.name) for c in job.__table__.columns}
+    payload = job_data.pop('payload')
+    if include_payload:
+        try:
+            job_data['payload'] = json.loads(payload or '{}')
+        except json.JSONDecodeError:
+            job_data['payload'] = {}
+    for key in ('next_run_at', 'created_at', 'updated_at', 'started_at', 'finished_at', 'lease_expires_at'):
+        if isinstance(job_data.get(key), datetime.datetime):
+            job_data[key] = job_data[key].replace(tzinfo=datetime.timezone.utc).isoformat()
+    return job_data
+
+
+async def enqueue_job(stage: str, meeting_id: str, payload: Dict[str, Any], max_attempts: int = 3,
+                      priority: int = PRIORITY_BULK) -> Optional[Dict[str, Any]]:
+    """Inserts a new queued job. Returns the job (without payload) or None on error."""
+    db: AsyncSession = get_async_session()
+    now = datetime.datetime.utcnow()
+    try:
+        job = Job(
+            meeting_id=meeting_id,
+            stage=stage,
+            status='queued',
+            payload=json.dumps(payload),
+            attempts=0,
+            max_attempts=max_attempts,
+            priority=priority,
+            next_run_at=now,
+            created_at=now,
+            updated_at=now,
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        return _job_to_dict(job)
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) enqueuing {stage} job for meeting {meeting_id}: {e}")
+        await db.rollback()
+        return None
+    finally:
+        await db.close()
+
+
+def _live_lease(now: datetime.datetime):
+    return and_(Job.status == 'running', Job.lease_expires_at > now)
+
+
+async def claim_next_job(stage: str, owner: str, lease_seconds: float, max_running: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Atomically moves the next due job of a stage (lowest priority value, then oldest)
+    from 'queued' to 'running', leased to `owner` for lease_seconds, and returns it
+    with its payload, or None if nothing is due. With max_running, nothing is claimed while that many jobs
+    of the stage are running with a live lease, across every process.
+    """
+    db: AsyncSession = get_async_session()
+    now = datetime.datetime.utcnow()
+    try:
+        candidates = (await db.execute(select(Job.id).where(
+            Job.stage == stage, Job.status == 'queued', Job.next_run_at <= now
+        ).order_by(Job.priority.asc(), Job.id.asc()).limit(5))).all()
+        for (job_id,) in candidates:
+            # Compare-and-set so two workers (or processes) never claim the same job
+            condition = and_(Job.id == job_id, Job.status == 'queued')
+            if max_running is not None:
+                # Checked in the same statement; SQLite runs one write at a time, so the limit holds
+                running = select(func.count(Job.id)).where(Job.stage == stage, _live_lease(now)).scalar_subquery()
+                condition = and_(condition, running < max_running)
+            claimed = (await db.execute(update(Job).where(condition).values(
+                status='running',
+                attempts=Job.attempts + 1,
+                owner=owner,
+                lease_expires_at=now + datetime.timedelta(seconds=lease_seconds),
+                started_at=now,
+                updated_at=now,
+            ).execution_options(synchronize_session=False))).rowcount
+            await db.commit()
+            if claimed:
+                job = await db.get(Job, job_id, populate_existing=True)
+                return _job_to_dict(job, include_payload=True)
+        return None
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) claiming {stage} job: {e}")
+        await db.rollback()
+        return None
+    finally:
+        await db.close()
+
+
+async def renew_job_leases(owner: str, lease_seconds: float) -> int:
+    """Extends the lease of every job `owner` is running. Returns the number of jobs renewed."""
+    db: AsyncSession = get_async_session()
+    now = datetime.datetime.utcnow()
+    try:
+        renewed = (await db.execute(update(Job).where(Job.owner == owner, Job.status == 'running').values(
+            lease_expires_at=now + datetime.timedelta(seconds=lease_seconds),
+        ))).rowcount
+        await db.commit()
+        return renewed
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) renewing job leases for {owner}: {e}")
+        await db.rollback()
+        return 0
+    finally:
+        await db.close()
+
+
+async def complete_job(job_id: int, owner: Optional[str] = None) -> bool:
+    """
+    Marks a running job as succeeded. With owner, a job that has since been
+    re-queued or taken by another worker is left alone.
+    """
+    db: AsyncSession = get_async_session()
+    now = datetime.datetime.utcnow()
+    try:
+        condition = and_(Job.id == job_id, Job.status == 'running')
+        if owner is not None:
+            condition = and_(condition, Job.owner == owner)
+        updated = (await db.execute(update(Job).where(condition).values(
+            status='succeeded',
+            last_error=None,
+            lease_expires_at=None,
+            finished_at=now,
+            updated_at=now,
+        ))).rowcount
+        await db.commit()
+        return updated > 0
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) completing job {job_id}: {e}")
+        await db.rollback()
+        return False
+    finally:
+        await db.close()
+
+
+async def fail_job(job_id: int, error: str, retry_delay_seconds: float, owner: Optional[str] = None) -> Optional[str]:
+    """
+    Records a failed attempt. The job is re-queued after retry_delay_seconds
+    while attempts remain, otherwise it is marked 'failed'. With owner, a job
+    that has since been re-queued and taken by another worker is left alone.
+
+    Returns the job's new status ('queued' or 'failed'), or None on error.
+    """
+    db: AsyncSession = get_async_session()
+    now = datetime.datetime.utcnow()
+    try:
+        job = await db.get(Job, job_id)
+        if not job or (owner is not None and job.owner != owner):
+            return None
+        job.last_error = error
+        job.updated_at = now
+        job.lease_expires_at = None
+        if (job.attempts or 0) < (job.max_attempts or 1):
+            job.status = 'queued'
+            job.next_run_at = now + datetime.timedelta(seconds=retry_delay_seconds)
+        else:
+            job.status = 'failed'
+            job.finished_at = now
+        await db.commit()
+        return job.status
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) failing job {job_id}: {e}")
+        await db.rollback()
+        return None
+    finally:
+        await db.close()
+
+
+async def release_job(job_id: int, owner: Optional[str] = None) -> bool:
+    """Returns a running job to the queue without counting the attempt (used on shutdown)."""
+    db: AsyncSession = get_async_session()
+    try:
+        condition = and_(Job.id == job_id, Job.status == 'running')
+        if owner is not None:
+            condition = and_(condition, Job.owner == owner)
+        updated = (await db.execute(update(Job).where(condition).values(
+            status='queued',
+            attempts=func.max(Job.attempts - 1, 0),
+            owner=None,
+            lease_expires_at=None,
+            updated_at=datetime.datetime.utcnow(),
+        ))).rowcount
+        await db.commit()
+        return updated > 0
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) releasing job {job_id}: {e}")
+        await db.rollback()
+        return False
+    finally:
+        await db.close()
+
+
+async def requeue_stale_jobs() -> int:
+    """
+    Re-queues 'running' jobs whose lease has lapsed: their process crashed or was
+    killed without releasing them. Jobs without a lease were started before leases
+    existed. Jobs other live processes are running keep their renewed leases.
+    """
+    db: AsyncSession = get_async_session()
+    now = datetime.datetime.utcnow()
+    try:
+        requeued = (await db.execute(update(Job).where(
+            Job.status == 'running',
+            or_(Job.lease_expires_at.is_(None), Job.lease_expires_at <= now),
+        ).values(
+            status='queued',
+            owner=None,
+            lease_expires_at=None,
+            next_run_at=now,
+            updated_at=now,
+        ))).rowcount
+        await db.commit()
+        return requeued
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) re-queuing stale jobs: {e}")
+        await db.rollback()
+        return 0
+    finally:
+        await db.close()
+
+
+async def get_queue_stats() -> Dict[str, Any]:
+    """Returns job counts per stage and status, plus the age of the oldest queued job per stage."""
+    db: AsyncSession = get_async_session()
+    now = datetime.datetime.utcnow()
+    try:
+        stats: Dict[str, Any] = {}
+        counts = select(Job.stage, Job.status, func.count(Job.id)).group_by(Job.stage, Job.status)
+        for stage, status, count in (await db.execute(counts)).all():
+            stats.setdefault(stage, {"queued": 0, "running": 0, "succeeded": 0, "failed": 0})[status] = count
+        oldest_queued = select(Job.stage, func.min(Job.created_at)).where(Job.status == 'queued').group_by(Job.stage)
+        for stage, oldest in (await db.execute(oldest_queued)).all():
+            if oldest:
+                stats[stage]["oldest_queued_seconds"] = (now - oldest).total_seconds()
+        return stats
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) reading queue stats: {e}")
+        return {}
+    finally:
+        await db.close()
+
+
+async def get_jobs(meeting_id: Optional[str] = None, stage: Optional[str] = None,
+                   status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    """Lists jobs, newest first, optionally filtered by meeting, stage and status."""
+    db: AsyncSession = get_async_session()
+    try:
+        query = select(Job)
+        if meeting_id:
+            query = query.where(Job.meeting_id == meeting_id)
+        if stage:
+            query = query.where(Job.stage == stage)
+        if status:
+            query = query.where(Job.status == status)
+        jobs = (await db.execute(query.order_by(Job.id.desc()).limit(limit))).scalars().all()
+        return [_job_to_dict(job) for job in jobs]
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) listing jobs: {e}")
+        return []
+    finally:
+        await db.close()
+
+
+async def get_job(job_id: int) -> Optional[Dict[str, Any]]:
+    """Returns a single job (without payload), or None if it doesn't exist."""
+    db: AsyncSession = get_async_session()
+    try:
+        job = await db.get(Job, job_id)
+        return _job_to_dict(job) if job else None
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) fetching job {job_id}: {e}")
+        return None
+    finally:
+        await db.close()
@@ -1,23 +1,31 @@
 # Meeting related database interaction logic using SQLAlchemy
 
 import json
+import base64
+import binascii
 import datetime
 import uuid # Import uuid for generating IDs
-from typing import Dict, Any, List, Optional
-from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
 # Import SQLAlchemy components and Meeting model
-from ...db.database import Meeting # Assuming SessionLocal will be here or imported here
-# Import the session helper (assuming it will be moved here)
-from ...db.database import get_db_session
-# Import ChromaDB client from RAG service
-from ..rag_service import client as vector_db_client
+from ...db.database import Meeting, TranscriptSegment
+# Import the async session helper
+from ...db.database import get_async_session
+# ChromaDB client from the RAG service (loaded lazily)
+from ..rag_service import delete_meeting_vectors
 # Import the WebSocket manager
-from fastapi import BackgroundTasks # Import BackgroundTasks
 from ...utils.websocket_manager import manager
-# Import the analysis task function from its new location
-from ..tasks import run_analysis_task
+# Analysis runs as a durable background job
+from ..job_queue import job_queue, STAGE_ANALYSIS, STAGE_INDEXING
+# Live transcripts are stored one row per segment
+from .transcript import load_transcript_segments
+from .segment_writer import segment_writer
+from .serializer import meeting_to_dict, meeting_to_json, decode_json_list, format_upload_time, loads
+# Serialized meetings, invalidated by every write below
+from .meeting_cache import meeting_cache
 
 
 async def create_live_meeting() -> Optional[Dict[str, Any]]:
@@ -25,7 +33,7 @@ async def create_live_meeting() -> Optional[Dict[str, Any]]:
     Creates a meeting record for a new live recording session.
     Generates a unique ID and sets status to 'recording_live'.
     """
-    db: Session = get_db_session()
+    db: AsyncSession = get_async_session()
     job_id = str(uuid.uuid4()) # Generate a new ID for the live session
     timestamp = datetime.datetime.now(datetime.timezone.utc)
     status = 'recording_live' # New status for live sessions
@@ -46,24 +54,11 @@ async def create_live_meeting() -> Optional[Dict[str, Any]]:
             pdf_path=None
         )
         db.add(new_meeting)
-        db.commit()
-        db.refresh(new_meeting)
+        await db.commit()
+        await db.refresh(new_meeting)
         print(f"Successfully created live meeting record for job_id: {job_id}")
 
-        # Format the created record for response and broadcast
-        formatted_upload_time = timestamp.isoformat() # Already UTC
-        meeting_dict = {
-            "id": new_meeting.id,
-            "filename": new_meeting.filename,
-            "upload_time": formatted_upload_time,
-            "status": new_meeting.status,
-            "transcript": new_meeting.transcript,
-            "summary": new_meeting.summary,
-            "action_items": json.loads(new_meeting.action_items),
-            "decisions": json.loads(new_meeting.decisions),
-            "languages": json.loads(new_meeting.languages),
-            "pdf_path": new_meeting.pdf_path,
-        }
+        meeting_dict = meeting_to_dict(new_meeting)
 
         # Broadcast the new meeting data
         await manager.broadcast({
@@ -75,16 +70,16 @@ async def create_live_meeting() -> Optional[Dict[str, Any]]:
 
     except SQLAlchemyError as e:
         print(f"Database error (SQLAlchemy) creating live meeting for job_id {job_id}: {e}")
-        db.rollback()
+        await db.rollback()
         return None
     finally:
-        db.close()
+        await db.close()
 
 async def create_initial_meeting(job_id: str, filename: str) -> Optional[Dict[str, Any]]:
     """
     Creates an initial meeting record using SQLAlchemy.
     """
-    db: Session = get_db_session()
+    db: AsyncSession = get_async_session()
     timestamp = datetime.datetime.now(datetime.timezone.utc) # Use timezone-aware UTC time
     status = 'processing_asr'
     try:
@@ -100,26 +95,11 @@ async def create_initial_meeting(job_id: str, filename: str) -> Optional[Dict[st
             pdf_path=None
         )
         db.add(new_meeting)
-        db.commit()
-        db.refresh(new_meeting) # Refresh to get the committed state
+        await db.commit()
+        await db.refresh(new_meeting) # Refresh to get the committed state
         print(f"Successfully created initial meeting record for job_id: {job_id}")
         # Return the created record as a dictionary
-        formatted_upload_time = None
-        if isinstance(new_meeting.upload_time, datetime.datetime):
-             formatted_upload_time = new_meeting.upload_time.replace(tzinfo=datetime.timezone.utc).isoformat()
-        return {
-            "id": new_meeting.id,
-            "filename": new_meeting.filename,
-            "upload_time": formatted_upload_time, # Send UTC ISO string with Z
-            "status": new_meeting.status,
-            "transcript": new_meeting.transcript,
-            "summary": new_meeting.summary,
-            "action_items": json.loads(new_meeting.action_items), # Decode JSON
-            "decisions": json.loads(new_meeting.decisions), # Decode JSON
-            "pdf_path": new_meeting.pdf_path,
-            # Ensure languages is included, defaulting to empty list if not present or None
-            "languages": json.loads(new_meeting.languages or '[]')
-        }
+        return meeting_to_dict(new_meeting)
         # Broadcast the new meeting data
         await manager.broadcast({
             "type": "meeting_created",
@@ -128,36 +108,34 @@ async def create_initial_meeting(job_id: str, filename: str) -> Optional[Dict[st
         return meeting_dict # Return the dict
     except SQLAlchemyError as e:
         print(f"Database error (SQLAlchemy) creating initial meeting for job_id {job_id}: {e}")
-        db.rollback()
+        await db.rollback()
         return None
     finally:
-        db.close()
+        await db.close()
 
 async def delete_meeting_by_job_id(job_id: str) -> int:
     """
     Deletes a meeting record by its job_id from both SQLAlchemy and the vector store.
     Returns the number of records deleted from the main DB (0 or 1).
     """
-    db: Session = get_db_session()
+    db: AsyncSession = get_async_session()
     deleted_count = 0
     try:
         # 1. Delete from main database (SQLAlchemy)
-        deleted_count = db.query(Meeting).filter(Meeting.id == job_id).delete()
-        db.commit()
+        deleted_count = (await db.execute(delete(Meeting).where(Meeting.id == job_id))).rowcount
+        await db.execute(delete(TranscriptSegment).where(TranscriptSegment.meeting_id == job_id))
+        await db.commit()
+        meeting_cache.invalidate(job_id)
 
         if deleted_count > 0:
             print(f"Successfully deleted meeting record from main DB for job_id: {job_id}")
 
             # 2. Delete from vector database (ChromaDB)
-            collection_name = f"meeting_{job_id.replace('-', '_')}"
             try:
-                print(f"Attempting to delete vector collection: {collection_name}")
-                vector_db_client.delete_collection(name=collection_name)
-                print(f"Successfully deleted vector collection: {collection_name}")
+                await delete_meeting_vectors(job_id)
             except Exception as vector_e:
                 # Log error but don't necessarily fail the whole operation if main DB delete succeeded
-                # The collection might not exist if embedding failed earlier.
-                print(f"⚠️ Warning: Could not delete vector collection '{collection_name}': {vector_e}")
+                print(f"⚠️ Warning: Could not delete vectors of meeting '{job_id}': {vector_e}")
                 # Consider if this should raise an exception or just log. Logging for now.
 
         else:
@@ -167,19 +145,22 @@ async def delete_meeting_by_job_id(job_id: str) -> int:
 
     except SQLAlchemyError as e:
         print(f"Database error (SQLAlchemy) deleting meeting for job_id {job_id}: {e}")
-        db.rollback()
+        await db.rollback()
         return 0 # Indicate failure or no deletion due to error
     finally:
-        db.close()
+        await db.close()
 
 async def update_meeting_title(job_id: str, new_title: str) -> bool:
     """
     Updates the filename (title) for a specific meeting using SQLAlchemy.
     """
-    db: Session = get_db_session()
+    db: AsyncSession = get_async_session()
     try:
-        result = db.query(Meeting).filter(Meeting.id == job_id).update({"filename": new_title})
-        db.commit()
+        result = (await db.execute(update(Meeting).where(Meeting.id == job_id).values(
+            filename=new_title, version=Meeting.version + 1
+        ))).rowcount
+        await db.commit()
+        meeting_cache.invalidate(job_id)
         if result > 0:
             print(f"Successfully updated title for job_id: {job_id}")
             return True
@@ -188,101 +169,143 @@ async def update_meeting_title(job_id: str, new_title: str) -> bool:
             return False
     except SQLAlchemyError as e:
         print(f"Database error (SQLAlchemy) updating title for job_id {job_id}: {e}")
-        db.rollback()
+        await db.rollback()
         return False
     finally:
-        db.close()
+        await db.close()
+
+async def set_meeting_status(job_id: str, new_status: str) -> bool:
+    """
+    Updates the processing status of a specific meeting using SQLAlchemy.
+    """
+    db: AsyncSession = get_async_session()
+    try:
+        result = (await db.execute(update(Meeting).where(Meeting.id == job_id).values(
+            status=new_status, version=Meeting.version + 1
+        ))).rowcount
+        await db.commit()
+        meeting_cache.invalidate(job_id)
+        if result > 0:
+            print(f"Successfully set status '{new_status}' for job_id: {job_id}")
+            return True
+        else:
+            print(f"No meeting found with job_id: {job_id} to update status.")
+            return False
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) updating status for job_id {job_id}: {e}")
+        await db.rollback()
+        return False
+    finally:
+        await db.close()
+
+async def _load_meeting(db: AsyncSession, job_id: str) -> Tuple[Optional[Meeting], List[Dict[str, Any]]]:
+    """Fetches a meeting row and, for live meetings, its transcript segments."""
+    meeting = await db.get(Meeting, job_id)
+    if not meeting:
+        return None, []
+    # Live meetings: the segment rows are the transcript (the column only holds plain text)
+    return meeting, await load_transcript_segments(db, job_id)
 
 async def get_meeting_data(job_id: str) -> Optional[Dict[str, Any]]:
     """
     Retrieves all stored data for a given job_id using SQLAlchemy.
     """
-    db: Session = get_db_session()
+    meeting_json = await get_meeting_json(job_id)
+    return loads(meeting_json) if meeting_json is not None else None
+
+async def get_meeting_json(job_id: str) -> Optional[bytes]:
+    """
+    Same document as get_meeting_data, as encoded JSON ready to send.
+    The stored JSON columns are spliced in without being decoded.
+
+    Served from meeting_cache when the cached copy was built from the row's current
+    version; checking that costs one primary key lookup instead of a full load.
+    """
+    db: AsyncSession = get_async_session()
     try:
-        meeting = db.query(Meeting).filter(Meeting.id == job_id).first()
-        if meeting:
-            # Convert Meeting object to dictionary
-            meeting_data = {c.name: getattr(meeting, c.name) for c in meeting.__table__.columns}
-            # Decode JSON strings
-            try:
-                meeting_data['action_items'] = json.loads(meeting_data.get('action_items', '[]') or '[]')
-                meeting_data['decisions'] = json.loads(meeting_data.get('decisions', '[]') or '[]')
-                meeting_data['languages'] = json.loads(meeting_data.get('languages', '[]') or '[]')
-                # Also parse the transcript field if it contains valid JSON list
-                raw_transcript = meeting_data.get('transcript')
-                if raw_transcript and isinstance(raw_transcript, str):
-                    try:
-                        parsed_transcript = json.loads(raw_transcript)
-                        if isinstance(parsed_transcript, list):
-                            meeting_data['transcript'] = parsed_transcript # Replace string with parsed list
-                        else:
-                            # If JSON is not a list, keep original string (or handle as error)
-                            print(f"Warning: Parsed transcript for {job_id} is not a list. Keeping raw string.")
-                            meeting_data['transcript'] = raw_transcript # Keep original string
-                    except json.JSONDecodeError:
-                        # If not valid JSON, assume it's plain text and keep original string
-                        print(f"Warning: Transcript for {job_id} is not valid JSON. Keeping raw string.")
-                        meeting_data['transcript'] = raw_transcript
-                elif not raw_transcript:
-                     meeting_data['transcript'] = [] # Default to empty list if transcript is null/empty
-
-            except json.JSONDecodeError as json_err:
-                 print(f"JSON Decode Error processing meeting data for {job_id}: {json_err}")
-                 # Set defaults for all potentially JSON fields on error
-                 meeting_data['action_items'] = []
-                 meeting_data['decisions'] = []
-                 meeting_data['languages'] = []
-                 meeting_data['transcript'] = [] # Default transcript to empty list on error too
-            # Format datetime
-            if isinstance(meeting_data.get('upload_time'), datetime.datetime):
-                 # Ensure it's treated as UTC even if naive, then format with Z
-                 meeting_data['upload_time'] = meeting_data['upload_time'].replace(tzinfo=datetime.timezone.utc).isoformat()
-            return meeting_data
-        else:
+        version = None
+        if job_id in meeting_cache:
+            version = (await db.execute(select(Meeting.version).where(Meeting.id == job_id))).scalar()
+        meeting_json = meeting_cache.get(job_id, version)
+        if meeting_json is not None:
+            return meeting_json
+
+        meeting, live_segments = await _load_meeting(db, job_id)
+        if not meeting:
             return None
+        meeting_json = meeting_to_json(meeting, live_segments)
+        meeting_cache.put(job_id, meeting.version, meeting_json)
+        return meeting_json
     except SQLAlchemyError as e:
         print(f"Database error (SQLAlchemy) fetching data for job_id {job_id}: {e}")
         return None
-    finally: # Ensure this aligns with the 'try' block above
-        db.close()
+    finally:
+        await db.close()
 
-async def finalize_live_meeting(meeting_id: str, background_tasks: BackgroundTasks) -> bool:
+async def enqueue_reindex(meeting_ids: Optional[List[str]] = None) -> int:
     """
-    Updates the status of a live meeting to 'processing_analysis' and queues the analysis task.
+    Queues an indexing job for every meeting with a transcript (or only meeting_ids),
+    e.g. after a chunking or embedding model change. The jobs load the segments
+    themselves. Live recordings are skipped; they are indexed when finalized.
+    Returns the number of jobs queued.
     """
-    db: Session = get_db_session()
+    db: AsyncSession = get_async_session()
+    try:
+        query = select(Meeting.id).where(Meeting.transcript.isnot(None), Meeting.status != 'recording_live')
+        if meeting_ids:
+            query = query.where(Meeting.id.in_(meeting_ids))
+        ids = (await db.execute(query.order_by(Meeting.upload_time))).scalars().all()
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) listing meetings to re-index: {e}")
+        return 0
+    finally:
+        await db.close()
+    queued = 0
+    for meeting_id in ids:
+        if await job_queue.enqueue(STAGE_INDEXING, meeting_id, {}):
+            queued += 1
+    print(f"Queued re-indexing of {queued} meeting(s).")
+    return queued
+
+
+async def finalize_live_meeting(meeting_id: str) -> bool:
+    """
+    Updates the status of a live meeting to 'processing_analysis' and queues the analysis and indexing jobs.
+    """
+    # Write the meeting's buffered segments before reading the transcript back
+    await segment_writer.flush()
+    db: AsyncSession = get_async_session()
     new_status = 'processing_analysis'
     meeting = None # Define meeting variable outside try block
 
     try:
         # Fetch the meeting first to get the transcript
-        meeting = db.query(Meeting).filter(Meeting.id == meeting_id, Meeting.status == 'recording_live').first()
+        meeting = (await db.execute(
+            select(Meeting).where(Meeting.id == meeting_id, Meeting.status == 'recording_live')
+        )).scalars().first()
 
         if not meeting:
             print(f"No meeting found with id: {meeting_id} and status 'recording_live' to finalize.")
             return False
 
-        # Update status
+        # Assemble the transcript from its segment rows (one ordered range scan)
+        transcript_segments = await load_transcript_segments(db, meeting_id)
+        full_transcript_text = " ".join([seg.get('text', '') for seg in transcript_segments])
+
+        # Update status; the plain text goes into the transcript column for search and exports
         meeting.status = new_status
-        db.commit()
-        db.refresh(meeting) # Refresh to get the updated status in the object
+        meeting.transcript = full_transcript_text
+        meeting.version = Meeting.version + 1 # Evaluated in SQL; the refresh below loads the result
+        await db.commit()
+        meeting_cache.invalidate(meeting_id)
+        await db.refresh(meeting) # Refresh to get the updated status in the object
         print(f"Successfully updated live meeting status: {meeting_id}, status set to {new_status}.")
 
-        # Prepare data for analysis task
-        transcript_json = meeting.transcript or '[]'
-        try:
-            transcript_segments = json.loads(transcript_json)
-            if not isinstance(transcript_segments, list):
-                transcript_segments = []
-        except json.JSONDecodeError:
-            transcript_segments = []
-
-        # Reconstruct full transcript text
-        full_transcript_text = " ".join([seg.get('text', '') for seg in transcript_segments])
-
-        # Enqueue the analysis task
-        background_tasks.add_task(run_analysis_task, meeting_id, full_transcript_text, transcript_segments)
-        print(f"Enqueued analysis task for finalized live meeting: {meeting_id}")
+        # Enqueue the analysis and indexing jobs
+        await job_queue.enqueue(STAGE_ANALYSIS, meeting_id, {"transcript": full_transcript_text})
+        if transcript_segments:
+            await job_queue.enqueue(STAGE_INDEXING, meeting_id, {"segments": transcript_segments})
+        print(f"Enqueued analysis jobs for finalized live meeting: {meeting_id}")
 
         # Broadcast the status update
         updated_meeting_data = await get_meeting_data(meeting_id) # Fetch updated data again
@@ -295,40 +318,88 @@ async def finalize_live_meeting(meeting_id: str, background_tasks: BackgroundTas
 
     except SQLAlchemyError as e:
         print(f"Database error (SQLAlchemy) finalizing live meeting {meeting_id}: {e}")
-        db.rollback()
+        await db.rollback()
         return False
     finally:
-        db.close()
+        await db.close()
+
+# Characters of the summary included in meeting list items
+SUMMARY_EXCERPT_CHARS = 300
+
+
+def encode_meeting_cursor(upload_time: datetime.datetime, meeting_id: str) -> str:
+    """Opaque keyset cursor pointing just past the given meeting."""
+    raw = json.dumps([upload_time.isoformat(), meeting_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
-async def get_all_meeting_data() -> List[Dict[str, Any]]:
+
+def decode_meeting_cursor(cursor: str) -> Tuple[datetime.datetime, str]:
+    """Inverse of encode_meeting_cursor. Raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        upload_time, meeting_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(upload_time), str(meeting_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def get_meeting_list_page(limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
-    Retrieves all meeting records using SQLAlchemy.
+    Retrieves one page of the meeting list, newest first, using keyset pagination on (upload_time, id).
+
+    Only the list columns are read (id, filename, status, upload_time, languages and a summary
+    excerpt); the transcript, action item and decision columns are never touched. The excerpt
+    is returned as summary_excerpt, never as summary, so it cannot be mistaken for the full text.
+
+    Returns:
+        (meetings, next_cursor). next_cursor is None on the last page.
+
+    Raises:
+        ValueError: If cursor is malformed.
     """
-    db: Session = get_db_session()
-    results = []
+    db: AsyncSession = get_async_session()
     try:
-        meetings = db.query(Meeting).order_by(Meeting.upload_time.desc()).all()
-        for meeting in meetings:
-            meeting_data = {c.name: getattr(meeting, c.name) for c in meeting.__table__.columns}
-            try:
-                meeting_data['action_items'] = json.loads(meeting_data.get('action_items', '[]') or '[]')
-                meeting_data['decisions'] = json.loads(meeting_data.get('decisions', '[]') or '[]')
-                meeting_data['languages'] = json.loads(meeting_data.get('languages', '[]') or '[]') # Decode languages JSON
-            except json.JSONDecodeError:
-                meeting_data['action_items'] = []
-                meeting_data['decisions'] = []
-                meeting_data['languages'] = []
-            # Format datetime
-            formatted_time = None
-            raw_time = meeting_data.get('upload_time')
-            if isinstance(raw_time, datetime.datetime):
-                 # Ensure it's treated as UTC even if naive, then format with Z
-                 formatted_time = raw_time.replace(tzinfo=datetime.timezone.utc).isoformat()
-                 meeting_data['upload_time'] = formatted_time # Update dict with formatted string
-            results.append(meeting_data)
-        return results
+        query = select(
+            Meeting.id,
+            Meeting.filename,
+            Meeting.status,
+            Meeting.upload_time,
+            Meeting.languages,
+            # One extra character tells us whether the summary was cut
+            func.substr(Meeting.summary, 1, SUMMARY_EXCERPT_CHARS + 1).label("summary_excerpt"),
+        )
+        if cursor:
+            after_time, after_id = decode_meeting_cursor(cursor)
+            query = query.where(
+                (Meeting.upload_time < after_time) |
+                ((Meeting.upload_time == after_time) & (Meeting.id < after_id))
+            )
+        # Served by the (upload_time, id) index; one extra row tells us whether there is a next page
+        rows = (await db.execute(
+            query.order_by(Meeting.upload_time.desc(), Meeting.id.desc()).limit(limit + 1)
+        )).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_meeting_cursor(rows[-1].upload_time, rows[-1].id)
+
+        results = []
+        for row in rows:
+            excerpt = row.summary_excerpt or ''
+            if len(excerpt) > SUMMARY_EXCERPT_CHARS:
+                excerpt = excerpt[:SUMMARY_EXCERPT_CHARS].rstrip() + "…"
+            results.append({
+                "id": row.id,
+                "filename": row.filename,
+                "status": row.status,
+                "upload_time": format_upload_time(row.upload_time),
+                "languages": decode_json_list(row.languages),
+                "summary_excerpt": excerpt,
+            })
+        return results, next_cursor
     except SQLAlchemyError as e:
-        print(f"Database error (SQLAlchemy) fetching all meeting data: {e}")
-        return []
+        print(f"Database error (SQLAlchemy) fetching meeting list: {e}")
+        return [], None
     finally:
-        db.close()
+        await db.close()
@@ -0,0 +1,87 @@
+# In-process LRU cache of serialized meetings (the bytes built by serializer.meeting_to_json).
+# Each entry carries the meetings.version it was built from. Every write path in
+# services/storage bumps that column and invalidates the entry; readers also compare
+# the cached version with the row's (a primary key lookup), so writes made by other
+# worker processes are never served stale.
+
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Total size of cached meetings; least recently used entries are evicted beyond this
+MEETING_CACHE_MAX_BYTES = int(os.getenv("MEETING_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class MeetingCache:
+    """
+    Serialized meetings keyed by id, bounded by total bytes rather than entry count,
+    since a transcript can be a few bytes or several megabytes. Entries larger than
+    the whole budget are not cached. A max_bytes of 0 disables the cache.
+    """
+
+    def __init__(self, max_bytes: int = MEETING_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "invalidations": 0}
+
+    def __contains__(self, meeting_id: str) -> bool:
+        return meeting_id in self._entries
+
+    def get(self, meeting_id: str, version: Optional[int]) -> Optional[bytes]:
+        """Returns the cached body if it was built from `version`; an entry for another version is dropped."""
+        entry = self._entries.get(meeting_id)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        cached_version, body = entry
+        if cached_version != version:
+            self._stats["stale"] += 1
+            self._remove(meeting_id)
+            return None
+        self._entries.move_to_end(meeting_id)
+        self._stats["hits"] += 1
+        return body
+
+    def put(self, meeting_id: str, version: int, body: bytes):
+        """Caches a serialized meeting, evicting least recently used entries to stay within max_bytes."""
+        self._remove(meeting_id)
+        if len(body) > self.max_bytes:
+            return
+        self._entries[meeting_id] = (version, body)
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            evicted_id = next(iter(self._entries))
+            self._remove(evicted_id)
+            self._stats["evictions"] += 1
+
+    def invalidate(self, meeting_id: str):
+        """Drops a meeting's entry. Called by write paths after they commit."""
+        if self._remove(meeting_id):
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, meeting_id: str) -> bool:
+        entry = self._entries.pop(meeting_id, None)
+        if entry is None:
+            return False
+        self._bytes -= len(entry[1])
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """Size of the cache and hit/miss counters."""
+        lookups = self._stats["hits"] + self._stats["misses"] + self._stats["stale"]
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "total_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared by every request in this process
+meeting_cache = MeetingCache()
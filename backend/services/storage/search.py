@@ -1,48 +1,156 @@
 # Search related database interaction logic using SQLAlchemy
 
-import json
-import datetime
-from typing import Dict, Any, List
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+import re
+from typing import Dict, Any, List, Optional
+from sqlalchemy import bindparam, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError, OperationalError
 
 # Import SQLAlchemy components and Meeting model
-from ...db.database import SessionLocal, Meeting # Assuming SessionLocal will be here or imported here
-# Import the session helper (assuming it will be moved here)
-from ...db.database import get_db_session
+from ...db.database import Meeting
+# Import the async session helper
+from ...db.database import get_async_session
+from .serializer import JSON_LIST_COLUMNS, json_list_fragment, format_upload_time
 
-async def search_transcripts(query: str) -> List[Dict[str, Any]]:
+# BM25 column weights, in meetings_fts column order: filename, summary, transcript, action_items, decisions.
+# A hit in the title or summary says more about a meeting than one in an hour of transcript.
+BM25_WEIGHTS = (10.0, 5.0, 1.0, 3.0, 3.0)
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+SNIPPET_TOKENS = 16 # Approximate number of tokens per snippet
+MAX_QUERY_TOKENS = 16
+
+# Only what search results display; the transcript column is never returned
+_RESULT_COLUMNS = "m.id, m.filename, m.upload_time, m.status, m.languages, m.summary, m.action_items, m.decisions"
+
+
+def build_fts_query(query: str) -> Optional[str]:
     """
-    Searches across meetings using SQLAlchemy FTS (if configured) or LIKE.
+    Turns free text into an FTS5 MATCH expression: every word must match, the
+    last one as a prefix (for search-as-you-type). Words are quoted, so user
+    input can never be parsed as FTS5 syntax (AND, NEAR, column filters, ...).
+    Returns None if the query has no searchable words.
     """
-    db: Session = get_db_session()
+    tokens = re.findall(r"\w+", query)[:MAX_QUERY_TOKENS]
+    if not tokens:
+        return None
+    quoted = [f'"{token}"' for token in tokens]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _format_result(row) -> Dict[str, Any]:
+    result = dict(row._mapping)
+    for key in JSON_LIST_COLUMNS:
+        # Spliced into the response as stored; the router encodes results with serializer.dumps
+        result[key] = json_list_fragment(result.get(key))
+    result['upload_time'] = format_upload_time(result.get('upload_time'))
+    return result
+
+
+async def _fts_search(db: AsyncSession, match: str, limit: int, offset: int) -> Dict[str, Any]:
+    weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+    rows = (await db.execute(text(f"""
+        SELECT {_RESULT_COLUMNS},
+               bm25(meetings_fts, {weights}) AS rank,
+               snippet(meetings_fts, -1, :snippet_start, :snippet_end, '…', :snippet_tokens) AS snippet
+        FROM meetings_fts
+        JOIN meetings m ON m.rowid = meetings_fts.rowid
+        WHERE meetings_fts MATCH :match
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    """), {
+        "match": match,
+        "snippet_start": SNIPPET_START,
+        "snippet_end": SNIPPET_END,
+        "snippet_tokens": SNIPPET_TOKENS,
+        "limit": limit,
+        "offset": offset,
+    })).all()
+    total = (await db.execute(text("SELECT count(*) FROM meetings_fts WHERE meetings_fts MATCH :match"), {"match": match})).scalar()
+
+    results = []
+    for row in rows:
+        result = _format_result(row)
+        # bm25() is lower-is-better; expose a higher-is-better score
+        result['score'] = round(-result.pop('rank'), 6)
+        results.append(result)
+    return {"results": results, "total": total}
+
+
+async def _like_search(db: AsyncSession, query: str, limit: int, offset: int) -> Dict[str, Any]:
+    """Unranked fallback for databases without the FTS index."""
+    search_param = f"%{query}%"
+    condition = (
+        (func.transcript_text(Meeting.transcript).like(search_param)) | # Decompressed in SQL
+        (Meeting.filename.like(search_param)) |
+        (Meeting.summary.like(search_param))
+    )
+    meetings = (await db.execute(
+        select(Meeting.id, Meeting.filename, Meeting.upload_time, Meeting.status, Meeting.languages,
+               Meeting.summary, Meeting.action_items, Meeting.decisions)
+        .where(condition)
+        .order_by(Meeting.upload_time.desc())
+        .limit(limit).offset(offset)
+    )).all()
+    total = (await db.execute(select(func.count(Meeting.id)).where(condition))).scalar()
     results = []
+    for meeting in meetings:
+        result = _format_result(meeting)
+        result['score'] = None
+        result['snippet'] = None
+        results.append(result)
+    return {"results": results, "total": total}
+
+
+async def search_transcripts(query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+    """
+    Searches meeting titles, summaries, transcripts, action items and decisions.
+
+    Results are ranked by BM25 (best first) and carry a highlighted `snippet` of
+    the best-matching column. Falls back to an unranked LIKE search if the FTS
+    index is unavailable.
+
+    Returns:
+        {"results": [...], "total": number of matching meetings}. The JSON columns
+        of each result are pre-encoded fragments; encode with serializer.dumps.
+    """
+    match = build_fts_query(query)
+    if match is None:
+        return {"results": [], "total": 0}
+
+    db: AsyncSession = get_async_session()
     try:
-        # Basic LIKE search (adapt if FTS is properly set up via SQLAlchemy events/triggers)
-        search_param = f"%{query}%"
-        meetings = db.query(Meeting).filter(
-            (Meeting.transcript.like(search_param)) |
-            (Meeting.filename.like(search_param)) |
-            (Meeting.summary.like(search_param))
-        ).order_by(Meeting.upload_time.desc()).all()
-
-        for meeting in meetings:
-            meeting_data = {c.name: getattr(meeting, c.name) for c in meeting.__table__.columns}
-            try:
-                meeting_data['action_items'] = json.loads(meeting_data.get('action_items', '[]') or '[]') # Add fallback for None
-                meeting_data['decisions'] = json.loads(meeting_data.get('decisions', '[]') or '[]') # Add fallback for None
-                meeting_data['languages'] = json.loads(meeting_data.get('languages', '[]') or '[]') # Decode languages JSON
-            except json.JSONDecodeError:
-                meeting_data['action_items'] = []
-                meeting_data['decisions'] = []
-                meeting_data['languages'] = [] # Default to empty list on error
-            if isinstance(meeting_data.get('upload_time'), datetime.datetime):
-                 # Ensure it's treated as UTC even if naive, then format with Z
-                 meeting_data['upload_time'] = meeting_data['upload_time'].replace(tzinfo=datetime.timezone.utc).isoformat()
-            results.append(meeting_data)
-        return results
+        try:
+            return await _fts_search(db, match, limit, offset)
+        except OperationalError as e:
+            print(f"FTS search unavailable, falling back to LIKE: {e}")
+            await db.rollback()
+            return await _like_search(db, query, limit, offset)
     except SQLAlchemyError as e:
         print(f"Database error (SQLAlchemy) searching transcripts: {e}")
-        return []
+        return {"results": [], "total": 0}
+    finally:
+        await db.close()
+
+
+async def get_search_result_meetings(meeting_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the search result fields (as in search_transcripts, without score and
+    snippet) of the given meetings, keyed by id. Unknown ids are left out.
+    """
+    if not meeting_ids:
+        return {}
+    db: AsyncSession = get_async_session()
+    try:
+        rows = (await db.execute(
+            text(f"SELECT {_RESULT_COLUMNS} FROM meetings m WHERE m.id IN :ids")
+            .bindparams(bindparam("ids", expanding=True)),
+            {"ids": list(meeting_ids)},
+        )).all()
+        return {row.id: _format_result(row) for row in rows}
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) loading search result meetings: {e}")
+        return {}
     finally:
-        db.close()
+        await db.close()
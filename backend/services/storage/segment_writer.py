@@ -0,0 +1,156 @@
+# Write-behind buffer for live transcript segments.
+# Segments from all live meetings are collected in memory and written in one
+# transaction per flush, instead of one session and commit per chunk, which
+# keeps SQLite's single writer lock free for everything else.
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from ...db.database import Meeting, TranscriptSegment, get_async_session
+from .transcript import segment_row_from_dict
+from .meeting_cache import meeting_cache
+
+# Buffered segments are written at least this often
+SEGMENT_FLUSH_INTERVAL_MS = int(os.getenv("SEGMENT_FLUSH_INTERVAL_MS", "250"))
+# A flush starts early once this many segments are buffered
+SEGMENT_FLUSH_MAX_BATCH = int(os.getenv("SEGMENT_FLUSH_MAX_BATCH", "500"))
+# Flush latencies kept for the metrics percentiles
+_LATENCY_WINDOW = 1000
+
+
+class SegmentWriter:
+    """
+    Buffers live segments and writes them in batches.
+
+    add() never touches the database. A background loop flushes the buffer every
+    SEGMENT_FLUSH_INTERVAL_MS or when SEGMENT_FLUSH_MAX_BATCH segments are waiting;
+    flush() forces one (used by finalize and shutdown). A batch that fails to
+    write stays at the front of the buffer and is retried on the next flush.
+    """
+
+    def __init__(self, interval_ms: int = SEGMENT_FLUSH_INTERVAL_MS, max_batch: int = SEGMENT_FLUSH_MAX_BATCH):
+        self.interval = interval_ms / 1000.0
+        self.max_batch = max_batch
+        self._buffer: List[Tuple[str, Dict[str, Any]]] = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._stats = {"flushes": 0, "segments_written": 0, "segments_dropped": 0, "errors": 0, "max_batch_size": 0}
+        self._latencies_ms: List[float] = []
+
+    def add(self, meeting_id: str, segment_data: Dict[str, Any]):
+        """Queues a segment; it is written on the next flush."""
+        self._buffer.append((meeting_id, segment_data))
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            print(f"Segment writer started (interval {self.interval * 1000:.0f} ms, max batch {self.max_batch}).")
+
+    async def stop(self):
+        """Stops the flush loop and writes whatever is still buffered."""
+        if self._task is not None:
+            # Not cancelled: a flush interrupted mid-write would lose track of its batch
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._buffer:
+            print(f"Warning: {len(self._buffer)} live segment(s) could not be written on shutdown.")
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Writes all buffered segments in one transaction. Returns the number written."""
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+            batch = self._buffer
+            self._buffer = []
+            started = time.perf_counter()
+            written = await self._write_batch(batch)
+            if written is None:
+                # Keep the batch, ahead of anything added meanwhile, for the next flush
+                self._buffer = batch + self._buffer
+                self._stats["errors"] += 1
+                return 0
+
+            latency_ms = (time.perf_counter() - started) * 1000
+            self._latencies_ms.append(latency_ms)
+            del self._latencies_ms[:-_LATENCY_WINDOW]
+            self._stats["flushes"] += 1
+            self._stats["segments_written"] += written
+            self._stats["segments_dropped"] += len(batch) - written
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+            return written
+
+    async def _write_batch(self, batch: List[Tuple[str, Dict[str, Any]]]) -> Optional[int]:
+        """Inserts a batch of segments, appending after each meeting's last segment. Returns None on error."""
+        db: AsyncSession = get_async_session()
+        try:
+            meeting_ids = {meeting_id for meeting_id, _ in batch}
+            existing = set((await db.execute(select(Meeting.id).where(Meeting.id.in_(meeting_ids)))).scalars().all())
+            next_idx = dict((await db.execute(
+                select(TranscriptSegment.meeting_id, func.max(TranscriptSegment.idx) + 1)
+                .where(TranscriptSegment.meeting_id.in_(existing))
+                .group_by(TranscriptSegment.meeting_id)
+            )).all())
+            rows = []
+            for meeting_id, segment_data in batch:
+                if meeting_id not in existing:
+                    # Meeting deleted while its segments were buffered
+                    print(f"Meeting not found with id: {meeting_id}; dropping buffered segment.")
+                    continue
+                idx = next_idx.get(meeting_id, 0)
+                next_idx[meeting_id] = idx + 1
+                rows.append(segment_row_from_dict(meeting_id, idx, segment_data))
+            db.add_all(rows)
+            written_ids = {row.meeting_id for row in rows}
+            if written_ids:
+                # The segments are part of the serialized meeting
+                await db.execute(update(Meeting).where(Meeting.id.in_(written_ids)).values(version=Meeting.version + 1))
+            await db.commit()
+            for meeting_id in written_ids:
+                meeting_cache.invalidate(meeting_id)
+            return len(rows)
+        except SQLAlchemyError as e:
+            print(f"Database error (SQLAlchemy) writing {len(batch)} buffered segment(s): {e}")
+            await db.rollback()
+            return None
+        finally:
+            await db.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Flush counts, batch sizes and flush latency."""
+        latencies = sorted(self._latencies_ms)
+        flushes = self._stats["flushes"]
+        return {
+            **self._stats,
+            "pending": len(self._buffer),
+            "mean_batch_size": round(self._stats["segments_written"] / flushes, 2) if flushes else 0.0,
+            "flush_ms_mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "flush_ms_p95": round(latencies[int(0.95 * (len(latencies) - 1))], 2) if latencies else 0.0,
+            "flush_ms_max": round(latencies[-1], 2) if latencies else 0.0,
+            "interval_ms": int(self.interval * 1000),
+            "max_batch": self.max_batch,
+        }
+
+
+# Shared by every live meeting
+segment_writer = SegmentWriter()
@@ -0,0 +1,113 @@
+# Meeting serialization shared by the storage layer and the routers
+# Rows become either plain dicts (broadcasts, PDF/TXT exports) or response bytes.
+# The response path never decodes the JSON columns (action_items, decisions,
+# languages): they are stored as JSON already, so orjson splices them in as-is.
+
+import datetime
+from typing import Dict, Any, List, Optional
+import orjson
+
+from ...db.database import Meeting
+
+# Meeting columns stored as JSON arrays
+JSON_LIST_COLUMNS = ("action_items", "decisions", "languages")
+
+_EMPTY_LIST = orjson.Fragment(b"[]")
+
+
+def dumps(obj: Any) -> bytes:
+    """Encodes obj (which may contain pre-encoded fragments) as compact UTF-8 JSON."""
+    return orjson.dumps(obj)
+
+
+def loads(data: bytes) -> Any:
+    """Decodes JSON produced by dumps or meeting_to_json."""
+    return orjson.loads(data)
+
+
+def format_upload_time(value: Any) -> Optional[str]:
+    """Formats a stored timestamp as an ISO string in UTC. Raw SQL returns SQLite's stored text rather than a datetime."""
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    if isinstance(value, datetime.datetime):
+        # Ensure it's treated as UTC even if naive, then format with Z
+        return value.replace(tzinfo=datetime.timezone.utc).isoformat()
+    return None
+
+
+def decode_json_list(value: Optional[str]) -> List[Any]:
+    """Decodes a stored JSON array column, returning [] for NULL or malformed values."""
+    try:
+        decoded = orjson.loads(value or '[]')
+    except orjson.JSONDecodeError:
+        return []
+    return decoded if isinstance(decoded, list) else []
+
+
+def json_list_fragment(value: Optional[str]) -> orjson.Fragment:
+    """
+    Wraps a stored JSON array column for splicing into a response without decoding it.
+    Only the brackets are checked; anything that isn't shaped like an array becomes [].
+    """
+    if not value:
+        return _EMPTY_LIST
+    stripped = value.strip()
+    if not (stripped.startswith("[") and stripped.endswith("]")):
+        return _EMPTY_LIST
+    return orjson.Fragment(stripped.encode("utf-8"))
+
+
+def _transcript_value(raw_transcript: Optional[str]) -> Any:
+    """
+    The transcript column holds plain text, or a JSON segment list in meetings
+    recorded before segment rows existed. Only text shaped like a list is parsed.
+    """
+    if raw_transcript is None:
+        return []
+    if raw_transcript.lstrip().startswith("["):
+        try:
+            parsed = orjson.loads(raw_transcript)
+            if isinstance(parsed, list):
+                return parsed
+        except orjson.JSONDecodeError:
+            pass
+    return raw_transcript
+
+
+def meeting_to_dict(meeting: Meeting, transcript_segments: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Converts a Meeting row to a JSON-serializable dictionary with the JSON columns decoded.
+    transcript_segments (live meetings) replace the transcript column when given.
+    """
+    meeting_data = {c.name: getattr(meeting, c.name) for c in meeting.__table__.columns}
+    for key in JSON_LIST_COLUMNS:
+        meeting_data[key] = decode_json_list(meeting_data.get(key))
+    meeting_data['transcript'] = transcript_segments or _transcript_value(meeting_data.get('transcript'))
+    meeting_data['upload_time'] = format_upload_time(meeting_data.get('upload_time'))
+    return meeting_data
+
+
+def meeting_to_json(meeting: Meeting, transcript_segments: Optional[List[Dict[str, Any]]] = None) -> bytes:
+    """
+    Same document as meeting_to_dict, encoded straight to response bytes.
+    The JSON columns are spliced in without being decoded.
+    """
+    return meeting_values_to_json({c.name: getattr(meeting, c.name) for c in meeting.__table__.columns}, transcript_segments)
+
+
+def meeting_values_to_json(meeting_data: Dict[str, Any], transcript_segments: Optional[List[Dict[str, Any]]] = None) -> bytes:
+    """
+    Encodes stored meeting column values (all columns or a projection) like meeting_to_json.
+    Columns missing from meeting_data are left out of the document.
+    """
+    for key in JSON_LIST_COLUMNS:
+        if key in meeting_data:
+            meeting_data[key] = json_list_fragment(meeting_data[key])
+    if 'transcript' in meeting_data:
+        meeting_data['transcript'] = transcript_segments or _transcript_value(meeting_data['transcript'])
+    if 'upload_time' in meeting_data:
+        meeting_data['upload_time'] = format_upload_time(meeting_data['upload_time'])
+    return orjson.dumps(meeting_data)
@@ -1,69 +1,74 @@
 # Transcript related database interaction logic using SQLAlchemy
 
 import json
-import datetime
+import asyncio
 from typing import List, Optional, Dict, Any # Added Dict, Any
-from sqlalchemy.orm import Session
+from sqlalchemy import LargeBinary, cast, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
 # Import SQLAlchemy components and Meeting model
-from ...db.database import SessionLocal, Meeting # Assuming SessionLocal will be here or imported here
-# Import the session helper
-from ...db.database import get_db_session
+from ...db.database import Meeting, TranscriptSegment
+# Import the async session helper
+from ...db.database import get_async_session
+# Transcripts above this size are stored compressed (see CompressedText)
+from ...db.database import TRANSCRIPT_COMPRESS_MIN_BYTES
+from .serializer import meeting_to_dict
+from .meeting_cache import meeting_cache
 
 async def update_asr_result(job_id: str, transcript: str, languages: List[str]) -> Optional[Dict[str, Any]]:
     """
     Updates an existing meeting record with the transcript and detected languages using SQLAlchemy.
     Sets status to 'processing_analysis'.
     """
-    db: Session = get_db_session()
+    db: AsyncSession = get_async_session()
     new_status = 'processing_analysis'
     # timestamp = datetime.datetime.now(datetime.timezone.utc) # Optionally update timestamp here too
 
     try:
-        meeting = db.query(Meeting).filter(Meeting.id == job_id).first()
+        meeting = await db.get(Meeting, job_id)
         if meeting:
             meeting.transcript = transcript
             meeting.languages = json.dumps(languages) # Store languages as JSON string
             meeting.status = new_status
+            meeting.version = Meeting.version + 1 # Evaluated in SQL; the refresh below loads the result
             # meeting.upload_time = timestamp # Uncomment if you want to update time on this step
-            db.commit()
-            db.refresh(meeting) # Refresh the object
+            await db.commit()
+            meeting_cache.invalidate(job_id)
+            await db.refresh(meeting) # Refresh the object
             print(f"Successfully updated ASR result for job_id: {job_id} with languages: {languages} and status: {new_status}")
 
             # Convert the updated meeting object to a dictionary
-            updated_meeting_data = {c.name: getattr(meeting, c.name) for c in meeting.__table__.columns}
-            try:
-                updated_meeting_data['action_items'] = json.loads(updated_meeting_data.get('action_items', '[]') or '[]')
-                updated_meeting_data['decisions'] = json.loads(updated_meeting_data.get('decisions', '[]') or '[]')
-                updated_meeting_data['languages'] = json.loads(updated_meeting_data.get('languages', '[]') or '[]') # Already updated
-            except json.JSONDecodeError:
-                 updated_meeting_data['action_items'] = []
-                 updated_meeting_data['decisions'] = []
-                 updated_meeting_data['languages'] = [] # Should not happen here, but safe fallback
-            if isinstance(updated_meeting_data.get('upload_time'), datetime.datetime):
-                 updated_meeting_data['upload_time'] = updated_meeting_data['upload_time'].replace(tzinfo=datetime.timezone.utc).isoformat()
-
+            updated_meeting_data = meeting_to_dict(meeting)
             return updated_meeting_data # Return the updated data
         else:
             print(f"No meeting found with job_id: {job_id} to update ASR result.")
             return None
     except SQLAlchemyError as e:
         print(f"Database error (SQLAlchemy) updating ASR result for job_id {job_id}: {e}")
-        db.rollback()
+        await db.rollback()
         return None # Return None on error
     finally:
-        db.close()
+        await db.close()
 
 async def get_transcript(job_id: str) -> Optional[str]:
     """
     Retrieves only the transcript for a meeting using SQLAlchemy.
     Optimized to fetch only the required column.
     """
-    db: Session = get_db_session()
+    db: AsyncSession = get_async_session()
     try:
-        result = db.query(Meeting.transcript).filter(Meeting.id == job_id).first()
+        result = (await db.execute(select(Meeting.transcript).where(Meeting.id == job_id))).first()
         if result:
+            if not result[0]:
+                # Live meetings keep their text in transcript_segments until finalized
+                texts = (await db.execute(
+                    select(TranscriptSegment.text)
+                    .where(TranscriptSegment.meeting_id == job_id)
+                    .order_by(TranscriptSegment.idx)
+                )).all()
+                if texts:
+                    return " ".join(text for (text,) in texts)
             return result[0] # result is a tuple, transcript is the first element
         else:
             print(f"No meeting found with job_id: {job_id} to retrieve transcript.")
@@ -72,7 +77,7 @@ async def get_transcript(job_id: str) -> Optional[str]:
         print(f"Database error (SQLAlchemy) fetching transcript for job_id {job_id}: {e}")
         return None
     finally:
-        db.close()
+        await db.close()
 
 # Alias for get_transcript, as they do the same thing
 async def get_transcript_by_id(job_id: str) -> Optional[str]:
@@ -80,37 +85,213 @@ async def get_transcript_by_id(job_id: str) -> Optional[str]:
     return await get_transcript(job_id)
 
 
+def segment_row_to_dict(row: TranscriptSegment) -> Dict[str, Any]:
+    """Converts a transcript_segments row to the frontend's TranscriptSegment shape."""
+    return {
+        "id": row.segment_id or f"{row.meeting_id}-live-{row.idx}",
+        "speakerId": row.speaker,
+        "speakerName": row.speaker_name,
+        "startTime": row.start,
+        "endTime": row.end,
+        "text": row.text,
+        "language": row.language,
+    }
+
+
+def segment_row_from_dict(meeting_id: str, idx: int, segment_data: Dict[str, Any]) -> TranscriptSegment:
+    """Builds a transcript_segments row from a segment in the frontend's TranscriptSegment shape."""
+    return TranscriptSegment(
+        meeting_id=meeting_id,
+        idx=idx,
+        segment_id=segment_data.get('id'),
+        start=float(segment_data.get('startTime') or 0.0),
+        end=float(segment_data.get('endTime') or 0.0),
+        speaker=segment_data.get('speakerId'),
+        speaker_name=segment_data.get('speakerName'),
+        language=segment_data.get('language'),
+        text=segment_data.get('text', ''),
+    )
+
+
+async def load_transcript_segments(db: AsyncSession, meeting_id: str) -> List[Dict[str, Any]]:
+    """Reads a meeting's segments in order with one primary-key range scan, using the caller's session."""
+    rows = (await db.execute(
+        select(TranscriptSegment)
+        .where(TranscriptSegment.meeting_id == meeting_id)
+        .order_by(TranscriptSegment.idx)
+    )).scalars().all()
+    return [segment_row_to_dict(row) for row in rows]
+
+
+async def get_indexing_segments(meeting_id: str) -> List[Dict[str, Any]]:
+    """
+    Rebuilds the segments a meeting was indexed from, for re-indexing: its live segment
+    rows, or else one segment per transcript line (uploaded meetings keep only the text,
+    which ASR wrote one segment per line; they get the meeting's main language). Either
+    way the chunks come out as before, so unchanged chunks hit the embedding cache.
+    """
+    db: AsyncSession = get_async_session()
+    try:
+        segments = await load_transcript_segments(db, meeting_id)
+        if segments:
+            return segments
+        row = (await db.execute(select(Meeting.transcript, Meeting.languages).where(Meeting.id == meeting_id))).first()
+        if not row or not row.transcript or row.transcript.lstrip().startswith("["):
+            return [] # Legacy JSON transcripts are moved to segment rows at startup
+        languages = json.loads(row.languages) if row.languages else []
+        language = languages[0] if languages else None
+        return [{"text": line, "language": language} for line in row.transcript.split("\n")]
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) loading segments to index for {meeting_id}: {e}")
+        return []
+    finally:
+        await db.close()
+
+
+async def get_transcript_segments(meeting_id: str, start_time: Optional[float] = None, end_time: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Retrieves a meeting's live transcript segments, optionally only those
+    starting within [start_time, end_time) seconds.
+    """
+    db: AsyncSession = get_async_session()
+    try:
+        if start_time is None and end_time is None:
+            return await load_transcript_segments(db, meeting_id)
+        # Served by the (meeting_id, start) index
+        query = select(TranscriptSegment).where(TranscriptSegment.meeting_id == meeting_id)
+        if start_time is not None:
+            query = query.where(TranscriptSegment.start >= start_time)
+        if end_time is not None:
+            query = query.where(TranscriptSegment.start < end_time)
+        rows = (await db.execute(query.order_by(TranscriptSegment.start))).scalars().all()
+        return [segment_row_to_dict(row) for row in rows]
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) fetching transcript segments for meeting {meeting_id}: {e}")
+        return []
+    finally:
+        await db.close()
+
+
 async def append_live_transcript_segment(meeting_id: str, segment_data: Dict[str, Any]) -> bool:
     """
-    Appends a new transcript segment to the meeting's transcript JSON string.
+    Appends a new transcript segment to the meeting as a single row insert.
+    The live path batches its writes through segment_writer instead.
     """
-    db: Session = get_db_session()
+    db: AsyncSession = get_async_session()
     try:
-        meeting = db.query(Meeting).filter(Meeting.id == meeting_id).first()
-        if not meeting:
+        if not (await db.execute(select(Meeting.id).where(Meeting.id == meeting_id))).first():
             print(f"Meeting not found with id: {meeting_id} to append segment.")
             return False
 
-        # Decode existing transcript JSON string, default to empty list if null/empty/invalid
-        try:
-            current_transcript_list = json.loads(meeting.transcript or '[]')
-            if not isinstance(current_transcript_list, list):
-                current_transcript_list = [] # Reset if not a list
-        except json.JSONDecodeError:
-            current_transcript_list = []
-
-        # Append the new segment
-        current_transcript_list.append(segment_data)
-
-        # Encode back to JSON string and update
-        meeting.transcript = json.dumps(current_transcript_list)
-        db.commit()
-        print(f"Appended segment to transcript for meeting: {meeting_id}")
+        # Next position; MAX over the primary key is a single index lookup
+        last_idx = (await db.execute(
+            select(func.max(TranscriptSegment.idx)).where(TranscriptSegment.meeting_id == meeting_id)
+        )).scalar()
+        next_idx = 0 if last_idx is None else last_idx + 1
+        db.add(segment_row_from_dict(meeting_id, next_idx, segment_data))
+        await db.execute(update(Meeting).where(Meeting.id == meeting_id).values(version=Meeting.version + 1))
+        await db.commit()
+        meeting_cache.invalidate(meeting_id)
+        print(f"Appended segment {next_idx} to transcript for meeting: {meeting_id}")
         return True
 
     except SQLAlchemyError as e:
         print(f"Database error (SQLAlchemy) appending segment for meeting {meeting_id}: {e}")
-        db.rollback()
+        await db.rollback()
         return False
     finally:
-        db.close()
+        await db.close()
+
+
+async def migrate_json_transcripts() -> int:
+    """
+    Moves transcripts stored as a JSON list of segments in meetings.transcript
+    (live meetings recorded before the transcript_segments table existed) into
+    transcript_segments, leaving the plain text in meetings.transcript.
+    Safe to run on every startup. Returns the number of meetings migrated.
+    """
+    db: AsyncSession = get_async_session()
+    migrated = 0
+    try:
+        # Only JSON lists can need migrating; plain-text transcripts are left alone
+        candidates = (await db.execute(
+            select(Meeting.id, Meeting.transcript).where(Meeting.transcript.like('[%'))
+        )).all()
+        for meeting_id, raw_transcript in candidates:
+            try:
+                segments = json.loads(raw_transcript)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(segments, list):
+                continue
+            segments = [seg for seg in segments if isinstance(seg, dict)]
+            already_migrated = (await db.execute(
+                select(TranscriptSegment.idx).where(TranscriptSegment.meeting_id == meeting_id).limit(1)
+            )).first()
+            if not already_migrated:
+                db.add_all([segment_row_from_dict(meeting_id, idx, seg) for idx, seg in enumerate(segments)])
+            await db.execute(update(Meeting).where(Meeting.id == meeting_id).values(
+                transcript=" ".join(seg.get('text', '') for seg in segments),
+                version=Meeting.version + 1,
+            ))
+            await db.commit() # One transaction per meeting, so an interrupted migration resumes cleanly
+            meeting_cache.invalidate(meeting_id)
+            migrated += 1
+        if migrated:
+            print(f"Migrated {migrated} JSON transcript(s) to the transcript_segments table.")
+        return migrated
+    except SQLAlchemyError as e:
+        print(f"Database error (SQLAlchemy) migrating JSON transcripts: {e}")
+        await db.rollback()
+        return migrated
+    finally:
+        await db.close()
+
+
+# Rows rewritten per transaction by compress_existing_transcripts
+TRANSCRIPT_COMPRESS_BATCH = 20
+
+
+async def compress_existing_transcripts(batch_size: int = TRANSCRIPT_COMPRESS_BATCH, pause_seconds: float = 0.2) -> int:
+    """
+    Compresses transcripts stored as plain text before compression existed.
+    Started in the background on startup: one batch per transaction, with a pause
+    between batches so live writes are not held up. Writing the value back through
+    CompressedText does the compressing. Meeting versions are not bumped, since the
+    text itself is unchanged. Legacy JSON transcripts are left to
+    migrate_json_transcripts. Gives up after repeated errors; the remaining rows
+    are picked up on the next startup. Returns the number of rows compressed.
+    """
+    compressed = 0
+    failures = 0
+    last_id = ""
+    while failures < 5:
+        db: AsyncSession = get_async_session()
+        try:
+            rows = (await db.execute(
+                select(Meeting.id, Meeting.transcript).where(
+                    Meeting.id > last_id,
+                    func.typeof(Meeting.transcript) == 'text', # Compressed values are BLOBs
+                    func.length(cast(Meeting.transcript, LargeBinary)) >= TRANSCRIPT_COMPRESS_MIN_BYTES,
+                    ~Meeting.transcript.like('[%'),
+                ).order_by(Meeting.id).limit(batch_size)
+            )).all()
+            if not rows:
+                break
+            for meeting_id, transcript in rows:
+                await db.execute(update(Meeting).where(Meeting.id == meeting_id).values(transcript=transcript))
+            # Fails if another connection committed since the SELECT; the batch is retried
+            await db.commit()
+            compressed += len(rows)
+            last_id = rows[-1].id
+            failures = 0
+        except SQLAlchemyError as e:
+            print(f"Database error (SQLAlchemy) compressing stored transcripts: {e}")
+            await db.rollback()
+            failures += 1
+        finally:
+            await db.close()
+        await asyncio.sleep(pause_seconds)
+    if compressed:
+        print(f"Compressed {compressed} stored transcript(s).")
+    return compressed
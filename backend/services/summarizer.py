@@ -5,12 +5,14 @@
 import asyncio
 import os
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from langchain_core.prompts import PromptTemplate
 # LLMChain is deprecated, we'll use LCEL (prompt | llm)
 from langchain_core.output_parsers import BaseOutputParser
 from langchain_core.runnables import RunnableSequence
 
+from . import resources
+
 
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "ollama").lower()
 # Supported providers: "ollama"
@@ -35,14 +37,9 @@ def load_llm():
     else:
         raise ValueError(f"Unsupported LLM_PROVIDER: {LLM_PROVIDER}")
 
-# Load LLM globally (similar considerations as ASR model)
-_llm = None
-try:
-    _llm = load_llm()
-    print("LLM loaded successfully.")
-except Exception as e:
-    print(f"Error loading LLM: {e}")
-    # Application might fail if LLM is essential
+# Loaded by the startup warm-up or on first use. Summaries degrade to a placeholder
+# without an LLM, so it doesn't gate readiness.
+summarizer_llm = resources.register("summarizer_llm", load_llm, required=False)
 
 
 class BulletPointOutputParser(BaseOutputParser[List[str]]):
@@ -100,17 +97,25 @@ DECISIONS MADE:
 DECISIONS_PROMPT = PromptTemplate(template=DECISIONS_TEMPLATE, input_variables=["transcript"])
 
 
-summary_chain: RunnableSequence | None = None
-action_items_chain: RunnableSequence | None = None
-decisions_chain: RunnableSequence | None = None
+_chains: Optional[Tuple[RunnableSequence, RunnableSequence, RunnableSequence]] = None
+
 
-if _llm:
-    # Define chains using the LangChain Expression Language (LCEL)
-    summary_chain = SUMMARY_PROMPT | _llm
-    action_items_chain = ACTION_ITEMS_PROMPT | _llm | BulletPointOutputParser()
-    decisions_chain = DECISIONS_PROMPT | _llm | BulletPointOutputParser()
-else:
-    print("Warning: LLM not loaded. Summarization features will be disabled.")
+async def _get_chains() -> Optional[Tuple[RunnableSequence, RunnableSequence, RunnableSequence]]:
+    """The summary, action item and decision chains, built on first use. None if no LLM could be loaded."""
+    global _chains
+    if _chains is None:
+        try:
+            llm = await summarizer_llm.aget()
+        except Exception as e:
+            print(f"Error loading LLM: {e}")
+            return None
+        # Define chains using the LangChain Expression Language (LCEL)
+        _chains = (
+            SUMMARY_PROMPT | llm,
+            ACTION_ITEMS_PROMPT | llm | BulletPointOutputParser(),
+            DECISIONS_PROMPT | llm | BulletPointOutputParser(),
+        )
+    return _chains
 
 
 async def process_transcript(transcript: str) -> Dict[str, Any]:
@@ -127,15 +132,16 @@ async def process_transcript(transcript: str) -> Dict[str, Any]:
         - action_items: A list of extracted action items.
         - decisions: A list of extracted decisions.
     """
-    if not _llm or not summary_chain or not action_items_chain or not decisions_chain:
-        if not _llm:print("Warning: No LLM loaded. Ensure the LLM provider and model are correctly set in the environment variables.")
-
+    chains = await _get_chains()
+    if not chains:
+        print("Warning: No LLM loaded. Ensure the LLM provider and model are correctly set in the environment variables.")
         return {
             "summary": "LLM processing disabled.",
             "action_items": [],
             "decisions": []
         }
 
+    summary_chain, action_items_chain, decisions_chain = chains
     print(f"Starting transcript processing using LLM: {LLM_PROVIDER} ({LLM_MODEL_NAME})...")
     summary = "Summary generation failed."
     action_items = []
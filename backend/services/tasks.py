@@ -1,124 +1,160 @@
-# Background task definitions, moved here to avoid circular imports
+# Job handlers for each stage of the meeting processing pipeline.
+# Jobs are scheduled through services/job_queue.py:
+#   asr -> analysis + indexing (in parallel) -> pdf (optional pre-render)
 
-from fastapi import BackgroundTasks
-import json
+import os
+import time
+from typing import Any, Dict
 
 # Import necessary services and storage functions (adjust paths as needed)
 from . import asr, summarizer, rag_service
-# from .storage.meeting import get_meeting_data # Removed to break circular import
-from .storage.transcript import update_asr_result
+from .job_queue import job_queue, stage_concurrency, STAGE_ASR, STAGE_ANALYSIS, STAGE_INDEXING, STAGE_PDF
+from .storage.transcript import update_asr_result, get_indexing_segments
 from .storage.analysis import update_analysis_results
+from .storage.asr_cache import make_cache_key, get_cached_asr_result, store_asr_result
+from .pdf.generator import create_report
 # Import the WebSocket manager
 from ..utils.websocket_manager import manager
 
-# --- Analysis Task ---
-async def run_analysis_task(job_id: str, transcript: str, transcript_segments: list):
+# Pre-generate the PDF report once analysis completes, so downloads are instant
+JOB_PDF_PRERENDER = os.getenv("JOB_PDF_PRERENDER", "false").lower() == "true"
+
+
+async def _mark_meeting_failed(job: Dict[str, Any], error: str):
+    """Failure handler: records the error on the meeting and broadcasts the failed status."""
+    prefix = "ASR Error" if job['stage'] == STAGE_ASR else "Analysis Error"
+    failed_meeting_data = await update_analysis_results(
+        job_id=job['meeting_id'], analysis_data={"error": f"{prefix}: {error}"}, success=False
+    )
+    if failed_meeting_data:
+        await manager.broadcast({
+            "type": "meeting_updated",
+            "payload": failed_meeting_data
+        })
+
+
+# --- ASR Stage ---
+async def run_asr_job(job: Dict[str, Any]):
+    """
+    Transcribes the uploaded audio (or reuses a cached result for identical audio),
+    stores the transcript and enqueues the analysis and indexing jobs.
+    Payload: file_path, audio_sha256 (optional), language (optional),
+    bypass_cache (optional: always transcribe, then replace the cached result).
+    The job's priority also orders its windows in the ASR scheduler.
+    """
+    job_id = job['meeting_id']
+    file_path = job['payload']['file_path']
+    audio_sha256 = job['payload'].get('audio_sha256')
+    language = job['payload'].get('language')
+    priority = job.get('priority', asr.PRIORITY_BULK)
+    bypass_cache = job['payload'].get('bypass_cache', False)
+    print(f"[ASR Task {job_id}] Starting transcription for: {file_path}")
+
+    # 1. Reuse a cached result for identical audio, or transcribe on the ASR worker pool
+    asr_result = None
+    cache_key = None
+    if audio_sha256:
+        cache_options = asr.cache_options(language)
+        cache_key = make_cache_key(audio_sha256, cache_options)
+    if cache_key and not bypass_cache:
+        lookup_start = time.perf_counter()
+        asr_result = await get_cached_asr_result(cache_key)
+        if asr_result:
+            print(f"[ASR Task {job_id}] ASR cache hit ({(time.perf_counter() - lookup_start) * 1000:.1f} ms), skipping transcription.")
+
+    if asr_result is None:
+        # The event loop stays free while a worker process runs the ASR model.
+        asr_future = asr.submit_transcription(file_path, language=language, priority=priority)
+        asr_result = await asr_future
+        if cache_key and asr_result.get("transcript"):
+            await store_asr_result(cache_key, audio_sha256, cache_options, asr_result)
+
+    transcript = asr_result.get("transcript")
+    transcript_segments = asr_result.get("segments", [])
+    detected_languages = asr_result.get("languages", [])
+    if not transcript:
+        # Handle transcription failure specifically
+        raise ValueError("Transcription failed or returned empty result.")
+    print(f"[ASR Task {job_id}] Transcription complete. Detected languages: {detected_languages}")
+
+    # 2. Update DB with transcript, languages, set status to 'processing_analysis'
+    updated_meeting_data = await update_asr_result(job_id=job_id, transcript=transcript, languages=detected_languages)
+    if not updated_meeting_data:
+        raise RuntimeError("Could not store the ASR result.")
+
+    # 3. Broadcast ASR completion update using returned data
+    await manager.broadcast({
+        "type": "meeting_updated",
+        "payload": updated_meeting_data
+    })
+
+    # 4. Summarization and RAG indexing are independent; run them as separate jobs
+    await job_queue.enqueue(STAGE_ANALYSIS, job_id, {"transcript": transcript})
+    if transcript_segments:
+        await job_queue.enqueue(STAGE_INDEXING, job_id, {"segments": transcript_segments, "languages": detected_languages})
+
+
+# --- Analysis Stage ---
+async def run_analysis_job(job: Dict[str, Any]):
     """
-    Background task for post-ASR analysis: summarize, RAG index.
-    (Moved from routers/upload.py)
+    Summarizes the transcript, extracts action items and decisions, and marks the meeting completed.
+    Payload: transcript.
     """
+    job_id = job['meeting_id']
     print(f"[Analysis Task {job_id}] Starting analysis...")
-    analysis_data = {}
-    try:
-        # 1. Process Transcript (Summarize, Extract Actions/Decisions)
-        analysis_data = await summarizer.process_transcript(transcript)
-        print(f"[Analysis Task {job_id}] Summarization complete.")
-
-        # 2. Add Transcript Segments to Vector Store (RAG Indexing)
-        if transcript_segments:
-            await rag_service.add_transcript_to_store(meeting_id=job_id, transcript_segments=transcript_segments)
-            print(f"[Analysis Task {job_id}] RAG indexing complete.")
-        else:
-            print(f"[Analysis Task {job_id}] No transcript segments found, skipping RAG indexing.")
-
-        # 3. Update final results in Database and get updated data
-        updated_meeting_data = await update_analysis_results(job_id=job_id, analysis_data=analysis_data, success=True)
-        print(f"[Analysis Task {job_id}] Analysis completed successfully.")
-
-        # 4. Broadcast final update using returned data
-        if updated_meeting_data:
-            await manager.broadcast({
-                "type": "meeting_updated",
-                "payload": updated_meeting_data
-            })
-
-    except Exception as e:
-        print(f"[Analysis Task {job_id}] Error during analysis: {e}")
-        # Update DB record to indicate failure status, include any partial analysis data if desired
-        analysis_data['error'] = str(e) # Add error info
-        failed_meeting_data = await update_analysis_results(job_id=job_id, analysis_data=analysis_data, success=False)
-
-        # Broadcast failure update using returned data
-        if failed_meeting_data:
-            await manager.broadcast({
-                "type": "meeting_updated",
-                "payload": failed_meeting_data
-            })
-
-# --- ASR Task ---
-async def run_asr_task(background_tasks: BackgroundTasks, file_path: str, job_id: str):
+    analysis_data = await summarizer.process_transcript(job['payload'].get('transcript', ''))
+    print(f"[Analysis Task {job_id}] Summarization complete.")
+
+    updated_meeting_data = await update_analysis_results(job_id=job_id, analysis_data=analysis_data, success=True)
+    if not updated_meeting_data:
+        raise RuntimeError("Could not store the analysis results.")
+    print(f"[Analysis Task {job_id}] Analysis completed successfully.")
+
+    await manager.broadcast({
+        "type": "meeting_updated",
+        "payload": updated_meeting_data
+    })
+
+    if JOB_PDF_PRERENDER:
+        await job_queue.enqueue(STAGE_PDF, job_id, {"include_transcript": True})
+
+
+# --- Indexing Stage ---
+async def run_indexing_job(job: Dict[str, Any]):
     """
-    Background task for ASR processing. Triggers analysis task on success.
-    (Moved from routers/upload.py)
+    Adds the transcript segments to the vector store for chat (RAG).
+    Payload: segments, languages (the meeting's, for chunks whose segments carry none).
+    Without segments (re-indexing), the meeting's stored segments are used.
     """
-    print(f"[ASR Task {job_id}] Starting transcription for: {file_path}")
-    transcript = ""
-    transcript_segments = []
-    detected_languages = [] # Initialize languages list
-    try:
-        # 1. Transcribe Audio and Detect Languages
-        asr_result = await asr.transcribe_audio(file_path)
-        transcript = asr_result.get("transcript")
-        transcript_segments = asr_result.get("segments", [])
-        detected_languages = asr_result.get("languages", []) # Extract languages
-
-        if not transcript:
-             # Handle transcription failure specifically
-             raise ValueError("Transcription failed or returned empty result.")
-
-        print(f"[ASR Task {job_id}] Transcription complete. Detected languages: {detected_languages}")
-
-        # 2. Update DB with transcript, languages, set status to 'processing_analysis', and get updated data
-        updated_meeting_data = await update_asr_result(job_id=job_id, transcript=transcript, languages=detected_languages)
-
-        # 3. Broadcast ASR completion update using returned data
-        if updated_meeting_data:
-            await manager.broadcast({
-                "type": "meeting_updated",
-                "payload": updated_meeting_data
-            })
-
-        # 4. Trigger the analysis task (only if ASR update was successful)
-        if updated_meeting_data: # Check if we got data back before triggering next step
-            # Note: We pass the background_tasks instance from the caller if needed,
-            # but run_analysis_task doesn't need it itself.
-            background_tasks.add_task(run_analysis_task, job_id, transcript, transcript_segments)
-            print(f"[ASR Task {job_id}] Enqueued analysis task.")
-        else:
-            print(f"[ASR Task {job_id}] Skipping analysis task due to ASR update failure.")
-
-    except Exception as e:
-        print(f"[ASR Task {job_id}] Error during transcription: {e}")
-        # Update DB record to indicate failure status immediately
-        error_data = {"error": f"ASR Error: {e}"}
-        failed_meeting_data = await update_analysis_results(job_id=job_id, analysis_data=error_data, success=False)
-
-        # Broadcast ASR failure update using returned data (which includes status and error)
-        if failed_meeting_data:
-            await manager.broadcast({
-                "type": "meeting_updated",
-                "payload": failed_meeting_data
-            })
-            # No need to fetch full data again here, failed_meeting_data has what we need for broadcast
-            # asr_failed_data = await get_meeting_data(job_id) # Removed call
-            # if asr_failed_data:
-            #     await manager.broadcast({
-            #         "type": "meeting_updated",
-            #         "payload": asr_failed_data
-            #     })
-    # Optional: Clean up the uploaded file after ASR? Consider moving cleanup logic
-    # finally:
-    #     try:
-    #         os.remove(file_path) # Need os import if uncommented
-    #     except OSError as e:
-    #         print(f"[ASR Task {job_id}] Error cleaning up file {file_path}: {e}")
+    job_id = job['meeting_id']
+    if 'segments' in job['payload']:
+        transcript_segments = job['payload']['segments']
+    else:
+        transcript_segments = await get_indexing_segments(job_id)
+    if not transcript_segments:
+        print(f"[Indexing Task {job_id}] No transcript segments found, skipping RAG indexing.")
+        return
+    await rag_service.add_transcript_to_store(meeting_id=job_id, transcript_segments=transcript_segments,
+                                              languages=job['payload'].get('languages'))
+    print(f"[Indexing Task {job_id}] RAG indexing complete.")
+
+
+# --- PDF Stage ---
+async def run_pdf_job(job: Dict[str, Any]):
+    """
+    Renders the meeting's PDF report ahead of time.
+    Payload: include_transcript.
+    """
+    pdf_filepath = await create_report(job['meeting_id'], include_transcript=job['payload'].get('include_transcript', True))
+    if not pdf_filepath:
+        raise RuntimeError("PDF generation failed.")
+
+
+def register_job_handlers():
+    """Registers every pipeline stage with the job queue. Called once on startup."""
+    job_queue.register(STAGE_ASR, run_asr_job, on_failure=_mark_meeting_failed,
+                       concurrency=stage_concurrency(STAGE_ASR, asr.ASR_WORKERS))
+    job_queue.register(STAGE_ANALYSIS, run_analysis_job, on_failure=_mark_meeting_failed,
+                       concurrency=stage_concurrency(STAGE_ANALYSIS, 1))
+    job_queue.register(STAGE_INDEXING, run_indexing_job, concurrency=stage_concurrency(STAGE_INDEXING, 1))
+    job_queue.register(STAGE_PDF, run_pdf_job, concurrency=stage_concurrency(STAGE_PDF, 1))
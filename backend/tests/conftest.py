@@ -0,0 +1,6 @@
+# Points the database at a throwaway directory before any test imports backend.db.
+
+import os
+import tempfile
+
+os.environ.setdefault("DB_DIR", tempfile.mkdtemp(prefix="notera-tests-"))
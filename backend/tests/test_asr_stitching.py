@@ -0,0 +1,67 @@
+# Tests for merging per-window ASR results into one transcript.
+#
+# Usage (from the project root):
+#   python -m pytest backend/tests
+
+from backend.services.asr import BOUNDARY_DEDUPE_SECONDS, _stitch_window_results
+
+
+def _window(*segments, languages=("en",)):
+    return {
+        "languages": list(languages),
+        "segments": [{"start": start, "end": end, "text": text} for start, end, text in segments],
+    }
+
+
+def test_segments_are_shifted_to_global_time():
+    result = _stitch_window_results(
+        [_window((0.0, 4.0, "First window.")), _window((1.0, 3.0, "Second window."), languages=("en", "de"))],
+        offsets=[0.0, 10.0], ends=[10.0, 20.0],
+    )
+    assert [(seg["id"], seg["start"], seg["end"]) for seg in result["segments"]] == [(0, 0.0, 4.0), (1, 11.0, 13.0)]
+    assert result["transcript"] == "First window.\nSecond window."
+    assert result["languages"] == ["en", "de"]
+
+
+def test_segment_times_are_clamped_to_their_window():
+    result = _stitch_window_results([_window((8.0, 12.5, "Runs past the cut."))], offsets=[0.0], ends=[10.0])
+    assert (result["segments"][0]["start"], result["segments"][0]["end"]) == (8.0, 10.0)
+
+
+def test_repeat_at_boundary_is_merged_into_previous_segment():
+    result = _stitch_window_results(
+        [_window((7.0, 10.0, "See you on Friday.")), _window((0.2, 1.5, "see you on friday"))],
+        offsets=[0.0, 10.0], ends=[10.0, 20.0],
+    )
+    assert len(result["segments"]) == 1
+    assert result["segments"][0]["end"] == 11.5
+    assert result["transcript"] == "See you on Friday."
+
+
+def test_different_text_at_boundary_is_kept():
+    result = _stitch_window_results(
+        [_window((7.0, 10.0, "See you on Friday.")), _window((0.2, 1.5, "Bye everyone."))],
+        offsets=[0.0, 10.0], ends=[10.0, 20.0],
+    )
+    assert [seg["text"] for seg in result["segments"]] == ["See you on Friday.", "Bye everyone."]
+
+
+def test_repeat_exactly_at_dedupe_gap_is_merged():
+    result = _stitch_window_results(
+        [_window((7.0, 10.0, "Thanks.")), _window((BOUNDARY_DEDUPE_SECONDS, 2.0, "Thanks."))],
+        offsets=[0.0, 10.0], ends=[10.0, 20.0],
+    )
+    assert len(result["segments"]) == 1
+
+
+def test_repeat_beyond_dedupe_gap_is_kept():
+    result = _stitch_window_results(
+        [_window((7.0, 10.0, "Thanks.")), _window((BOUNDARY_DEDUPE_SECONDS + 0.5, 3.0, "Thanks."))],
+        offsets=[0.0, 10.0], ends=[10.0, 20.0],
+    )
+    assert [seg["id"] for seg in result["segments"]] == [0, 1]
+
+
+def test_empty_segments_are_skipped():
+    result = _stitch_window_results([_window((0.0, 1.0, "  "), (1.0, 2.0, "Hello."))], offsets=[0.0], ends=[10.0])
+    assert [(seg["id"], seg["text"]) for seg in result["segments"]] == [(0, "Hello.")]
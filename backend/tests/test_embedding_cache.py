@@ -0,0 +1,58 @@
+# Tests for the embedding cache's size cap.
+#
+# Usage (from the project root):
+#   python -m pytest backend/tests
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from backend.db.database import create_db_and_tables
+from backend.services.storage import embedding_cache
+from backend.services.storage.embedding_cache import get_cached_embeddings, purge_embedding_cache, store_embeddings
+
+MODEL = "test-model"
+DIMENSION = 4 # Stored as float16: 8 bytes per entry
+ENTRY_BYTES = DIMENSION * 2
+
+
+def _vectors(count: int) -> np.ndarray:
+    return np.arange(count * DIMENSION, dtype=np.float32).reshape(count, DIMENSION)
+
+
+def _cached_keys(keys):
+    return set(asyncio.run(get_cached_embeddings(MODEL, keys)))
+
+
+def setup_module():
+    create_db_and_tables()
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    asyncio.run(purge_embedding_cache())
+
+
+def test_batch_larger_than_cap_keeps_what_fits(monkeypatch):
+    monkeypatch.setattr(embedding_cache, "EMBEDDING_CACHE_MAX_BYTES", 2 * ENTRY_BYTES + 1)
+    keys = [f"batch-{i}" for i in range(5)]
+    assert asyncio.run(store_embeddings(MODEL, keys, _vectors(5)))
+    assert len(_cached_keys(keys)) == 2
+
+
+def test_least_recently_used_entries_are_evicted_first(monkeypatch):
+    monkeypatch.setattr(embedding_cache, "EMBEDDING_CACHE_MAX_BYTES", 3 * ENTRY_BYTES)
+    old = ["old-1", "old-2"]
+    new = ["new-1", "new-2"]
+    asyncio.run(store_embeddings(MODEL, old, _vectors(2)))
+    asyncio.run(store_embeddings(MODEL, new, _vectors(2)))
+    assert _cached_keys(new) == set(new)
+    assert len(_cached_keys(old)) == 1
+
+
+def test_nothing_is_evicted_under_the_cap(monkeypatch):
+    monkeypatch.setattr(embedding_cache, "EMBEDDING_CACHE_MAX_BYTES", 10 * ENTRY_BYTES)
+    keys = [f"entry-{i}" for i in range(4)]
+    asyncio.run(store_embeddings(MODEL, keys, _vectors(4)))
+    assert _cached_keys(keys) == set(keys)
@@ -0,0 +1,76 @@
+# Tests for claiming and completing queued jobs.
+#
+# Usage (from the project root):
+#   python -m pytest backend/tests
+
+import asyncio
+
+from sqlalchemy import delete
+
+from backend.db.database import Job, create_db_and_tables, get_async_session
+from backend.services.asr_scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE
+from backend.services.storage.jobs import claim_next_job, complete_job, enqueue_job, get_job, requeue_stale_jobs
+
+STAGE = "asr"
+OWNER = "test-worker"
+
+
+async def _clear_jobs():
+    db = get_async_session()
+    try:
+        await db.execute(delete(Job))
+        await db.commit()
+    finally:
+        await db.close()
+
+
+async def _claim_order(jobs):
+    await _clear_jobs()
+    for meeting_id, priority in jobs:
+        await enqueue_job(STAGE, meeting_id, {}, priority=priority)
+    claimed = []
+    while (job := await claim_next_job(STAGE, OWNER, lease_seconds=60)):
+        claimed.append(job["meeting_id"])
+    return claimed
+
+
+def setup_module():
+    create_db_and_tables()
+
+
+def test_interactive_job_is_claimed_before_older_bulk_jobs():
+    jobs = [("bulk-1", PRIORITY_BULK), ("bulk-2", PRIORITY_BULK), ("rerun", PRIORITY_INTERACTIVE)]
+    assert asyncio.run(_claim_order(jobs)) == ["rerun", "bulk-1", "bulk-2"]
+
+
+def test_jobs_of_equal_priority_are_claimed_oldest_first():
+    jobs = [("first", PRIORITY_BULK), ("second", PRIORITY_BULK), ("third", PRIORITY_BULK)]
+    assert asyncio.run(_claim_order(jobs)) == ["first", "second", "third"]
+
+
+def test_interactive_job_waits_when_stage_is_at_its_limit():
+    async def scenario():
+        await _clear_jobs()
+        await enqueue_job(STAGE, "bulk", {}, priority=PRIORITY_BULK)
+        running = await claim_next_job(STAGE, OWNER, lease_seconds=60, max_running=1)
+        await enqueue_job(STAGE, "rerun", {}, priority=PRIORITY_INTERACTIVE)
+        blocked = await claim_next_job(STAGE, OWNER, lease_seconds=60, max_running=1)
+        return running["meeting_id"], blocked
+
+    assert asyncio.run(scenario()) == ("bulk", None)
+
+
+def test_only_the_owner_completes_a_running_job():
+    async def scenario():
+        await _clear_jobs()
+        await enqueue_job(STAGE, "meeting", {})
+        stale = await claim_next_job(STAGE, "old-worker", lease_seconds=0)
+        await requeue_stale_jobs()
+        await claim_next_job(STAGE, OWNER, lease_seconds=60)
+        completed_by_stale = await complete_job(stale["id"], owner="old-worker")
+        status_while_running = (await get_job(stale["id"]))["status"]
+        completed_by_owner = await complete_job(stale["id"], owner=OWNER)
+        completed_twice = await complete_job(stale["id"], owner=OWNER)
+        return completed_by_stale, status_while_running, completed_by_owner, completed_twice
+
+    assert asyncio.run(scenario()) == (False, "running", True, False)
@@ -0,0 +1,38 @@
+# Tests for the live transcript's repeated-prefix removal.
+#
+# Usage (from the project root):
+#   python -m pytest backend/tests
+
+from backend.services.live_session import drop_repeated_prefix
+
+CONTEXT = "so we agreed to ship the release on Friday"
+
+
+def test_overlap_is_dropped():
+    assert drop_repeated_prefix(CONTEXT, "on Friday, and then review the numbers") == "and then review the numbers"
+
+
+def test_no_overlap_keeps_text():
+    assert drop_repeated_prefix(CONTEXT, "next item is hiring") == "next item is hiring"
+
+
+def test_full_repeat_leaves_nothing():
+    assert drop_repeated_prefix(CONTEXT, "ship the release on Friday.") == ""
+
+
+def test_repeat_may_end_before_last_context_words():
+    # Whisper dropped "okay" from the new window
+    assert drop_repeated_prefix(CONTEXT + " okay", "on Friday then we test") == "then we test"
+
+
+def test_single_word_only_matches_last_context_word():
+    assert drop_repeated_prefix(CONTEXT, "Friday works") == "works"
+    assert drop_repeated_prefix(CONTEXT, "release notes are done") == "release notes are done"
+
+
+def test_empty_context_keeps_text():
+    assert drop_repeated_prefix("", "hello everyone") == "hello everyone"
+
+
+def test_repeat_longer_than_max_words_is_not_matched():
+    assert drop_repeated_prefix(CONTEXT, "ship the release on Friday", max_words=2) == "ship the release on Friday"
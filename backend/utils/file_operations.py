@@ -1,5 +1,7 @@
 import os
 import shutil
+import hashlib
+from typing import BinaryIO
 from fastapi import UploadFile
 
 async def save_upload_file(upload_file: UploadFile, destination_dir: str) -> str:
@@ -26,3 +28,30 @@ async def save_upload_file(upload_file: UploadFile, destination_dir: str) -> str
         # Log the error appropriately in a real application
         print(f"Error saving file {upload_file.filename}: {e}")
         raise IOError(f"Could not save file: {upload_file.filename}")
+
+
+def copy_file_with_sha256(source: BinaryIO, destination_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Copies a file object to destination_path and hashes the bytes in the same pass.
+
+    Returns:
+        The hex SHA-256 digest of the copied bytes.
+    """
+    digest = hashlib.sha256()
+    with open(destination_path, "wb+") as file_object:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            file_object.write(chunk)
+    return digest.hexdigest()
+
+
+def sha256_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Returns the hex SHA-256 digest of a file on disk."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_object:
+        for chunk in iter(lambda: file_object.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -45,8 +45,9 @@ let currentSessionPath: string | null = null;
 let currentMeetingId: string | null = null; // Store the ID for the live meeting
 let chunkCounter = 0;
 const TEMP_RECORDING_DIR = path.join(app.getAppPath(), 'temp_recording_chunks');
-// Set the chunk duration in seconds
-const chunkDurationInSeconds = 5;
+// Set the chunk duration in seconds. The backend overlaps consecutive chunks and
+// deduplicates the overlap, so short chunks no longer lose words at the edges.
+const chunkDurationInSeconds = 2;
 
 
 // Set AppUserModelID for Windows notifications and taskbar grouping
@@ -74,9 +74,10 @@ export function MeetingCard({ meeting }: MeetingCardProps) { // Removed onDelete
         </CardContent>
         <CardFooter className="p-4 pt-2 flex justify-between items-end"> {/* Increased padding, flex justify-between */}
           <div className="flex-grow mr-2 min-w-0"> {/* Allow text to take space, prevent overflow */}
-            {meeting.status === "completed" && meeting.summary && (
+            {/* List items only carry the excerpt; live updates may carry the full summary */}
+            {meeting.status === "completed" && (meeting.summary || meeting.summaryExcerpt) && (
               <p className="text-xs text-muted-foreground line-clamp-2 text-left"> {/* Allow 2 lines */}
-                {meeting.summary}
+                {meeting.summary || meeting.summaryExcerpt}
               </p>
             )}
             {/* Show specific message based on processing stage */}
@@ -25,7 +25,7 @@ export function useMeetingsList() {
       const trimmedQuery = searchQuery.trim().toLowerCase();
       const localResults = allMeetings.filter(meeting =>
         meeting.filename.toLowerCase().includes(trimmedQuery) ||
-        meeting.summary?.toLowerCase().includes(trimmedQuery)
+        (meeting.summary ?? meeting.summaryExcerpt)?.toLowerCase().includes(trimmedQuery)
       );
       setDisplayedMeetings(localResults);
       // Note: We are not re-triggering the API search here on every update,
@@ -162,7 +162,7 @@ export function useMeetingsList() {
     // First perform local search for instant feedback
     const localResults = allMeetings.filter(meeting => 
       meeting.filename.toLowerCase().includes(trimmedQuery) || 
-      meeting.summary?.toLowerCase().includes(trimmedQuery)
+      (meeting.summary ?? meeting.summaryExcerpt)?.toLowerCase().includes(trimmedQuery)
     );
     
     // Show local results immediately
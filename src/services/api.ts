@@ -5,6 +5,8 @@
 
 // Base URL for the FastAPI backend
 const BASE_URL = "http://localhost:7000"; // Backend runs on port 7000
+// Meetings fetched per request when loading the meeting list
+const MEETINGS_PAGE_SIZE = 200;
 
 // Types
 export interface Meeting { // Keep existing type, but note backend might return different structure initially
@@ -15,6 +17,7 @@ export interface Meeting { // Keep existing type, but note backend might return
   languages?: string[];
   duration?: string;
   summary?: string;
+  summaryExcerpt?: string; // Start of the summary, as sent in the meeting list (full text via getMeeting)
   actionItems?: ActionItem[];
   decisions?: ActionItem[]; // Add decisions field (using ActionItem structure for now)
   error?: string;
@@ -90,19 +93,25 @@ export const api = {
 
   // Get all meetings
   getMeetings: async (): Promise<Meeting[]> => {
-    const response = await fetch(`${BASE_URL}/meetings/`);
-    // Define the expected structure from the backend based on storage.py
-    const backendData = await handleApiResponse<Array<{
+    // The list is paginated: follow X-Next-Cursor until the last page
+    // Each item is a projection: list fields plus a summary excerpt (no summary, transcript, actions or decisions)
+    const backendData: Array<{
       id: string; // Expect 'id' from backend now
       filename: string;
-      transcript: string | null;
-      summary: string | null;
-      action_items: string; // Expect JSON string from DB
-      decisions: string;    // Expect JSON string from DB
+      summary_excerpt: string | null; // Start of the summary; getMeeting returns the full text
+      action_items?: string[];
+      decisions?: string[];
       status: Meeting["status"]; // Expect status field from backend
       upload_time: string; // Expect 'upload_time' from backend now
       languages: string[]; // Expect languages array from backend
-    }>>(response);
+    }> = [];
+    let cursor: string | null = null;
+    do {
+      const url = `${BASE_URL}/meetings/?limit=${MEETINGS_PAGE_SIZE}` + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : "");
+      const response = await fetch(url);
+      backendData.push(...await handleApiResponse<typeof backendData>(response));
+      cursor = response.headers.get("X-Next-Cursor");
+    } while (cursor);
 
     // Map backend data to frontend Meeting type
     return backendData.map((item): Meeting => {
@@ -117,11 +126,11 @@ export const api = {
         uploadDate: item.upload_time || null, // Use 'upload_time' from backend, fallback to null
         status: item.status || "processing_asr", // Use status directly from backend, fallback to processing_asr
         languages: item.languages || [], // Map languages array
-        summary: item.summary || undefined,
+        summaryExcerpt: item.summary_excerpt || undefined,
         // Map string arrays to ActionItem arrays
         actionItems: actionItemsList.map((desc, index) => ({ id: `${item.id}-action-${index}`, description: desc })), // Use item.id
         decisions: decisionsList.map((desc, index) => ({ id: `${item.id}-decision-${index}`, description: desc })), // Use item.id
-        error: item.status === "failed" ? (item.summary || "Processing failed") : undefined, // Use status for error indication
+        error: item.status === "failed" ? (item.summary_excerpt || "Processing failed") : undefined, // Use status for error indication
         // language and duration are not directly available in the list view from backend
       };
     });